@@ -15,7 +15,7 @@ from aiogram import Router, F, Bot
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, BufferedInputFile
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.enums import ParseMode
 
@@ -95,6 +95,41 @@ def set_all_data_spreadsheet_id(spreadsheet_id: str) -> bool:
     return save_all_data_config(config)
 
 
+def is_all_data_batch_mode() -> bool:
+    """ALL DATA DB dan davriy to'ldiriladimi (har bir hisobot alohida yozilmaydi)"""
+    return bool(load_all_data_config().get('batch_mode'))
+
+
+def get_all_data_switch_report_id() -> int:
+    """Rejim oxirgi marta almashgan paytdagi eng katta hisobot ID si"""
+    return int(load_all_data_config().get('mode_switch_report_id') or 0)
+
+
+def should_write_all_data_live(report_id: int) -> bool:
+    """
+    Hisobotni pipeline ALL DATA ga o'zi yozishi kerakmi. Rejim almashgan paytgacha DB ga tushgan
+    hisobotlar (ID <= switch) oldingi rejimga tegishli: jonli davrnikini pipeline yozadi,
+    davriy davrnikini rejim almashganda sheets_sync yozib tugatadi
+    """
+    config = load_all_data_config()
+    switch_report_id = int(config.get('mode_switch_report_id') or 0)
+    if config.get('batch_mode'):
+        return report_id <= switch_report_id
+    return report_id > switch_report_id
+
+
+def set_all_data_batch_mode(enabled: bool, switch_report_id: int = 0) -> bool:
+    """
+    ALL DATA yozish rejimini o'rnatish: True - davriy (DB dan), False - har bir hisobotda.
+    switch_report_id - shu paytdagi eng katta hisobot ID si (rejim bilan bitta yozuvda saqlanadi)
+    """
+    config = load_all_data_config()
+    config['batch_mode'] = enabled
+    config['mode_switch_report_id'] = switch_report_id
+    config['updated_at'] = datetime.now().strftime('%d.%m.%Y %H:%M')
+    return save_all_data_config(config)
+
+
 # ==================== KEYBOARDS ====================
 
 def get_all_data_menu_keyboard() -> InlineKeyboardMarkup:
@@ -329,3 +364,35 @@ async def cmd_reset_alldata(message: Message):
         logging.info(f"🗑️ ALL DATA config tozalandi by admin {user_id}")
     else:
         await message.answer("ℹ️ Sozlamalar allaqachon bo'sh.")
+
+
+@additional_router.message(Command("sheetsmetrics"))
+async def cmd_sheets_metrics(message: Message):
+    """
+    /sheetsmetrics - Google Sheets API chaqiruvlari va kechikish metrikalari
+    /sheetsmetrics reset - hisoblagichlarni nolga qaytarish
+    """
+    user_id = message.from_user.id
+    
+    if not is_admin(user_id):
+        await message.answer("⛔ Bu buyruq faqat adminlar uchun!")
+        return
+    
+    from sheets_metrics import sheets_metrics, format_metrics_summary, render_prometheus
+    from sheets_accounts import format_pool_status
+    
+    args = (message.text or "").split(maxsplit=1)
+    if len(args) > 1 and args[1].strip().lower() == "reset":
+        sheets_metrics.reset()
+        await message.answer("✅ Sheets metrikalari tozalandi!")
+        logging.info(f"🗑️ Sheets metrikalari tozalandi by admin {user_id}")
+        return
+    
+    await message.answer(format_metrics_summary())
+    await message.answer(format_pool_status())
+    
+    exported = render_prometheus().encode("utf-8")
+    await message.answer_document(
+        BufferedInputFile(exported, filename=f"sheets_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prom"),
+        caption="📄 Prometheus matn formatidagi eksport"
+    )
@@ -13,16 +13,17 @@ from aiogram.enums import ParseMode
 
 from config import HELPER_ID, ADMIN_ID
 from database import (
-	get_all_users, delete_user_from_db, get_all_sales_reports, delete_sales_report,
+	delete_user_from_db, get_all_sales_reports, delete_sales_report,
 	add_telegram_group, get_all_telegram_groups, delete_telegram_group,
 	add_google_sheet, get_all_google_sheets, delete_google_sheet, get_google_sheet_by_id,
 	get_users_paginated, get_user_by_telegram_id, get_reports_by_user,
-	block_user, unblock_user, check_user_blocked, update_user_name, get_user_reports_count,
-	update_user_group, get_telegram_group_by_id, get_database_stats,
+	block_user, unblock_user, check_user_blocked, update_user_name,
+	update_user_group, get_telegram_group_by_id,
 	get_reports_count_by_date, get_total_users_count, get_total_reports_count,
 	get_confirmed_reports_count, get_pending_reports_count, get_current_password,
 	update_password, update_group_google_sheet, get_reports_by_status,
-	add_user_to_db, check_user_exists, update_report_status_in_db
+	add_user_to_db, check_user_exists, update_report_status_in_db, get_seller_profile,
+	get_analytics_snapshot
 )
 from keyboards import (
 	get_main_menu_reply_keyboard, get_admin_cancel_inline_keyboard,
@@ -34,6 +35,7 @@ from keyboards import (
 	get_google_sheets_selection_keyboard, get_password_change_keyboard,
 	get_settings_keyboard
 )
+from broadcast import create_and_start_broadcast, format_broadcast_progress
 from google_sheets_integration import (
 	test_google_sheets_connection, get_reports_statistics,
 	save_report_to_sheets, get_worksheet, get_sheet_info,
@@ -275,7 +277,7 @@ def format_system_info() -> str:
 async def format_database_info() -> str:
 	"""Ma'lumotlar bazasi ma'lumotlarini formatlash"""
 	try:
-		stats = await get_database_stats()
+		stats = await get_analytics_snapshot()
 		
 		text = "🗄️ **MA'LUMOTLAR BAZASI**\n\n"
 		text += f"👥 **Foydalanuvchilar:** {stats.get('total_users', 0)} ta\n"
@@ -291,15 +293,8 @@ async def format_database_info() -> str:
 		text += f"└ Boshqa hududlar: {stats.get('other_reports', 0)} ta\n\n"
 		
 		# Haftalik va oylik statistika
-		today = date.today()
-		week_ago = today - timedelta(days=7)
-		month_ago = today - timedelta(days=30)
-		
-		week_reports = await get_reports_count_by_date(week_ago.isoformat(), today.isoformat())
-		month_reports = await get_reports_count_by_date(month_ago.isoformat(), today.isoformat())
-		
-		text += f"📈 **Haftalik:** {week_reports} ta hisobot\n"
-		text += f"📊 **Oylik:** {month_reports} ta hisobot\n"
+		text += f"📈 **Haftalik:** {stats.get('week_reports', 0)} ta hisobot\n"
+		text += f"📊 **Oylik:** {stats.get('month_reports', 0)} ta hisobot\n"
 		
 		return text
 	
@@ -564,20 +559,22 @@ async def show_worker_details(callback_query: CallbackQuery, state: FSMContext):
 		return
 	
 	telegram_id = int(callback_query.data.split("_")[-1])
-	worker = await get_user_by_telegram_id(telegram_id)
+	profile = await get_seller_profile(telegram_id)
 	
-	if not worker:
+	if not profile:
 		await callback_query.answer("❌ Ishchi topilmadi!", show_alert=True)
 		return
 	
-	user_id, telegram_id, full_name, reg_date, is_blocked, group_name = worker
-	reports_count = await get_user_reports_count(telegram_id)
+	full_name = profile['full_name']
+	reg_date = profile['registration_date'] or "Noma'lum"
+	is_blocked = profile['is_blocked']
+	group_name = profile['group_name']
+	reports_count = profile['total_reports']
 	
 	# So'nggi faollik
-	recent_reports = await get_reports_by_user(telegram_id, 1)
 	last_activity = "Hech qachon"
-	if recent_reports:
-		last_activity = recent_reports[0][10].split(' ')[0] if recent_reports[0][10] else "Noma'lum"
+	if reports_count:
+		last_activity = str(profile['last_submission_date']).split(' ')[0] if profile['last_submission_date'] else "Noma'lum"
 	
 	status_text = "🔒 **BLOKLANGAN**" if is_blocked else "✅ **FAOL**"
 	group_display = group_name if group_name != 'Guruh tayinlanmagan' else "❌ Tayinlanmagan"
@@ -588,6 +585,10 @@ async def show_worker_details(callback_query: CallbackQuery, state: FSMContext):
 	text += f"👥 **Guruh:** {group_display}\n"
 	text += f"📅 **Ro'yxatdan o'tgan:** {reg_date.split(' ')[0]}\n"
 	text += f"📊 **Jami hisobotlar:** {reports_count} ta\n"
+	text += (
+		f"✅ Tasdiqlangan: {profile['confirmed_count']} | ⏳ Kutilayotgan: {profile['pending_count']} | "
+		f"❌ Rad etilgan: {profile['rejected_count']}\n"
+	)
 	text += f"🕐 **So'nggi faollik:** {last_activity}\n"
 	text += f"🔘 **Holat:** {status_text}\n\n"
 	text += "💡 Kerakli amalni tanlang:"
@@ -2121,14 +2122,7 @@ async def show_general_reports(callback_query: CallbackQuery, state: FSMContext)
 		await callback_query.answer("🚫 Ruxsat yo'q.", show_alert=True)
 		return
 	
-	stats = await get_database_stats()
-	
-	today = date.today()
-	week_ago = today - timedelta(days=7)
-	week_reports = await get_reports_count_by_date(week_ago.isoformat(), today.isoformat())
-	
-	month_ago = today - timedelta(days=30)
-	month_reports = await get_reports_count_by_date(month_ago.isoformat(), today.isoformat())
+	stats = await get_analytics_snapshot()
 	
 	text = (
 		"📊 **UMUMIY STATISTIKA**\n\n"
@@ -2137,8 +2131,8 @@ async def show_general_reports(callback_query: CallbackQuery, state: FSMContext)
 		f"✅ **Tasdiqlangan:** {stats.get('confirmed_reports', 0)} ta\n"
 		f"⏳ **Kutilayotgan:** {stats.get('pending_reports', 0)} ta\n"
 		f"📅 **Bugungi hisobotlar:** {stats.get('today_reports', 0)} ta\n"
-		f"📈 **Haftalik hisobotlar:** {week_reports} ta\n"
-		f"📊 **Oylik hisobotlar:** {month_reports} ta\n"
+		f"📈 **Haftalik hisobotlar:** {stats.get('week_reports', 0)} ta\n"
+		f"📊 **Oylik hisobotlar:** {stats.get('month_reports', 0)} ta\n"
 		f"🎯 **Tasdiqlash foizi:** {stats.get('confirmation_rate', 0)}%\n\n"
 		f"🏙️ **TOSHKENT SHAHAR:**\n"
 		f"├ Toshkent hisobotlari: {stats.get('tashkent_reports', 0)} ta\n"
@@ -2181,33 +2175,14 @@ async def show_general_analytics(callback_query: CallbackQuery, state: FSMContex
 		await callback_query.answer("🚫 Ruxsat yo'q.", show_alert=True)
 		return
 	
-	stats = await get_database_stats()
-	
-	today = date.today()
-	week_ago = today - timedelta(days=7)
-	month_ago = today - timedelta(days=30)
-	
-	week_reports = await get_reports_count_by_date(week_ago.isoformat(), today.isoformat())
-	month_reports = await get_reports_count_by_date(month_ago.isoformat(), today.isoformat())
-	
-	# Qo'shimcha statistikalar
-	all_users = await get_all_users()
-	active_users = 0
-	blocked_users = 0
-	
-	for user in all_users:
-		is_blocked = await check_user_blocked(user[1])
-		if is_blocked:
-			blocked_users += 1
-		else:
-			active_users += 1
+	stats = await get_analytics_snapshot()
 	
 	text = (
 		"📊 **UMUMIY ANALITIKA**\n\n"
 		"👥 **FOYDALANUVCHILAR:**\n"
 		f"├ Jami: {stats.get('total_users', 0)} ta\n"
-		f"├ ✅ Faol: {active_users} ta\n"
-		f"└ 🔒 Bloklangan: {blocked_users} ta\n\n"
+		f"├ ✅ Faol: {stats.get('active_users', 0)} ta\n"
+		f"└ 🔒 Bloklangan: {stats.get('blocked_users', 0)} ta\n\n"
 		
 		"📝 **HISOBOTLAR:**\n"
 		f"├ Jami: {stats.get('total_reports', 0)} ta\n"
@@ -2217,16 +2192,16 @@ async def show_general_analytics(callback_query: CallbackQuery, state: FSMContex
 		
 		"📅 **VAQT BO'YICHA:**\n"
 		f"├ Bugun: {stats.get('today_reports', 0)} ta\n"
-		f"├ Hafta: {week_reports} ta\n"
-		f"└ Oy: {month_reports} ta\n\n"
+		f"├ Hafta: {stats.get('week_reports', 0)} ta\n"
+		f"└ Oy: {stats.get('month_reports', 0)} ta\n\n"
 		
 		"🏙️ **JOYLASHUV BO'YICHA:**\n"
 		f"├ Toshkent shahar: {stats.get('tashkent_reports', 0)} ta\n"
 		f"└ Boshqa hududlar: {stats.get('other_reports', 0)} ta\n\n"
 		
 		"🏢 **TIZIM:**\n"
-		f"├ Guruhlar: {len(await get_all_telegram_groups())} ta\n"
-		f"├ Google Sheets: {len(await get_all_google_sheets())} ta\n"
+		f"├ Guruhlar: {stats.get('groups_count', 0)} ta\n"
+		f"├ Google Sheets: {stats.get('sheets_count', 0)} ta\n"
 		f"├ Adminlar: {len(get_all_admins())} ta\n"
 		f"└ Tasdiqlovchilar: {len(get_all_approvers())} ta"
 	)
@@ -2470,8 +2445,7 @@ async def process_broadcast_message(message: Message, state: FSMContext):
 	await state.set_state(AdminStates.waiting_for_broadcast_confirmation)
 	
 	# Foydalanuvchilar sonini olish
-	all_users = await get_all_users()
-	user_count = len(all_users)
+	user_count = await get_total_users_count()
 	
 	confirmation_text = (
 		f"📢 **XABAR TASDIQLASH**\n\n"
@@ -2505,65 +2479,27 @@ async def confirm_broadcast(callback_query: CallbackQuery, state: FSMContext, bo
 		await state.clear()
 		return
 	
-	# Barcha foydalanuvchilarni olish
-	all_users = await get_all_users()
+	# Ikkinchi bosish shu vazifani qayta boshlamasligi uchun
+	await state.clear()
 	
+	total_users = await get_total_users_count()
 	await callback_query.message.edit_text(
-		f"📤 **XABAR YUBORILMOQDA...**\n\n"
-		f"Jami foydalanuvchilar: {len(all_users)} ta\n"
-		f"Yuborilgan: 0 ta\n"
-		f"Xatoliklar: 0 ta",
+		format_broadcast_progress(total_users, 0, 0),
 		parse_mode=ParseMode.MARKDOWN
 	)
 	
-	sent_count = 0
-	error_count = 0
-	
-	# Har bir foydalanuvchiga xabar yuborish
-	for user in all_users:
-		user_id, telegram_id, full_name, reg_date, is_blocked, group_name = user
-		
-		try:
-			await bot.send_message(
-				chat_id=telegram_id,
-				text=f"📢 **ADMIN XABARI**\n\n{broadcast_message}",
-				parse_mode=ParseMode.MARKDOWN
-			)
-			sent_count += 1
-			
-			# Har 10 ta xabardan keyin progress yangilash
-			if sent_count % 10 == 0:
-				try:
-					await callback_query.message.edit_text(
-						f"📤 **XABAR YUBORILMOQDA...**\n\n"
-						f"Jami foydalanuvchilar: {len(all_users)} ta\n"
-						f"Yuborilgan: {sent_count} ta\n"
-						f"Xatoliklar: {error_count} ta",
-						parse_mode=ParseMode.MARKDOWN
-					)
-				except:
-					pass
-		
-		except Exception as e:
-			error_count += 1
-			logging.error(f"Broadcast error for user {telegram_id}: {e}")
-	
-	# Yakuniy natija
-	final_text = (
-		f"✅ **XABAR YUBORISH YAKUNLANDI**\n\n"
-		f"📊 **NATIJALAR:**\n"
-		f"├ Jami foydalanuvchilar: {len(all_users)} ta\n"
-		f"├ ✅ Muvaffaqiyatli yuborilgan: {sent_count} ta\n"
-		f"├ ❌ Xatoliklar: {error_count} ta\n"
-		f"└ 📈 Muvaffaqiyat foizi: {round((sent_count / len(all_users)) * 100, 1)}%\n\n"
-		f"📅 **Yuborilgan vaqt:** {datetime.now().strftime('%d.%m.%Y %H:%M')}"
+	# Yuborish fonda: tezlik cheklovi bilan, progress DB da saqlanadi
+	job_id = await create_and_start_broadcast(
+		bot, callback_query.from_user.id, callback_query.message.chat.id,
+		callback_query.message.message_id, broadcast_message
 	)
+	if job_id is None:
+		await callback_query.message.edit_text("❌ Xabar yuborishni boshlashda xatolik yuz berdi.")
+		await callback_query.answer()
+		return
 	
-	await callback_query.message.edit_text(final_text, parse_mode=ParseMode.MARKDOWN)
-	await state.clear()
-	await callback_query.answer()
-	
-	logging.info(f"Broadcast completed by admin {callback_query.from_user.id}: {sent_count}/{len(all_users)} sent")
+	await callback_query.answer("📤 Xabar yuborish boshlandi")
+	logging.info(f"Broadcast job {job_id} started by admin {callback_query.from_user.id}")
 
 # ============== LOGGING ==============
 
@@ -16,9 +16,16 @@ from database import (
     check_full_name_exists, get_all_telegram_groups, check_user_blocked,
     get_current_password
 )
-from otchot import otchot_router
+from otchot import otchot_router, wait_report_pipelines
 from admin import admin_router
 from additional import additional_router
+from sheets_sync import sheets_sync_router, start_sheets_sync_jobs
+from sheets_archive import sheets_archive_router, start_sheets_archive_jobs
+from sheets_async import close_async_sheets_client
+from message_cleanup import flush_message_cleanup
+from fsm_storage import SQLiteStorage
+from photo_store import start_photo_store_jobs
+from broadcast import start_broadcast_jobs, stop_broadcast_jobs
 from keyboards import (
     get_main_menu_reply_keyboard, get_developer_contact_inline_keyboard,
     get_group_selection_keyboard
@@ -233,8 +240,12 @@ async def handle_my_sales(message: Message):
     
     response_text = f"Sizning bugungi sotuvlaringiz ({len(sales_today)} ta):\n\n"
     for i, sale in enumerate(sales_today):
-        contract_id, product_type = sale
+        contract_id, product_type, shipment_type, shipped_date = sale
         response_text += f"{i + 1}. Shartnoma ID: <code>{contract_id}</code>, Mahsulot: {product_type}\n"
+        if shipment_type or shipped_date:
+            response_text += f"    🚚 Jo'natildi: {shipment_type or '-'}, {shipped_date or '-'}\n"
+        else:
+            response_text += "    ⏳ Hali jo'natilmagan\n"
     
     await message.answer(response_text, parse_mode=ParseMode.HTML)
 
@@ -254,13 +265,23 @@ async def main():
     init_db()
     
     bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher()
+    # FSM holatlari SQLite da - qayta ishga tushganda yarim hisobotlar yo'qolmaydi
+    storage = SQLiteStorage()
+    dp = Dispatcher(storage=storage)
     
     # Routerlarni qo'shish
     dp.include_router(main_router)
     dp.include_router(otchot_router)
     dp.include_router(admin_router)
     dp.include_router(additional_router)
+    dp.include_router(sheets_sync_router)
+    dp.include_router(sheets_archive_router)
+    
+    # Fon vazifalari (Sheet solishtirish, arxiv, rasmlarni lokal saqlash)
+    background_tasks = start_sheets_sync_jobs(bot) + start_sheets_archive_jobs(bot) + start_photo_store_jobs(bot)
+    # Uzilib qolgan admin xabar yuborish vazifalari davom ettiriladi
+    background_tasks += start_broadcast_jobs(bot)
+    background_tasks.append(asyncio.create_task(storage.cleanup_loop(), name="fsm_cleanup"))
     
     logging.info("Bot ishga tushmoqda...")
     try:
@@ -268,6 +289,14 @@ async def main():
     except Exception as e:
         logging.error(f"Bot ishlayotganda xatolik: {e}")
     finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await stop_broadcast_jobs()
+        await wait_report_pipelines()
+        await flush_message_cleanup()
+        await close_async_sheets_client()
+        await storage.close()
         await bot.session.close()
         logging.info("Bot to'xtatildi.")
 
@@ -0,0 +1,235 @@
+"""
+broadcast.py - admin xabarini barcha foydalanuvchilarga yuborish vazifalari
+Qabul qiluvchilar DB dan sahifalab o'qiladi va bir nechta parallel yuboruvchi orqali yuboriladi.
+Barcha vazifalar uchun umumiy token bucket Telegram limitidan (~30 xabar/soniya) oshirmaydi,
+RetryAfter kelsa hamma yuborish ko'rsatilgan vaqtga to'xtaydi. Har bir sahifadan keyin cursor va
+hisoblagichlar broadcast_jobs jadvaliga yoziladi - bot qayta ishga tushsa vazifa davom etadi
+(uzilgan sahifa qaytadan yuboriladi). Progress xabari BROADCAST_PROGRESS_INTERVAL da bir marta yangilanadi.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.enums import ParseMode
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+)
+
+from database import (
+    create_broadcast_job, get_broadcast_job, get_running_broadcast_job_ids, get_broadcast_recipients,
+    update_broadcast_progress, get_total_users_count
+)
+
+# Umumiy yuborish tezligi (xabar/soniya) - Telegram limiti 30, biroz zaxira bilan
+BROADCAST_RATE_PER_SECOND = 25
+
+# Bir vaqtda kutilayotgan sendMessage so'rovlari
+BROADCAST_CONCURRENCY = 10
+
+# DB dan bir martada o'qiladigan qabul qiluvchilar (progress shu qadam bilan saqlanadi)
+BROADCAST_PAGE_SIZE = 100
+
+# Vaqtinchalik xatolarda (RetryAfter, tarmoq, 5xx) qayta urinishlar
+BROADCAST_MAX_RETRIES = 3
+
+# Progress xabarini yangilash oralig'i (soniya)
+BROADCAST_PROGRESS_INTERVAL = 3.0
+
+
+class TokenBucket:
+    """Umumiy tezlik cheklovchi: soniyasiga rate ta token, ko'pi bilan capacity ta yig'iladi"""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """RetryAfter - barcha yuborishlarni to'xtatish"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_bucket = TokenBucket(BROADCAST_RATE_PER_SECOND)
+
+# job id -> ishlayotgan vazifa
+_running_jobs: Dict[int, asyncio.Task] = {}
+
+
+def format_broadcast_text(message_text: str) -> str:
+    return f"📢 **ADMIN XABARI**\n\n{message_text}"
+
+
+def format_broadcast_progress(total: int, sent: int, failed: int) -> str:
+    return (
+        f"📤 **XABAR YUBORILMOQDA...**\n\n"
+        f"Jami foydalanuvchilar: {total} ta\n"
+        f"Yuborilgan: {sent} ta\n"
+        f"Xatoliklar: {failed} ta"
+    )
+
+
+def format_broadcast_result(total: int, sent: int, failed: int) -> str:
+    success_rate = round((sent / total) * 100, 1) if total else 0
+    return (
+        f"✅ **XABAR YUBORISH YAKUNLANDI**\n\n"
+        f"📊 **NATIJALAR:**\n"
+        f"├ Jami foydalanuvchilar: {total} ta\n"
+        f"├ ✅ Muvaffaqiyatli yuborilgan: {sent} ta\n"
+        f"├ ❌ Xatoliklar: {failed} ta\n"
+        f"└ 📈 Muvaffaqiyat foizi: {success_rate}%\n\n"
+        f"📅 **Yuborilgan vaqt:** {datetime.now().strftime('%d.%m.%Y %H:%M')}"
+    )
+
+
+async def _send_to_user(bot: Bot, telegram_id: int, text: str) -> bool:
+    for attempt in range(BROADCAST_MAX_RETRIES + 1):
+        await _bucket.acquire()
+        try:
+            await bot.send_message(chat_id=telegram_id, text=text, parse_mode=ParseMode.MARKDOWN)
+            return True
+        except TelegramRetryAfter as e:
+            logging.warning(f"⏳ Broadcast: RetryAfter {e.retry_after}s (user {telegram_id})")
+            _bucket.pause(e.retry_after)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Botni bloklagan yoki o'chirilgan akkaunt - qayta urinishdan foyda yo'q
+            logging.info(f"Broadcast: {telegram_id} ga yuborilmadi: {e}")
+            return False
+        except (TelegramNetworkError, TelegramServerError) as e:
+            logging.warning(f"Broadcast: {telegram_id} ga yuborishda vaqtinchalik xato: {e}")
+            await asyncio.sleep(2 ** attempt)
+        except Exception as e:
+            logging.error(f"Broadcast error for user {telegram_id}: {e}")
+            return False
+    return False
+
+
+async def _edit_progress(bot: Bot, chat_id: int, message_id: Optional[int], text: str):
+    if not message_id:
+        return
+    try:
+        await bot.edit_message_text(text=text, chat_id=chat_id, message_id=message_id,
+                                    parse_mode=ParseMode.MARKDOWN)
+    except Exception as e:
+        logging.debug(f"Broadcast progress xabarini yangilab bo'lmadi: {e}")
+
+
+async def run_broadcast_job(bot: Bot, job_id: int):
+    """Vazifani saqlangan cursordan oxirigacha bajarish"""
+    job = await get_broadcast_job(job_id)
+    if not job or job[5] != 'running':
+        return
+    _, admin_id, chat_id, progress_message_id, message_text, _, cursor, total, sent, failed = job
+    text = format_broadcast_text(message_text)
+    semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+    last_progress_at = time.monotonic()
+    started_at = time.monotonic()
+
+    async def send(telegram_id: int) -> bool:
+        async with semaphore:
+            return await _send_to_user(bot, telegram_id, text)
+
+    db_errors = 0
+    while True:
+        recipients = await get_broadcast_recipients(cursor, BROADCAST_PAGE_SIZE)
+        if recipients is None:
+            # DB vaqtincha band (database is locked) - vazifa 'running' holatida qoladi
+            db_errors += 1
+            if db_errors > BROADCAST_MAX_RETRIES:
+                logging.error(
+                    f"❌ Broadcast vazifasi {job_id}: qabul qiluvchilar o'qilmadi, "
+                    f"keyingi ishga tushishda saqlangan joydan davom etadi"
+                )
+                return
+            await asyncio.sleep(2 ** db_errors)
+            continue
+        db_errors = 0
+        if not recipients:
+            break
+
+        results = await asyncio.gather(*(send(telegram_id) for _, telegram_id in recipients))
+        sent += sum(results)
+        failed += len(results) - sum(results)
+        cursor = recipients[-1][0]
+        await update_broadcast_progress(job_id, cursor, sent, failed)
+
+        if time.monotonic() - last_progress_at >= BROADCAST_PROGRESS_INTERVAL:
+            last_progress_at = time.monotonic()
+            await _edit_progress(bot, chat_id, progress_message_id, format_broadcast_progress(total, sent, failed))
+
+    await update_broadcast_progress(job_id, cursor, sent, failed, status='done')
+    await _edit_progress(bot, chat_id, progress_message_id, format_broadcast_result(total, sent, failed))
+    logging.info(
+        f"Broadcast completed by admin {admin_id}: {sent}/{total} sent, {failed} failed "
+        f"({time.monotonic() - started_at:.1f}s)"
+    )
+
+
+def start_broadcast_job(bot: Bot, job_id: int) -> asyncio.Task:
+    """Vazifani fonda ishga tushirish (bir vazifa ikki marta ishlamaydi)"""
+    task = _running_jobs.get(job_id)
+    if task and not task.done():
+        return task
+
+    task = asyncio.create_task(run_broadcast_job(bot, job_id), name=f"broadcast_{job_id}")
+    _running_jobs[job_id] = task
+
+    def _on_done(finished: asyncio.Task):
+        _running_jobs.pop(job_id, None)
+        if not finished.cancelled() and finished.exception():
+            logging.error(f"❌ Broadcast vazifasi {job_id} xato bilan to'xtadi: {finished.exception()}")
+
+    task.add_done_callback(_on_done)
+    return task
+
+
+async def create_and_start_broadcast(bot: Bot, admin_id: int, chat_id: int, progress_message_id: int,
+                                     message_text: str) -> Optional[int]:
+    """admin.confirm_broadcast dan: vazifani DB ga yozib, fonda boshlash"""
+    total = await get_total_users_count()
+    job_id = await create_broadcast_job(admin_id, chat_id, progress_message_id, message_text, total)
+    if job_id is None:
+        return None
+    start_broadcast_job(bot, job_id)
+    return job_id
+
+
+async def resume_broadcast_jobs(bot: Bot):
+    """Bot to'xtaganda uzilib qolgan vazifalarni davom ettirish"""
+    for job_id in await get_running_broadcast_job_ids():
+        logging.info(f"📢 Broadcast vazifasi {job_id} davom ettirilmoqda")
+        start_broadcast_job(bot, job_id)
+
+
+def start_broadcast_jobs(bot: Bot) -> List[asyncio.Task]:
+    """bot.main dan chaqiriladi"""
+    return [asyncio.create_task(resume_broadcast_jobs(bot), name="broadcast_resume")]
+
+
+async def stop_broadcast_jobs():
+    """Ishlayotgan vazifalarni to'xtatish - keyingi ishga tushishda saqlangan cursordan davom etadi"""
+    tasks = list(_running_jobs.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
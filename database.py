@@ -1,6 +1,7 @@
 import sqlite3
 import logging
-from datetime import datetime, date
+import time
+from datetime import datetime, date, timedelta
 
 DB_NAME = 'bot_data.db'
 
@@ -32,6 +33,19 @@ def init_db():
 	except sqlite3.OperationalError:
 		pass
 	
+	# Ism bo'yicha qidirish uchun normallashtirilgan ism (SQLite lower() Unicode'ni to'liq qamramaydi)
+	try:
+		cursor.execute("ALTER TABLE users ADD COLUMN normalized_name TEXT")
+		logging.info("Added normalized_name column to users table")
+	except sqlite3.OperationalError:
+		pass
+	cursor.execute("SELECT id, full_name FROM users WHERE normalized_name IS NULL")
+	cursor.executemany(
+		"UPDATE users SET normalized_name = ? WHERE id = ?",
+		[(normalize_user_name(full_name), user_id) for user_id, full_name in cursor.fetchall()]
+	)
+	cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_normalized_name ON users (normalized_name)")
+	
 	cursor.execute('''
         CREATE TABLE IF NOT EXISTS sales_reports (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -75,6 +89,34 @@ def init_db():
 	except sqlite3.OperationalError:
 		pass
 	
+	# Sheet qatorini DB dan qayta tiklash uchun kerakli ustunlar
+	for column in ("seller_name", "delivery", "note"):
+		try:
+			cursor.execute(f"ALTER TABLE sales_reports ADD COLUMN {column} TEXT")
+			logging.info(f"Added {column} column to sales_reports table")
+		except sqlite3.OperationalError:
+			pass
+	
+	# Logistika xodimlari sheetda qo'lda to'ldiradigan ustunlar (sheets_sync orqali qaytariladi)
+	for column, column_type in (("shipment_type", "TEXT"), ("shipped_date", "TEXT"), ("shipping_updated_date", "TIMESTAMP")):
+		try:
+			cursor.execute(f"ALTER TABLE sales_reports ADD COLUMN {column} {column_type}")
+			logging.info(f"Added {column} column to sales_reports table")
+		except sqlite3.OperationalError:
+			pass
+	
+	# Mahsulot rasmini lokal saqlash uchun (photo_store.py): Telegram file_unique_id va eng kichik o'lcham file_id
+	for column in ("product_image_unique_id", "product_thumb_id"):
+		try:
+			cursor.execute(f"ALTER TABLE sales_reports ADD COLUMN {column} TEXT")
+			logging.info(f"Added {column} column to sales_reports table")
+		except sqlite3.OperationalError:
+			pass
+	
+	cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_reports_submission_date ON sales_reports (submission_date)")
+	cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_reports_contract_id ON sales_reports (contract_id)")
+	cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_reports_user ON sales_reports (user_telegram_id, submission_timestamp)")
+	
 	cursor.execute('''
         CREATE TABLE IF NOT EXISTS telegram_groups (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -127,6 +169,123 @@ def init_db():
 	
 	cursor.execute("INSERT OR IGNORE INTO bot_settings (setting_key, setting_value) VALUES ('admin_password', '2025')")
 	
+	# Shartnoma raqami -> (spreadsheet, worksheet, qator) indeksi
+	cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sheet_row_index (
+            contract_id TEXT NOT NULL,
+            spreadsheet_id TEXT NOT NULL,
+            worksheet_name TEXT NOT NULL,
+            row_index INTEGER NOT NULL,
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (spreadsheet_id, worksheet_name, contract_id)
+        )
+    ''')
+	
+	cursor.execute("CREATE INDEX IF NOT EXISTS idx_sheet_row_index_contract ON sheet_row_index (contract_id)")
+	
+	# Linklar worksheetining lokal nusxasi: normallashtirilgan URL spreadsheet ichida takrorlanmaydi
+	cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sheet_links (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            spreadsheet_id TEXT NOT NULL,
+            link_number INTEGER NOT NULL,
+            link TEXT NOT NULL,
+            normalized_link TEXT NOT NULL,
+            admin_name TEXT,
+            note TEXT,
+            created_date TEXT
+        )
+    ''')
+	cursor.execute(
+		"CREATE UNIQUE INDEX IF NOT EXISTS idx_sheet_links_normalized ON sheet_links (spreadsheet_id, normalized_link)"
+	)
+	
+	# Sheet -> DB sinxronlash: spreadsheet oxirgi marta o'zgargan vaqt (Drive modifiedTime)
+	cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sheet_pull_state (
+            spreadsheet_id TEXT PRIMARY KEY,
+            modified_time TEXT,
+            synced_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+	
+	# Oylik arxiv spreadsheetlari: manba spreadsheet + oy (YYYY-MM) -> arxiv spreadsheet
+	cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sheet_archives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_spreadsheet_id TEXT NOT NULL,
+            archive_month TEXT NOT NULL,
+            archive_spreadsheet_id TEXT NOT NULL,
+            worksheets_count INTEGER DEFAULT 0,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (source_spreadsheet_id, archive_month)
+        )
+    ''')
+	
+	# Hisobot yuborishning idempotentlik kaliti: bitta sotuvchi, shartnoma va kun - bitta yuborish
+	cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_submissions (
+            user_telegram_id INTEGER NOT NULL,
+            contract_id TEXT NOT NULL,
+            submission_day TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            report_id INTEGER,
+            group_message_id INTEGER,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_telegram_id, contract_id, submission_day)
+        )
+    ''')
+	
+	# FSM holatlari (fsm_storage.SQLiteStorage) - bot qayta ishga tushsa ham saqlanadi
+	cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            storage_key TEXT PRIMARY KEY,
+            state TEXT,
+            data BLOB,
+            updated_at REAL NOT NULL
+        )
+    ''')
+	cursor.execute("CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at ON fsm_states (updated_at)")
+	
+	# Lokal rasm ombori (photo_store.py): file_unique_id -> PHOTO_STORE_DIR ga nisbatan yo'llar
+	cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stored_photos (
+            file_unique_id TEXT PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            thumb_path TEXT,
+            file_size INTEGER,
+            stored_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+	# Yuklab bo'lmagan rasmlar (20 MB dan katta, eskirgan file_id) - backfill ularni qayta-qayta olmaydi
+	cursor.execute('''
+        CREATE TABLE IF NOT EXISTS photo_store_failures (
+            file_id TEXT PRIMARY KEY,
+            attempts INTEGER NOT NULL DEFAULT 1,
+            last_error TEXT,
+            failed_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+	
+	# Admin xabar yuborish vazifalari (broadcast.py) - cursor: oxirgi ishlangan users.id
+	cursor.execute('''
+        CREATE TABLE IF NOT EXISTS broadcast_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            progress_message_id INTEGER,
+            message_text TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            cursor INTEGER NOT NULL DEFAULT 0,
+            total_count INTEGER NOT NULL DEFAULT 0,
+            sent_count INTEGER NOT NULL DEFAULT 0,
+            failed_count INTEGER NOT NULL DEFAULT 0,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_date TIMESTAMP
+        )
+    ''')
+	
 	conn.commit()
 	conn.close()
 	logging.info(f"Database '{DB_NAME}' initialized successfully with all tables (including is_tashkent).")
@@ -136,10 +295,11 @@ async def add_user_to_db(telegram_id: int, full_name: str, assigned_group_id: in
 	cursor = conn.cursor()
 	try:
 		cursor.execute(
-			"INSERT INTO users (telegram_id, full_name, assigned_group_id) VALUES (?, ?, ?)",
-			(telegram_id, full_name, assigned_group_id)
+			"INSERT INTO users (telegram_id, full_name, assigned_group_id, normalized_name) VALUES (?, ?, ?, ?)",
+			(telegram_id, full_name, assigned_group_id, normalize_user_name(full_name))
 		)
 		conn.commit()
+		_index_user_name(telegram_id, full_name)
 		logging.info(f"User {telegram_id} added to database with group {assigned_group_id}.")
 	except sqlite3.IntegrityError:
 		logging.warning(f"User {telegram_id} already exists in database.")
@@ -192,6 +352,7 @@ async def block_user(telegram_id: int) -> bool:
 		cursor.execute("UPDATE users SET is_blocked = 1 WHERE telegram_id = ?", (telegram_id,))
 		updated = cursor.rowcount > 0
 		conn.commit()
+		invalidate_seller_profile(telegram_id)
 		if updated:
 			logging.info(f"User {telegram_id} blocked successfully.")
 		return updated
@@ -209,6 +370,7 @@ async def unblock_user(telegram_id: int) -> bool:
 		cursor.execute("UPDATE users SET is_blocked = 0 WHERE telegram_id = ?", (telegram_id,))
 		updated = cursor.rowcount > 0
 		conn.commit()
+		invalidate_seller_profile(telegram_id)
 		if updated:
 			logging.info(f"User {telegram_id} unblocked successfully.")
 		return updated
@@ -290,8 +452,9 @@ async def add_sales_report(user_id: int, report_data: dict, group_msg_id: int =
             INSERT INTO sales_reports (
                 user_telegram_id, client_name, phone_number, additional_phone_number,
                 contract_id, contract_amount, product_type, client_location, product_image_id,
-                submission_date, group_message_id, google_sheet_id, is_tashkent
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                submission_date, group_message_id, google_sheet_id, is_tashkent,
+                seller_name, delivery, note, product_image_unique_id, product_thumb_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
 			user_id,
 			report_data.get('client_name'),
@@ -305,9 +468,15 @@ async def add_sales_report(user_id: int, report_data: dict, group_msg_id: int =
 			date.today(),
 			group_msg_id,
 			google_sheet_id,
-			is_tashkent
+			is_tashkent,
+			report_data.get('seller_name'),
+			report_data.get('delivery'),
+			report_data.get('note'),
+			report_data.get('product_image_unique_id'),
+			report_data.get('product_thumb_id')
 		))
 		conn.commit()
+		invalidate_seller_profile(user_id)
 		logging.info(f"Sales report for user {user_id} added to database (is_tashkent={is_tashkent}).")
 		return cursor.lastrowid
 	except Exception as e:
@@ -316,13 +485,77 @@ async def add_sales_report(user_id: int, report_data: dict, group_msg_id: int =
 	finally:
 		conn.close()
 
+async def add_sales_reports_batch(user_id: int, reports: list, google_sheet_id: int = None,
+		submission_day: str = None) -> list | None:
+	"""
+	Bir nechta hisobotni bitta tranzaksiyada saqlash. reports: [(report_data, group_msg_id), ...]
+	submission_day berilsa - report_submissions yozuvlari ham shu tranzaksiyada 'done' qilinadi.
+	Qaytaradi: report id lar ro'yxati (reports tartibida) yoki xatoda None
+	"""
+	if not reports:
+		return []
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		report_ids = []
+		for report_data, group_msg_id in reports:
+			cursor.execute("""
+                INSERT INTO sales_reports (
+                    user_telegram_id, client_name, phone_number, additional_phone_number,
+                    contract_id, contract_amount, product_type, client_location, product_image_id,
+                    submission_date, group_message_id, google_sheet_id, is_tashkent,
+                    seller_name, delivery, note, product_image_unique_id, product_thumb_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+				user_id,
+				report_data.get('client_name'),
+				report_data.get('phone_number'),
+				report_data.get('additional_phone_number', 'Mavjud emas'),
+				report_data.get('contract_id'),
+				report_data.get('contract_amount'),
+				report_data.get('product_type'),
+				report_data.get('client_location'),
+				report_data.get('product_image_id'),
+				date.today(),
+				group_msg_id,
+				google_sheet_id,
+				1 if report_data.get('is_tashkent', False) else 0,
+				report_data.get('seller_name'),
+				report_data.get('delivery'),
+				report_data.get('note'),
+				report_data.get('product_image_unique_id'),
+				report_data.get('product_thumb_id')
+			))
+			report_ids.append(cursor.lastrowid)
+		
+		if submission_day:
+			cursor.executemany("""
+                UPDATE report_submissions SET status = 'done', report_id = ?, group_message_id = ?
+                WHERE user_telegram_id = ? AND contract_id = ? AND submission_day = ?
+            """, [
+				(report_id, group_msg_id, user_id, str(report_data.get('contract_id') or '').strip(), submission_day)
+				for report_id, (report_data, group_msg_id) in zip(report_ids, reports)
+			])
+		
+		conn.commit()
+		invalidate_seller_profile(user_id)
+		logging.info(f"{len(report_ids)} sales reports for user {user_id} added to database in one transaction.")
+		return report_ids
+	except Exception as e:
+		logging.error(f"Error adding sales reports batch to DB: {e}")
+		conn.rollback()
+		return None
+	finally:
+		conn.close()
+
 async def get_todays_sales_by_user(user_telegram_id: int) -> list:
 	conn = sqlite3.connect(DB_NAME)
 	cursor = conn.cursor()
 	today_str = date.today().isoformat()
 	try:
 		cursor.execute(
-			"SELECT contract_id, product_type FROM sales_reports WHERE user_telegram_id = ? AND submission_date = ?",
+			"SELECT contract_id, product_type, shipment_type, shipped_date FROM sales_reports "
+			"WHERE user_telegram_id = ? AND submission_date = ?",
 			(user_telegram_id, today_str)
 		)
 		sales = cursor.fetchall()
@@ -341,9 +574,13 @@ async def update_report_status_in_db(group_message_id: int, status: str, helper_
             UPDATE sales_reports
             SET status = ?, confirmed_by_helper_id = ?, confirmation_timestamp = ?
             WHERE group_message_id = ?
+            RETURNING user_telegram_id
         """, (status, helper_id, datetime.now(), group_message_id))
+		seller_ids = {row[0] for row in cursor.fetchall()}
 		conn.commit()
-		if cursor.rowcount > 0:
+		for seller_id in seller_ids:
+			invalidate_seller_profile(seller_id)
+		if seller_ids:
 			logging.info(f"Report status updated to '{status}' for group_message_id {group_message_id}.")
 			return True
 		else:
@@ -380,6 +617,8 @@ async def delete_user_from_db(telegram_id: int) -> bool:
 		cursor.execute("DELETE FROM users WHERE telegram_id = ?", (telegram_id,))
 		user_deleted = cursor.rowcount > 0
 		conn.commit()
+		_unindex_user_name(telegram_id)
+		invalidate_seller_profile(telegram_id)
 		if user_deleted:
 			logging.info(f"User {telegram_id} deleted from database.")
 		return user_deleted
@@ -407,9 +646,12 @@ async def delete_sales_report(report_id: int) -> bool:
 	conn = sqlite3.connect(DB_NAME)
 	cursor = conn.cursor()
 	try:
-		cursor.execute("DELETE FROM sales_reports WHERE id = ?", (report_id,))
-		deleted = cursor.rowcount > 0
+		cursor.execute("DELETE FROM sales_reports WHERE id = ? RETURNING user_telegram_id", (report_id,))
+		seller_ids = {row[0] for row in cursor.fetchall()}
+		deleted = bool(seller_ids)
 		conn.commit()
+		for seller_id in seller_ids:
+			invalidate_seller_profile(seller_id)
 		if deleted:
 			logging.info(f"Sales report {report_id} deleted from database.")
 		return deleted
@@ -488,6 +730,7 @@ async def delete_telegram_group(group_id: int) -> bool:
 		cursor.execute("DELETE FROM telegram_groups WHERE group_id = ?", (group_id,))
 		deleted = cursor.rowcount > 0
 		conn.commit()
+		invalidate_seller_profile()
 		if deleted:
 			logging.info(f"Group {group_id} deleted from database.")
 		return deleted
@@ -646,9 +889,15 @@ async def update_user_name(telegram_id: int, new_name: str) -> bool:
 	conn = sqlite3.connect(DB_NAME)
 	cursor = conn.cursor()
 	try:
-		cursor.execute("UPDATE users SET full_name = ? WHERE telegram_id = ?", (new_name, telegram_id))
+		cursor.execute(
+			"UPDATE users SET full_name = ?, normalized_name = ? WHERE telegram_id = ?",
+			(new_name, normalize_user_name(new_name), telegram_id)
+		)
 		updated = cursor.rowcount > 0
 		conn.commit()
+		if updated:
+			_index_user_name(telegram_id, new_name)
+		invalidate_seller_profile(telegram_id)
 		if updated:
 			logging.info(f"User {telegram_id} name updated to '{new_name}'.")
 		return updated
@@ -666,6 +915,7 @@ async def update_user_group(telegram_id: int, group_id: int) -> bool:
 		cursor.execute("UPDATE users SET assigned_group_id = ? WHERE telegram_id = ?", (group_id, telegram_id))
 		updated = cursor.rowcount > 0
 		conn.commit()
+		invalidate_seller_profile(telegram_id)
 		if updated:
 			logging.info(f"User {telegram_id} group updated to {group_id}.")
 		return updated
@@ -820,6 +1070,38 @@ async def get_current_password() -> str:
 	finally:
 		conn.close()
 
+def get_setting(setting_key: str, default: str = None) -> str | None:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("SELECT setting_value FROM bot_settings WHERE setting_key = ?", (setting_key,))
+		result = cursor.fetchone()
+		return result[0] if result else default
+	except Exception as e:
+		logging.error(f"Error getting setting {setting_key}: {e}")
+		return default
+	finally:
+		conn.close()
+
+def set_setting(setting_key: str, setting_value: str) -> bool:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            INSERT INTO bot_settings (setting_key, setting_value, updated_date) VALUES (?, ?, ?)
+            ON CONFLICT (setting_key) DO UPDATE SET
+                setting_value = excluded.setting_value,
+                updated_date = excluded.updated_date
+        """, (setting_key, str(setting_value), datetime.now()))
+		conn.commit()
+		return True
+	except Exception as e:
+		logging.error(f"Error saving setting {setting_key}: {e}")
+		conn.rollback()
+		return False
+	finally:
+		conn.close()
+
 async def update_password(new_password: str) -> bool:
 	conn = sqlite3.connect(DB_NAME)
 	cursor = conn.cursor()
@@ -889,3 +1171,1068 @@ async def get_viloyat_reports(limit: int = None) -> list:
 		return []
 	finally:
 		conn.close()
+
+# ==================== ISM BO'YICHA QIDIRISH ====================
+
+# normallashtirilgan ism -> telegram_id va teskarisi. Birinchi qidiruvda yuklanadi, keyin
+# add_user_to_db / update_user_name / delete_user_from_db orqali yangilanib boradi
+_user_ids_by_name: dict | None = None
+_user_names_by_id: dict = {}
+
+def normalize_user_name(full_name: str) -> str:
+	"""Ismni solishtirish uchun: ortiqcha bo'shliqlarsiz va casefold"""
+	return " ".join((full_name or "").split()).casefold()
+
+def _load_user_name_index():
+	global _user_ids_by_name
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		# Bir xil ismlilardan eng oxirgi ro'yxatdan o'tgani qoladi
+		cursor.execute("SELECT telegram_id, normalized_name FROM users ORDER BY registration_date, id")
+		ids_by_name = {}
+		names_by_id = {}
+		for telegram_id, normalized_name in cursor.fetchall():
+			ids_by_name[normalized_name] = telegram_id
+			names_by_id[telegram_id] = normalized_name
+		_user_names_by_id.clear()
+		_user_names_by_id.update(names_by_id)
+		_user_ids_by_name = ids_by_name
+	finally:
+		conn.close()
+
+def _index_user_name(telegram_id: int, full_name: str):
+	if _user_ids_by_name is None:
+		return
+	_unindex_user_name(telegram_id)
+	normalized_name = normalize_user_name(full_name)
+	_user_ids_by_name[normalized_name] = telegram_id
+	_user_names_by_id[telegram_id] = normalized_name
+
+def _unindex_user_name(telegram_id: int):
+	"""Foydalanuvchini indeksdan olib tashlash (shu ismli boshqasi bo'lsa - DB dan topiladi)"""
+	if _user_ids_by_name is None:
+		return
+	normalized_name = _user_names_by_id.pop(telegram_id, None)
+	if normalized_name is not None and _user_ids_by_name.get(normalized_name) == telegram_id:
+		del _user_ids_by_name[normalized_name]
+
+async def get_telegram_id_by_name(full_name: str) -> int | None:
+	"""Ism bo'yicha telegram_id (katta-kichik harf va bo'shliqlar farqi hisobga olinmaydi)"""
+	normalized_name = normalize_user_name(full_name)
+	try:
+		if _user_ids_by_name is None:
+			_load_user_name_index()
+		telegram_id = _user_ids_by_name.get(normalized_name)
+		if telegram_id is not None:
+			return telegram_id
+	except Exception as e:
+		logging.error(f"Error loading user name index: {e}")
+	
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            SELECT telegram_id FROM users
+            WHERE normalized_name = ?
+            ORDER BY registration_date DESC, id DESC
+            LIMIT 1
+        """, (normalized_name,))
+		result = cursor.fetchone()
+		if result and _user_ids_by_name is not None:
+			_user_ids_by_name[normalized_name] = result[0]
+			_user_names_by_id[result[0]] = normalized_name
+		return result[0] if result else None
+	except Exception as e:
+		logging.error(f"Error finding user by name '{full_name}': {e}")
+		return None
+	finally:
+		conn.close()
+
+# ==================== SOTUVCHI PROFILI ====================
+
+# Profil bilan birga qaytariladigan so'nggi hisobotlar soni
+SELLER_PROFILE_RECENT_LIMIT = 10
+
+# telegram_id -> profil. Hisobot qo'shilganda/o'chirilganda, holati yoki foydalanuvchi o'zgarganda tozalanadi
+_seller_profile_cache: dict = {}
+# Har bir tozalashda oshadi - so'rov paytida tozalangan eski natija keshga yozilmaydi
+_seller_profile_generation = 0
+
+def invalidate_seller_profile(telegram_id: int = None):
+	"""Sotuvchi profil keshini tozalash (telegram_id berilmasa - barchasi)"""
+	global _seller_profile_generation
+	_seller_profile_generation += 1
+	if telegram_id is None:
+		_seller_profile_cache.clear()
+	else:
+		_seller_profile_cache.pop(telegram_id, None)
+
+async def get_seller_profile(telegram_id: int) -> dict | None:
+	"""
+	Sotuvchi profili bitta so'rovda: foydalanuvchi va guruh, butun tarix bo'yicha holatlar soni,
+	so'nggi faollik va so'nggi SELLER_PROFILE_RECENT_LIMIT ta hisobot (sales_reports qatorlari)
+	"""
+	cached = _seller_profile_cache.get(telegram_id)
+	if cached is not None:
+		return cached
+	
+	generation = _seller_profile_generation
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            WITH stats AS (
+                SELECT COUNT(*) AS total_reports,
+                       COALESCE(SUM(status = 'confirmed'), 0) AS confirmed_count,
+                       COALESCE(SUM(status = 'pending'), 0) AS pending_count,
+                       COALESCE(SUM(status = 'rejected'), 0) AS rejected_count,
+                       MAX(submission_timestamp) AS last_submission_timestamp,
+                       MAX(submission_date) AS last_submission_date
+                FROM sales_reports
+                WHERE user_telegram_id = :telegram_id
+            ),
+            recent AS (
+                SELECT * FROM sales_reports
+                WHERE user_telegram_id = :telegram_id
+                ORDER BY submission_timestamp DESC, id DESC
+                LIMIT :recent_limit
+            )
+            SELECT u.id, u.telegram_id, u.full_name, u.registration_date,
+                   COALESCE(u.is_blocked, 0),
+                   COALESCE(tg.group_name, 'Guruh tayinlanmagan'),
+                   stats.*, recent.*
+            FROM users u
+            LEFT JOIN telegram_groups tg ON u.assigned_group_id = tg.group_id
+            CROSS JOIN stats
+            LEFT JOIN recent ON 1
+            WHERE u.telegram_id = :telegram_id
+            ORDER BY recent.submission_timestamp DESC, recent.id DESC
+        """, {'telegram_id': telegram_id, 'recent_limit': SELLER_PROFILE_RECENT_LIMIT})
+		rows = cursor.fetchall()
+		if not rows:
+			return None
+		
+		first = rows[0]
+		profile = {
+			'user_id': first[0],
+			'telegram_id': first[1],
+			'full_name': first[2],
+			'registration_date': first[3],
+			'is_blocked': first[4],
+			'group_name': first[5],
+			'total_reports': first[6],
+			'confirmed_count': first[7],
+			'pending_count': first[8],
+			'rejected_count': first[9],
+			'last_submission_timestamp': first[10],
+			'last_submission_date': first[11],
+			'recent_reports': [row[12:] for row in rows if row[12] is not None]
+		}
+		if generation == _seller_profile_generation:
+			_seller_profile_cache[telegram_id] = profile
+		return profile
+	except Exception as e:
+		logging.error(f"Error fetching seller profile for {telegram_id}: {e}")
+		return None
+	finally:
+		conn.close()
+
+# ==================== ANALITIKA ====================
+
+# Umumiy analitika shuncha soniya keshda turadi - admin panelni qayta-qayta ochish DB ni yuklamaydi
+ANALYTICS_CACHE_TTL_SECONDS = 60
+
+# (muddati tugash vaqti, kun, snapshot)
+_analytics_cache: tuple | None = None
+
+async def get_analytics_snapshot() -> dict:
+	"""
+	Admin panel umumiy analitikasi bitta so'rovda: foydalanuvchilar (faol/bloklangan), guruhlar,
+	faol sheetlar va hisobotlar (holat, bugun/hafta/oy, hudud bo'yicha)
+	"""
+	global _analytics_cache
+	today = date.today()
+	if _analytics_cache and _analytics_cache[0] > time.monotonic() and _analytics_cache[1] == today:
+		return _analytics_cache[2]
+	
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM users),
+                (SELECT COUNT(*) FROM users WHERE is_blocked = 1),
+                (SELECT COUNT(*) FROM telegram_groups),
+                (SELECT COUNT(*) FROM google_sheets WHERE is_active = 1),
+                COUNT(*),
+                COALESCE(SUM(status = 'confirmed'), 0),
+                COALESCE(SUM(status = 'pending'), 0),
+                COALESCE(SUM(submission_date = ?), 0),
+                COALESCE(SUM(submission_date BETWEEN ? AND ?), 0),
+                COALESCE(SUM(submission_date BETWEEN ? AND ?), 0),
+                COALESCE(SUM(is_tashkent = 1), 0)
+            FROM sales_reports
+        """, (
+			today.isoformat(),
+			(today - timedelta(days=7)).isoformat(), today.isoformat(),
+			(today - timedelta(days=30)).isoformat(), today.isoformat()
+		))
+		(total_users, blocked_users, groups_count, sheets_count, total_reports, confirmed_reports,
+		 pending_reports, today_reports, week_reports, month_reports, tashkent_reports) = cursor.fetchone()
+		
+		snapshot = {
+			'total_users': total_users,
+			'active_users': total_users - blocked_users,
+			'blocked_users': blocked_users,
+			'groups_count': groups_count,
+			'sheets_count': sheets_count,
+			'total_reports': total_reports,
+			'confirmed_reports': confirmed_reports,
+			'pending_reports': pending_reports,
+			'confirmation_rate': round(confirmed_reports / total_reports * 100, 1) if total_reports else 0,
+			'today_reports': today_reports,
+			'week_reports': week_reports,
+			'month_reports': month_reports,
+			'tashkent_reports': tashkent_reports,
+			'other_reports': total_reports - tashkent_reports
+		}
+		_analytics_cache = (time.monotonic() + ANALYTICS_CACHE_TTL_SECONDS, today, snapshot)
+		return snapshot
+	except Exception as e:
+		logging.error(f"Error getting analytics snapshot: {e}")
+		return {}
+	finally:
+		conn.close()
+
+# ==================== XABAR YUBORISH (BROADCAST) ====================
+
+async def create_broadcast_job(admin_id: int, chat_id: int, progress_message_id: int, message_text: str,
+		total_count: int) -> int | None:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            INSERT INTO broadcast_jobs (admin_id, chat_id, progress_message_id, message_text, total_count)
+            VALUES (?, ?, ?, ?, ?)
+        """, (admin_id, chat_id, progress_message_id, message_text, total_count))
+		conn.commit()
+		logging.info(f"Broadcast job {cursor.lastrowid} created by admin {admin_id} for {total_count} users.")
+		return cursor.lastrowid
+	except Exception as e:
+		logging.error(f"Error creating broadcast job: {e}")
+		return None
+	finally:
+		conn.close()
+
+async def get_broadcast_job(job_id: int) -> tuple | None:
+	"""Qaytaradi: (id, admin_id, chat_id, progress_message_id, message_text, status, cursor,
+	total_count, sent_count, failed_count) yoki None"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            SELECT id, admin_id, chat_id, progress_message_id, message_text, status, cursor,
+                   total_count, sent_count, failed_count
+            FROM broadcast_jobs WHERE id = ?
+        """, (job_id,))
+		return cursor.fetchone()
+	except Exception as e:
+		logging.error(f"Error fetching broadcast job {job_id}: {e}")
+		return None
+	finally:
+		conn.close()
+
+async def get_running_broadcast_job_ids() -> list:
+	"""Tugallanmagan (bot to'xtaganda uzilib qolgan) vazifalar"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("SELECT id FROM broadcast_jobs WHERE status = 'running' ORDER BY id")
+		return [row[0] for row in cursor.fetchall()]
+	except Exception as e:
+		logging.error(f"Error fetching running broadcast jobs: {e}")
+		return []
+	finally:
+		conn.close()
+
+async def get_broadcast_recipients(after_user_id: int, limit: int) -> list | None:
+	"""
+	users.id bo'yicha keyingi sahifa: [(id, telegram_id), ...].
+	Xatoda None - bo'sh ro'yxat esa ro'yxat tugaganini bildiradi
+	"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute(
+			"SELECT id, telegram_id FROM users WHERE id > ? ORDER BY id LIMIT ?", (after_user_id, limit)
+		)
+		return cursor.fetchall()
+	except Exception as e:
+		logging.error(f"Error fetching broadcast recipients: {e}")
+		return None
+	finally:
+		conn.close()
+
+async def update_broadcast_progress(job_id: int, cursor_user_id: int, sent_count: int, failed_count: int,
+		status: str = 'running') -> bool:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            UPDATE broadcast_jobs
+            SET cursor = ?, sent_count = ?, failed_count = ?, status = ?,
+                finished_date = CASE WHEN ? = 'running' THEN NULL ELSE CURRENT_TIMESTAMP END
+            WHERE id = ?
+        """, (cursor_user_id, sent_count, failed_count, status, status, job_id))
+		conn.commit()
+		return True
+	except Exception as e:
+		logging.error(f"Error updating broadcast job {job_id}: {e}")
+		return False
+	finally:
+		conn.close()
+
+# ==================== FSM HOLATLARI ====================
+
+async def load_fsm_record(storage_key: str) -> tuple | None:
+	"""Qaytaradi: (state, data, updated_at) yoki None"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("SELECT state, data, updated_at FROM fsm_states WHERE storage_key = ?", (storage_key,))
+		return cursor.fetchone()
+	except Exception as e:
+		logging.error(f"Error loading FSM state {storage_key}: {e}")
+		return None
+	finally:
+		conn.close()
+
+async def save_fsm_record(storage_key: str, state: str | None, data: bytes | None, updated_at: float) -> bool:
+	"""Holat va ma'lumotni yozish; ikkalasi ham bo'sh bo'lsa - yozuv o'chiriladi"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		if state is None and data is None:
+			cursor.execute("DELETE FROM fsm_states WHERE storage_key = ?", (storage_key,))
+		else:
+			cursor.execute("""
+                INSERT INTO fsm_states (storage_key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (storage_key) DO UPDATE SET
+                    state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+            """, (storage_key, state, data, updated_at))
+		conn.commit()
+		return True
+	except Exception as e:
+		logging.error(f"Error saving FSM state {storage_key}: {e}")
+		conn.rollback()
+		return False
+	finally:
+		conn.close()
+
+async def delete_expired_fsm_records(older_than: float) -> int:
+	"""updated_at dan beri o'zgarmagan (tashlab ketilgan) holatlarni o'chirish"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("DELETE FROM fsm_states WHERE updated_at < ?", (older_than,))
+		conn.commit()
+		return cursor.rowcount
+	except Exception as e:
+		logging.error(f"Error deleting expired FSM states: {e}")
+		conn.rollback()
+		return 0
+	finally:
+		conn.close()
+
+# ==================== LOKAL RASM OMBORI ====================
+
+async def get_unstored_report_photos(limit: int, max_attempts: int) -> list:
+	"""
+	Hali lokal omborga tushmagan hisobot rasmlari (eski hisobotlarda unique_id bo'lmasligi mumkin).
+	max_attempts marta yuklab bo'lmagan rasmlar o'tkazib yuboriladi
+	"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            SELECT sr.product_image_id, MAX(sr.product_image_unique_id), MAX(sr.product_thumb_id)
+            FROM sales_reports sr
+            LEFT JOIN stored_photos sp ON sp.file_unique_id = sr.product_image_unique_id
+            LEFT JOIN photo_store_failures pf ON pf.file_id = sr.product_image_id
+            WHERE sr.product_image_id IS NOT NULL AND sp.file_unique_id IS NULL
+              AND (pf.attempts IS NULL OR pf.attempts < ?)
+            GROUP BY sr.product_image_id
+            LIMIT ?
+        """, (max_attempts, limit))
+		return cursor.fetchall()
+	except Exception as e:
+		logging.error(f"Error fetching unstored report photos: {e}")
+		return []
+	finally:
+		conn.close()
+
+async def get_stored_photo(file_unique_id: str) -> tuple | None:
+	"""Qaytaradi: (file_path, thumb_path, file_size) yoki None"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute(
+			"SELECT file_path, thumb_path, file_size FROM stored_photos WHERE file_unique_id = ?", (file_unique_id,)
+		)
+		return cursor.fetchone()
+	except Exception as e:
+		logging.error(f"Error fetching stored photo {file_unique_id}: {e}")
+		return None
+	finally:
+		conn.close()
+
+def _link_report_photos(cursor, file_unique_id: str, file_id: str) -> int:
+	"""unique_id siz eski hisobotlarga shu file_id bo'yicha unique_id yozish (backfill ularni qayta olmasligi uchun)"""
+	cursor.execute("""
+        UPDATE sales_reports SET product_image_unique_id = ?
+        WHERE product_image_id = ? AND product_image_unique_id IS NULL
+    """, (file_unique_id, file_id))
+	return cursor.rowcount
+
+async def link_stored_photo(file_unique_id: str, file_id: str) -> bool:
+	"""Rasm allaqachon saqlangan (boshqa file_id bilan) - faqat hisobotlarni unique_id ga bog'lash"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		backfilled = _link_report_photos(cursor, file_unique_id, file_id)
+		conn.commit()
+		if backfilled:
+			invalidate_seller_profile()
+		return True
+	except Exception as e:
+		logging.error(f"Error linking stored photo {file_unique_id}: {e}")
+		conn.rollback()
+		return False
+	finally:
+		conn.close()
+
+async def save_stored_photo(file_unique_id: str, file_id: str, file_path: str, thumb_path: str | None,
+		file_size: int) -> bool:
+	"""Saqlangan rasmni yozish; unique_id siz eski hisobotlar shu file_id bo'yicha to'ldiriladi"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            INSERT INTO stored_photos (file_unique_id, file_path, thumb_path, file_size) VALUES (?, ?, ?, ?)
+            ON CONFLICT (file_unique_id) DO UPDATE SET
+                file_path = excluded.file_path,
+                thumb_path = COALESCE(excluded.thumb_path, stored_photos.thumb_path),
+                file_size = excluded.file_size
+        """, (file_unique_id, file_path, thumb_path, file_size))
+		backfilled = _link_report_photos(cursor, file_unique_id, file_id)
+		conn.commit()
+		if backfilled:
+			# Profil keshidagi recent_reports qatorlari ham o'zgardi
+			invalidate_seller_profile()
+		return True
+	except Exception as e:
+		logging.error(f"Error saving stored photo {file_unique_id}: {e}")
+		conn.rollback()
+		return False
+	finally:
+		conn.close()
+
+async def record_photo_store_failure(file_id: str, error: str) -> bool:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            INSERT INTO photo_store_failures (file_id, last_error) VALUES (?, ?)
+            ON CONFLICT (file_id) DO UPDATE SET
+                attempts = photo_store_failures.attempts + 1,
+                last_error = excluded.last_error,
+                failed_date = CURRENT_TIMESTAMP
+        """, (file_id, error[:500]))
+		conn.commit()
+		return True
+	except Exception as e:
+		logging.error(f"Error recording photo store failure {file_id}: {e}")
+		return False
+	finally:
+		conn.close()
+
+# ==================== HISOBOT YUBORISH IDEMPOTENTLIGI ====================
+
+# Shu daqiqadan eski 'pending' yozuv (jarayon yarim yo'lda to'xtagan) qayta egallanishi mumkin
+SUBMISSION_PENDING_TIMEOUT_MINUTES = 10
+
+async def claim_report_submission(user_id: int, contract_id: str, submission_day: str) -> tuple:
+	"""
+	Hisobot yuborishni egallash. Qaytaradi: (egallandi, holat, report_id)
+	Egallanmasa - shu kalit bilan avvalgi yuborish ('pending' yoki 'done') holati qaytadi
+	"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            INSERT INTO report_submissions (user_telegram_id, contract_id, submission_day, status, created_date)
+            VALUES (?, ?, ?, 'pending', CURRENT_TIMESTAMP)
+            ON CONFLICT (user_telegram_id, contract_id, submission_day) DO UPDATE SET
+                status = 'pending',
+                created_date = CURRENT_TIMESTAMP
+            WHERE report_submissions.status = 'pending'
+              AND report_submissions.created_date < datetime('now', ?)
+        """, (user_id, contract_id, submission_day, f"-{SUBMISSION_PENDING_TIMEOUT_MINUTES} minutes"))
+		claimed = cursor.rowcount > 0
+		conn.commit()
+		if claimed:
+			return True, 'pending', None
+		
+		cursor.execute("""
+            SELECT status, report_id FROM report_submissions
+            WHERE user_telegram_id = ? AND contract_id = ? AND submission_day = ?
+        """, (user_id, contract_id, submission_day))
+		result = cursor.fetchone()
+		return (False, result[0], result[1]) if result else (False, 'pending', None)
+	except Exception as e:
+		logging.error(f"Error claiming report submission {contract_id} for user {user_id}: {e}")
+		conn.rollback()
+		# DB xatosida yuborishni to'xtatmaslik - avvalgi xatti-harakat
+		return True, 'pending', None
+	finally:
+		conn.close()
+
+async def claim_report_submissions(user_id: int, contract_ids: list, submission_day: str) -> dict:
+	"""
+	Bir nechta hisobotni bitta ulanishda egallash (paket yuborish uchun)
+	Qaytaradi: contract_id -> (egallandi, holat)
+	"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		results = {}
+		for contract_id in contract_ids:
+			cursor.execute("""
+                INSERT INTO report_submissions (user_telegram_id, contract_id, submission_day, status, created_date)
+                VALUES (?, ?, ?, 'pending', CURRENT_TIMESTAMP)
+                ON CONFLICT (user_telegram_id, contract_id, submission_day) DO UPDATE SET
+                    status = 'pending',
+                    created_date = CURRENT_TIMESTAMP
+                WHERE report_submissions.status = 'pending'
+                  AND report_submissions.created_date < datetime('now', ?)
+            """, (user_id, contract_id, submission_day, f"-{SUBMISSION_PENDING_TIMEOUT_MINUTES} minutes"))
+			if cursor.rowcount > 0:
+				results[contract_id] = (True, 'pending')
+				continue
+			cursor.execute("""
+                SELECT status FROM report_submissions
+                WHERE user_telegram_id = ? AND contract_id = ? AND submission_day = ?
+            """, (user_id, contract_id, submission_day))
+			result = cursor.fetchone()
+			results[contract_id] = (False, result[0] if result else 'pending')
+		conn.commit()
+		return results
+	except Exception as e:
+		logging.error(f"Error claiming report submissions for user {user_id}: {e}")
+		conn.rollback()
+		# DB xatosida yuborishni to'xtatmaslik - claim_report_submission bilan bir xil
+		return {contract_id: (True, 'pending') for contract_id in contract_ids}
+	finally:
+		conn.close()
+
+async def complete_report_submission(user_id: int, contract_id: str, submission_day: str,
+		report_id: int, group_message_id: int) -> bool:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            UPDATE report_submissions SET status = 'done', report_id = ?, group_message_id = ?
+            WHERE user_telegram_id = ? AND contract_id = ? AND submission_day = ?
+        """, (report_id, group_message_id, user_id, contract_id, submission_day))
+		conn.commit()
+		return cursor.rowcount > 0
+	except Exception as e:
+		logging.error(f"Error completing report submission {contract_id} for user {user_id}: {e}")
+		conn.rollback()
+		return False
+	finally:
+		conn.close()
+
+async def release_report_submission(user_id: int, contract_id: str, submission_day: str) -> bool:
+	"""Yuborish muvaffaqiyatsiz bo'lsa - kalitni bo'shatish, sotuvchi qayta urinishi mumkin"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            DELETE FROM report_submissions
+            WHERE user_telegram_id = ? AND contract_id = ? AND submission_day = ? AND status = 'pending'
+        """, (user_id, contract_id, submission_day))
+		conn.commit()
+		return cursor.rowcount > 0
+	except Exception as e:
+		logging.error(f"Error releasing report submission {contract_id} for user {user_id}: {e}")
+		conn.rollback()
+		return False
+	finally:
+		conn.close()
+
+async def release_report_submissions(user_id: int, contract_ids: list, submission_day: str) -> int:
+	if not contract_ids:
+		return 0
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.executemany("""
+            DELETE FROM report_submissions
+            WHERE user_telegram_id = ? AND contract_id = ? AND submission_day = ? AND status = 'pending'
+        """, [(user_id, contract_id, submission_day) for contract_id in contract_ids])
+		conn.commit()
+		return cursor.rowcount
+	except Exception as e:
+		logging.error(f"Error releasing report submissions for user {user_id}: {e}")
+		conn.rollback()
+		return 0
+	finally:
+		conn.close()
+
+# ==================== SHEET QATOR INDEKSI ====================
+# Quyidagi funksiyalar sinxron, chunki ular google_sheets_integration (sinxron) ichidan chaqiriladi
+
+def save_sheet_row_location(contract_id: str, spreadsheet_id: str, worksheet_name: str, row_index: int) -> bool:
+	if not contract_id or not row_index:
+		return False
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            INSERT OR REPLACE INTO sheet_row_index (contract_id, spreadsheet_id, worksheet_name, row_index, updated_date)
+            VALUES (?, ?, ?, ?, ?)
+        """, (contract_id, spreadsheet_id, worksheet_name, row_index, datetime.now()))
+		conn.commit()
+		return True
+	except Exception as e:
+		logging.error(f"Error saving sheet row location for contract {contract_id}: {e}")
+		return False
+	finally:
+		conn.close()
+
+def get_sheet_row_location(spreadsheet_id: str, worksheet_name: str, contract_id: str) -> int | None:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            SELECT row_index FROM sheet_row_index
+            WHERE spreadsheet_id = ? AND worksheet_name = ? AND contract_id = ?
+        """, (spreadsheet_id, worksheet_name, contract_id))
+		result = cursor.fetchone()
+		return result[0] if result else None
+	except Exception as e:
+		logging.error(f"Error fetching sheet row location for contract {contract_id}: {e}")
+		return None
+	finally:
+		conn.close()
+
+def get_contract_sheet_locations(contract_id: str) -> list:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            SELECT spreadsheet_id, worksheet_name, row_index FROM sheet_row_index
+            WHERE contract_id = ?
+            ORDER BY updated_date DESC
+        """, (contract_id,))
+		return cursor.fetchall()
+	except Exception as e:
+		logging.error(f"Error fetching sheet locations for contract {contract_id}: {e}")
+		return []
+	finally:
+		conn.close()
+
+def save_sheet_row_locations(spreadsheet_id: str, worksheet_name: str, locations: dict) -> int:
+	"""Bitta worksheet uchun ko'p shartnoma joylashuvini bitta tranzaksiyada yozish"""
+	if not locations:
+		return 0
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		now = datetime.now()
+		cursor.executemany("""
+            INSERT OR REPLACE INTO sheet_row_index (contract_id, spreadsheet_id, worksheet_name, row_index, updated_date)
+            VALUES (?, ?, ?, ?, ?)
+        """, [
+			(str(contract_id), spreadsheet_id, worksheet_name, row_index, now)
+			for contract_id, row_index in locations.items()
+			if contract_id and row_index
+		])
+		conn.commit()
+		return cursor.rowcount
+	except Exception as e:
+		logging.error(f"Error saving sheet row locations for '{worksheet_name}': {e}")
+		conn.rollback()
+		return 0
+	finally:
+		conn.close()
+
+def delete_sheet_row_locations(spreadsheet_id: str, worksheet_name: str) -> int:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute(
+			"DELETE FROM sheet_row_index WHERE spreadsheet_id = ? AND worksheet_name = ?",
+			(spreadsheet_id, worksheet_name)
+		)
+		deleted = cursor.rowcount
+		conn.commit()
+		if deleted:
+			logging.info(f"{deleted} sheet row locations removed for '{worksheet_name}' ({spreadsheet_id}).")
+		return deleted
+	except Exception as e:
+		logging.error(f"Error deleting sheet row locations for '{worksheet_name}': {e}")
+		conn.rollback()
+		return 0
+	finally:
+		conn.close()
+
+def move_sheet_row_locations(spreadsheet_id: str, worksheet_names: list, new_spreadsheet_id: str) -> int:
+	"""Arxivlangan worksheetlar indeksini arxiv spreadsheetga ko'chirish"""
+	if not worksheet_names:
+		return 0
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		placeholders = ", ".join("?" * len(worksheet_names))
+		cursor.execute(f"""
+            UPDATE OR REPLACE sheet_row_index SET spreadsheet_id = ?, updated_date = ?
+            WHERE spreadsheet_id = ? AND worksheet_name IN ({placeholders})
+        """, (new_spreadsheet_id, datetime.now(), spreadsheet_id, *worksheet_names))
+		moved = cursor.rowcount
+		conn.commit()
+		return moved
+	except Exception as e:
+		logging.error(f"Error moving sheet row locations to {new_spreadsheet_id}: {e}")
+		conn.rollback()
+		return 0
+	finally:
+		conn.close()
+
+# ==================== SHEET -> DB SINXRONLASH ====================
+# Sinxron - fon oqimida (asyncio.to_thread) ishlaydi
+
+def get_sheet_pull_states() -> dict:
+	"""spreadsheet_id -> oxirgi sinxronlangan Drive modifiedTime"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("SELECT spreadsheet_id, modified_time FROM sheet_pull_state")
+		return dict(cursor.fetchall())
+	except Exception as e:
+		logging.error(f"Error fetching sheet pull states: {e}")
+		return {}
+	finally:
+		conn.close()
+
+def save_sheet_pull_state(spreadsheet_id: str, modified_time: str) -> bool:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            INSERT OR REPLACE INTO sheet_pull_state (spreadsheet_id, modified_time, synced_date)
+            VALUES (?, ?, ?)
+        """, (spreadsheet_id, modified_time, datetime.now()))
+		conn.commit()
+		return True
+	except Exception as e:
+		logging.error(f"Error saving sheet pull state for {spreadsheet_id}: {e}")
+		return False
+	finally:
+		conn.close()
+
+def apply_shipping_updates(google_sheet_ids: list, updates: dict) -> int:
+	"""
+	Sheetdan o'qilgan "Jo'natma turi" va "Yuborilgan sana" qiymatlarini yozish.
+	google_sheet_ids: shu spreadsheetga bog'langan google_sheets.id lar (shartnoma raqami boshqa
+	guruhlarda va kunlarda takrorlanishi mumkin - faqat shu sheet va kundagi hisobotlar yangilanadi).
+	updates: (submission_date ISO, contract_id) -> (shipment_type, shipped_date). Faqat o'zgargan qatorlar yangilanadi.
+	"""
+	if not updates or not google_sheet_ids:
+		return 0
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		now = datetime.now()
+		sheet_placeholders = ", ".join("?" for _ in google_sheet_ids)
+		cursor.executemany(f"""
+            UPDATE sales_reports
+            SET shipment_type = ?, shipped_date = ?, shipping_updated_date = ?
+            WHERE contract_id = ? AND submission_date = ? AND google_sheet_id IN ({sheet_placeholders})
+              AND (COALESCE(shipment_type, '') != ? OR COALESCE(shipped_date, '') != ?)
+        """, [
+			(shipment_type, shipped_date, now, contract_id, submission_date, *google_sheet_ids,
+			 shipment_type, shipped_date)
+			for (submission_date, contract_id), (shipment_type, shipped_date) in updates.items()
+		])
+		changed = cursor.rowcount
+		conn.commit()
+		if changed:
+			invalidate_seller_profile()
+		return changed
+	except Exception as e:
+		logging.error(f"Error applying shipping updates: {e}")
+		conn.rollback()
+		return 0
+	finally:
+		conn.close()
+
+# ==================== SHEET ARXIVLARI ====================
+# Sinxron - arxivlash fon oqimida (asyncio.to_thread) ishlaydi
+
+def get_sheet_archive(source_spreadsheet_id: str, archive_month: str) -> str | None:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            SELECT archive_spreadsheet_id FROM sheet_archives
+            WHERE source_spreadsheet_id = ? AND archive_month = ?
+        """, (source_spreadsheet_id, archive_month))
+		result = cursor.fetchone()
+		return result[0] if result else None
+	except Exception as e:
+		logging.error(f"Error fetching sheet archive for {source_spreadsheet_id} {archive_month}: {e}")
+		return None
+	finally:
+		conn.close()
+
+def save_sheet_archive(source_spreadsheet_id: str, archive_month: str, archive_spreadsheet_id: str,
+		worksheets_added: int = 0) -> bool:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		now = datetime.now()
+		cursor.execute("""
+            INSERT INTO sheet_archives (source_spreadsheet_id, archive_month, archive_spreadsheet_id,
+                                        worksheets_count, created_date, updated_date)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (source_spreadsheet_id, archive_month) DO UPDATE SET
+                archive_spreadsheet_id = excluded.archive_spreadsheet_id,
+                worksheets_count = worksheets_count + excluded.worksheets_count,
+                updated_date = excluded.updated_date
+        """, (source_spreadsheet_id, archive_month, archive_spreadsheet_id, worksheets_added, now, now))
+		conn.commit()
+		return True
+	except Exception as e:
+		logging.error(f"Error saving sheet archive for {source_spreadsheet_id} {archive_month}: {e}")
+		conn.rollback()
+		return False
+	finally:
+		conn.close()
+
+async def get_sheet_archives(limit: int = 20) -> list:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            SELECT source_spreadsheet_id, archive_month, archive_spreadsheet_id, worksheets_count, updated_date
+            FROM sheet_archives
+            ORDER BY archive_month DESC, updated_date DESC
+            LIMIT ?
+        """, (limit,))
+		return cursor.fetchall()
+	except Exception as e:
+		logging.error(f"Error fetching sheet archives: {e}")
+		return []
+	finally:
+		conn.close()
+
+# ==================== SHEET SOLISHTIRISH ====================
+
+# Sheet qatorini qayta tiklash uchun kerakli ustunlar (sheets_sync._report_row_data tartibida)
+_SHEET_REPORTS_SELECT = """
+    SELECT sr.id, sr.submission_date, sr.is_tashkent, gs.spreadsheet_id,
+           sr.client_name, sr.phone_number, sr.additional_phone_number, sr.product_type,
+           sr.delivery, sr.note, sr.client_location, sr.contract_id, sr.contract_amount,
+           COALESCE(sr.seller_name, u.full_name)
+    FROM sales_reports sr
+    JOIN google_sheets gs ON sr.google_sheet_id = gs.id
+    LEFT JOIN users u ON sr.user_telegram_id = u.telegram_id
+    WHERE gs.is_active = 1
+"""
+
+_SHEET_REPORTS_QUERY = _SHEET_REPORTS_SELECT + """
+      AND sr.submission_date BETWEEN ? AND ?
+"""
+
+async def get_reports_for_reconciliation(start_date: str, end_date: str, grace_minutes: int = 0) -> list:
+	"""
+	Sana oralig'idagi Google Sheetga yozilishi kerak bo'lgan hisobotlar.
+	grace_minutes dan yangi hisobotlar o'tkazib yuboriladi (hali yozilayotgan bo'lishi mumkin).
+	"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute(
+			_SHEET_REPORTS_QUERY + " AND sr.submission_timestamp <= datetime('now', ?) ORDER BY sr.submission_date, sr.id",
+			(start_date, end_date, f"-{int(grace_minutes)} minutes")
+		)
+		return cursor.fetchall()
+	except Exception as e:
+		logging.error(f"Error fetching reports for reconciliation: {e}")
+		return []
+	finally:
+		conn.close()
+
+def get_recent_report_contracts(grace_minutes: int) -> set:
+	"""
+	Oxirgi grace_minutes ichida yuborilgan hisobotlarning shartnoma raqamlari - solishtirish ularni
+	DB tomonida o'tkazib yuboradi, sheet tomonida ham orphan deb hisoblamaslik uchun.
+	Sinxron - fon oqimida (asyncio.to_thread) ishlaydi.
+	"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute(
+			"SELECT contract_id FROM sales_reports WHERE submission_timestamp > datetime('now', ?)",
+			(f"-{int(grace_minutes)} minutes",)
+		)
+		return {str(row[0]).strip() for row in cursor.fetchall() if row[0]}
+	except Exception as e:
+		logging.error(f"Error fetching recent report contracts: {e}")
+		return set()
+	finally:
+		conn.close()
+
+def iter_reports_for_sheets(start_date: str, end_date: str, batch_size: int = 500):
+	"""
+	Sana oralig'idagi hisobotlarni sana tartibida bo'laklab (fetchmany) qaytaruvchi generator.
+	Sinxron - backfill fon oqimida (asyncio.to_thread) ishlaydi.
+	"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute(_SHEET_REPORTS_QUERY + " ORDER BY sr.submission_date, sr.id", (start_date, end_date))
+		while True:
+			rows = cursor.fetchmany(batch_size)
+			if not rows:
+				break
+			yield from rows
+	finally:
+		conn.close()
+
+def get_reports_for_sheets_after(last_id: int, limit: int = 1000, up_to_id: int = None) -> list:
+	"""
+	id si last_id dan katta (up_to_id berilsa - undan katta emas) hisobotlar (id tartibida) -
+	ALL DATA ni DB dan to'ldirish uchun. Sinxron - fon oqimida (asyncio.to_thread) ishlaydi.
+	"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		if up_to_id is None:
+			cursor.execute(_SHEET_REPORTS_SELECT + " AND sr.id > ? ORDER BY sr.id LIMIT ?", (last_id, limit))
+		else:
+			cursor.execute(
+				_SHEET_REPORTS_SELECT + " AND sr.id > ? AND sr.id <= ? ORDER BY sr.id LIMIT ?",
+				(last_id, up_to_id, limit)
+			)
+		return cursor.fetchall()
+	except Exception as e:
+		logging.error(f"Error fetching reports after id {last_id}: {e}")
+		return []
+	finally:
+		conn.close()
+
+def get_max_sales_report_id() -> int:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("SELECT COALESCE(MAX(id), 0) FROM sales_reports")
+		return cursor.fetchone()[0]
+	except Exception as e:
+		logging.error(f"Error fetching max sales report id: {e}")
+		return 0
+	finally:
+		conn.close()
+
+# ==================== LINKLAR ====================
+# Sinxron - google_sheets_integration ichidan chaqiriladi
+
+def add_sheet_link(spreadsheet_id: str, link: str, normalized_link: str, admin_name: str,
+		note: str, created_date: str, link_number: int = None) -> tuple | None:
+	"""
+	Linkni lokal jadvalga qo'shish. link_number berilmasa keyingi raqam olinadi.
+	Qaytaradi: (id, link_number) yoki None - link allaqachon mavjud yoki xato
+	"""
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            INSERT INTO sheet_links (spreadsheet_id, link_number, link, normalized_link, admin_name, note, created_date)
+            SELECT ?, COALESCE(?, COALESCE(MAX(link_number), 0) + 1), ?, ?, ?, ?, ?
+            FROM sheet_links WHERE spreadsheet_id = ?
+        """, (spreadsheet_id, link_number, link, normalized_link, admin_name, note, created_date, spreadsheet_id))
+		link_id = cursor.lastrowid
+		cursor.execute("SELECT link_number FROM sheet_links WHERE id = ?", (link_id,))
+		number = cursor.fetchone()[0]
+		conn.commit()
+		return link_id, number
+	except sqlite3.IntegrityError:
+		conn.rollback()
+		return None
+	except Exception as e:
+		logging.error(f"Error adding sheet link for {spreadsheet_id}: {e}")
+		conn.rollback()
+		return None
+	finally:
+		conn.close()
+
+def get_sheet_link_by_normalized(spreadsheet_id: str, normalized_link: str) -> tuple | None:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            SELECT link_number, link, created_date, admin_name FROM sheet_links
+            WHERE spreadsheet_id = ? AND normalized_link = ?
+        """, (spreadsheet_id, normalized_link))
+		return cursor.fetchone()
+	except Exception as e:
+		logging.error(f"Error fetching sheet link for {spreadsheet_id}: {e}")
+		return None
+	finally:
+		conn.close()
+
+def delete_sheet_link(link_id: int) -> bool:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("DELETE FROM sheet_links WHERE id = ?", (link_id,))
+		conn.commit()
+		return cursor.rowcount > 0
+	except Exception as e:
+		logging.error(f"Error deleting sheet link {link_id}: {e}")
+		conn.rollback()
+		return False
+	finally:
+		conn.close()
+
+def get_sheet_links(spreadsheet_id: str) -> list:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("""
+            SELECT link_number, link, created_date, admin_name, note FROM sheet_links
+            WHERE spreadsheet_id = ?
+            ORDER BY link_number
+        """, (spreadsheet_id,))
+		return cursor.fetchall()
+	except Exception as e:
+		logging.error(f"Error fetching sheet links for {spreadsheet_id}: {e}")
+		return []
+	finally:
+		conn.close()
+
+def get_sheet_links_count(spreadsheet_id: str) -> int:
+	conn = sqlite3.connect(DB_NAME)
+	cursor = conn.cursor()
+	try:
+		cursor.execute("SELECT COUNT(*) FROM sheet_links WHERE spreadsheet_id = ?", (spreadsheet_id,))
+		result = cursor.fetchone()
+		return result[0] if result else 0
+	except Exception as e:
+		logging.error(f"Error counting sheet links for {spreadsheet_id}: {e}")
+		return 0
+	finally:
+		conn.close()
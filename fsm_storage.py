@@ -0,0 +1,150 @@
+"""
+fsm_storage.py - SQLite asosidagi aiogram FSM storage
+Yarim yo'lda qolgan hisobotlar (template, rasm, xabar id lari) bot qayta ishga tushganda
+yo'qolmaydi. Oldida kichik LRU kesh turadi, ma'lumotlar ixcham JSON (kattasi zlib) ko'rinishida
+saqlanadi, FSM_STATE_TTL_SECONDS davomida o'zgarmagan holatlar tashlab ketilgan hisoblanib o'chiriladi.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from database import load_fsm_record, save_fsm_record, delete_expired_fsm_records
+
+# Shuncha vaqt o'zgarmagan holat tashlab ketilgan hisoblanadi (soniya)
+FSM_STATE_TTL_SECONDS = 24 * 3600
+
+# Xotirada saqlanadigan holatlar soni
+FSM_CACHE_SIZE = 1000
+
+# Eskirgan holatlarni tozalash oralig'i (soniya)
+FSM_CLEANUP_INTERVAL_SECONDS = 3600
+
+# Bundan katta ma'lumot zlib bilan siqiladi (bayt)
+FSM_COMPRESS_THRESHOLD = 512
+
+_JSON_PREFIX = b'j'
+_ZLIB_PREFIX = b'z'
+
+
+def encode_fsm_data(data: Mapping[str, Any]) -> Optional[bytes]:
+    if not data:
+        return None
+    raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if len(raw) > FSM_COMPRESS_THRESHOLD:
+        return _ZLIB_PREFIX + zlib.compress(raw)
+    return _JSON_PREFIX + raw
+
+
+def decode_fsm_data(blob: Optional[bytes]) -> Dict[str, Any]:
+    if not blob:
+        return {}
+    blob = bytes(blob)
+    if blob[:1] == _ZLIB_PREFIX:
+        return json.loads(zlib.decompress(blob[1:]))
+    return json.loads(blob[1:])
+
+
+class _StateRecord:
+    __slots__ = ('state', 'data', 'updated_at')
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], updated_at: float):
+        self.state = state
+        self.data = data
+        self.updated_at = updated_at
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM holatlari fsm_states jadvalida (database.py), yozish darhol DB ga tushadi.
+    O'qishlar LRU keshdan; kesh to'lsa eng eski yozuv xotiradan chiqariladi (DB da qoladi)
+    """
+
+    def __init__(self, ttl: float = FSM_STATE_TTL_SECONDS, cache_size: int = FSM_CACHE_SIZE):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, _StateRecord]" = OrderedDict()
+
+    @staticmethod
+    def _storage_key(key: StorageKey) -> str:
+        return ":".join("" if part is None else str(part) for part in (
+            key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny
+        ))
+
+    def _remember(self, storage_key: str, record: _StateRecord):
+        self._cache[storage_key] = record
+        self._cache.move_to_end(storage_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _is_expired(self, record: _StateRecord) -> bool:
+        return (record.state is not None or record.data) and time.time() - record.updated_at > self.ttl
+
+    async def _get_record(self, storage_key: str) -> _StateRecord:
+        record = self._cache.get(storage_key)
+        if record is None:
+            row = await load_fsm_record(storage_key)
+            if row:
+                state, data, updated_at = row
+                record = _StateRecord(state, decode_fsm_data(data), updated_at)
+            else:
+                record = _StateRecord(None, {}, time.time())
+        self._remember(storage_key, record)
+
+        if self._is_expired(record):
+            record = _StateRecord(None, {}, time.time())
+            self._remember(storage_key, record)
+            await save_fsm_record(storage_key, None, None, record.updated_at)
+        return record
+
+    async def _save_record(self, storage_key: str, record: _StateRecord):
+        record.updated_at = time.time()
+        self._remember(storage_key, record)
+        await save_fsm_record(storage_key, record.state, encode_fsm_data(record.data), record.updated_at)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self._storage_key(key)
+        record = await self._get_record(storage_key)
+        record.state = state.state if isinstance(state, State) else state
+        await self._save_record(storage_key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get_record(self._storage_key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        storage_key = self._storage_key(key)
+        record = await self._get_record(storage_key)
+        record.data = copy.deepcopy(dict(data))
+        await self._save_record(storage_key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        # Nusxa - handler ichidagi o'zgartirishlar set_data siz keshga tushmasligi uchun
+        return copy.deepcopy((await self._get_record(self._storage_key(key))).data)
+
+    async def purge_expired(self) -> int:
+        """Tashlab ketilgan holatlarni keshdan va DB dan o'chirish"""
+        for storage_key in [key for key, record in self._cache.items() if self._is_expired(record)]:
+            del self._cache[storage_key]
+        return await delete_expired_fsm_records(time.time() - self.ttl)
+
+    async def cleanup_loop(self, interval: float = FSM_CLEANUP_INTERVAL_SECONDS):
+        """bot.main fon vazifasi"""
+        while True:
+            try:
+                removed = await self.purge_expired()
+                if removed:
+                    logging.info(f"🧹 {removed} ta tashlab ketilgan FSM holati o'chirildi")
+            except Exception as e:
+                logging.error(f"FSM holatlarini tozalashda xato: {e}")
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        self._cache.clear()
@@ -4,7 +4,21 @@ import logging
 from datetime import datetime, date, timedelta
 import json
 import os
-from typing import Dict, List, Tuple, Optional
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from database import (
+    save_sheet_row_location, save_sheet_row_locations, get_sheet_row_location, delete_sheet_row_locations,
+    get_setting, set_setting, add_sheet_link, get_sheet_link_by_normalized, delete_sheet_link,
+    get_sheet_links, get_sheet_links_count
+)
+from sheets_accounts import get_account_pool, track_account_session
+from sheets_metrics import instrument_client, track_sheets_operation
 
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
@@ -62,35 +76,62 @@ ALL_DATA_WORKSHEET_NAME = "ALL DATA"  # Legacy - endi kun bilan ishlatiladi
 
 # ==================== GOOGLE SHEETS CLIENT ====================
 
-def get_google_sheets_client():
-    """Google Sheets clientni olish"""
+# Client factory - testlar va benchmarklarda soxta client bilan almashtiriladi (sheets_fake.py)
+_client_factory = None
+
+
+def set_google_sheets_client_factory(factory):
+    """get_google_sheets_client o'rniga ishlatiladigan factory ni o'rnatish (None - asl holatga qaytarish)"""
+    global _client_factory
+    _client_factory = factory
+
+
+def get_google_sheets_client(spreadsheet_id: Optional[str] = None, write: bool = False):
+    """
+    Google Sheets clientni olish
+    Bir nechta credentials*.json bo'lsa, account pooldan tanlanadi (sheets_accounts.py):
+    yozish uchun spreadsheetga biriktirilgan account qaytadi, o'qish uchun eng bo'sh account
+    """
+    if _client_factory is not None:
+        return instrument_client(_client_factory(spreadsheet_id, write))
+    
+    pool = get_account_pool()
+    if pool is None:
+        logging.error(f"❌ Credentials fayl topilmadi: {GOOGLE_SHEETS_CREDENTIALS_FILE}")
+        return None
+    
+    account = pool.acquire(spreadsheet_id, write=write)
+    if account.gspread_client is not None:
+        return account.gspread_client
+    
     try:
-        if not os.path.exists(GOOGLE_SHEETS_CREDENTIALS_FILE):
-            logging.error(f"❌ Credentials fayl topilmadi: {GOOGLE_SHEETS_CREDENTIALS_FILE}")
-            return None
-        
         credentials = Credentials.from_service_account_file(
-            GOOGLE_SHEETS_CREDENTIALS_FILE,
+            account.credentials_file,
             scopes=SCOPES
         )
         client = gspread.authorize(credentials)
-        logging.info("✅ Google Sheets client muvaffaqiyatli yaratildi")
+        instrument_client(client)
+        http_client = getattr(client, 'http_client', client)
+        track_account_session(getattr(http_client, 'session', None), pool, account)
+        account.gspread_client = client
+        logging.info(f"✅ Google Sheets client muvaffaqiyatli yaratildi ({account.email})")
         return client
     
     except Exception as e:
-        logging.error(f"❌ Google Sheets client yaratishda xato: {e}")
+        logging.error(f"❌ Google Sheets client yaratishda xato ({account.credentials_file}): {e}")
         return None
 
 
 # ==================== KUNLIK SHEET TIZIMLARI ====================
 
-def get_daily_worksheet_name(is_tashkent: bool = False) -> str:
+def get_daily_worksheet_name(is_tashkent: bool = False, for_date: Optional[date] = None) -> str:
     """
     Kunlik worksheet nomini generatsiya qilish
     Toshkent shahar uchun: SH 28.11.2025
     Viloyat uchun: VL 28.11.2025
+    for_date berilmasa bugungi sana olinadi
     """
-    today = datetime.now()
+    today = for_date or datetime.now()
     date_str = today.strftime('%d.%m.%Y')
     
     if is_tashkent:
@@ -99,12 +140,12 @@ def get_daily_worksheet_name(is_tashkent: bool = False) -> str:
         return f"VL {date_str}"
 
 
-def get_daily_all_data_worksheet_name() -> str:
+def get_daily_all_data_worksheet_name(for_date: Optional[date] = None) -> str:
     """
     Kunlik ALL DATA worksheet nomini generatsiya qilish
     Format: ALL DATA 06.12.2025
     """
-    today = datetime.now()
+    today = for_date or datetime.now()
     date_str = today.strftime('%d.%m.%Y')
     return f"ALL DATA {date_str}"
 
@@ -138,13 +179,28 @@ def is_tashkent_region(region: str) -> bool:
     return False
 
 
-def get_or_create_daily_worksheet(spreadsheet_id: str, is_tashkent: bool = False):
+def _add_worksheet_or_get(spreadsheet, worksheet_name: str, rows: int, cols: int):
+    """
+    Worksheetni eng chapga qo'shish. Boshqa jarayon yoki asinxron saqlash uni shu orada
+    yaratib qo'ygan bo'lsa ("already exists") mavjudini qaytarish
+    Qaytaradi: (worksheet, yangi_yaratildimi)
+    """
+    try:
+        return spreadsheet.add_worksheet(title=worksheet_name, rows=rows, cols=cols, index=0), True
+    except gspread.exceptions.APIError as e:
+        if 'already exists' not in str(e):
+            raise
+        logging.info(f"📋 Worksheet boshqa so'rov tomonidan yaratilgan: '{worksheet_name}'")
+        return spreadsheet.worksheet(worksheet_name), False
+
+
+def get_or_create_daily_worksheet(spreadsheet_id: str, is_tashkent: bool = False, for_date: Optional[date] = None):
     """
     Kunlik worksheet olish yoki yaratish.
     Yangi yaratilgan sheet har doim eng chapga (index=0) qo'yiladi.
     """
     try:
-        client = get_google_sheets_client()
+        client = get_google_sheets_client(spreadsheet_id, write=True)
         if not client:
             logging.error("❌ Google Sheets client yaratilmadi")
             return None
@@ -152,32 +208,28 @@ def get_or_create_daily_worksheet(spreadsheet_id: str, is_tashkent: bool = False
         spreadsheet = client.open_by_key(spreadsheet_id)
         logging.info(f"📄 Spreadsheet ochildi: {spreadsheet.title}")
         
-        worksheet_name = get_daily_worksheet_name(is_tashkent)
+        worksheet_name = get_daily_worksheet_name(is_tashkent, for_date)
         
-        try:
-            worksheet = spreadsheet.worksheet(worksheet_name)
-            logging.info(f"📋 Mavjud kunlik worksheet topildi: '{worksheet_name}'")
-            
-            existing_headers = worksheet.row_values(1)
-            if not existing_headers or len(existing_headers) < len(COLUMN_HEADERS):
-                logging.info("🔧 Sarlavhalar yangilanmoqda...")
-                worksheet.clear()
-                worksheet.append_row(COLUMN_HEADERS)
-                format_worksheet_headers(worksheet)
-        
-        except gspread.WorksheetNotFound:
-            logging.info(f"➕ Yangi kunlik worksheet yaratilmoqda (Eng Chapga): '{worksheet_name}'")
-            worksheet = spreadsheet.add_worksheet(
-                title=worksheet_name,
-                rows=1000,
-                cols=len(COLUMN_HEADERS),
-                index=0
-            )
-            
-            worksheet.append_row(COLUMN_HEADERS)
-            format_worksheet_headers(worksheet)
+        # Sarlavha yozilguncha boshqa saqlash shu worksheetga qator qo'sha olmaydi
+        with worksheet_lock(spreadsheet_id, worksheet_name):
+            try:
+                worksheet = spreadsheet.worksheet(worksheet_name)
+                logging.info(f"📋 Mavjud kunlik worksheet topildi: '{worksheet_name}'")
+                
+                existing_headers = worksheet.row_values(1)
+                if not existing_headers or len(existing_headers) < len(COLUMN_HEADERS):
+                    logging.info("🔧 Sarlavhalar yangilanmoqda...")
+                    worksheet.clear()
+                    worksheet.append_row(COLUMN_HEADERS)
+                    format_worksheet_headers(worksheet)
             
-            logging.info(f"✅ Yangi kunlik worksheet yaratildi: '{worksheet_name}'")
+            except gspread.WorksheetNotFound:
+                logging.info(f"➕ Yangi kunlik worksheet yaratilmoqda (Eng Chapga): '{worksheet_name}'")
+                worksheet, created = _add_worksheet_or_get(spreadsheet, worksheet_name, 1000, len(COLUMN_HEADERS))
+                if created:
+                    worksheet.append_row(COLUMN_HEADERS)
+                    format_worksheet_headers(worksheet)
+                    logging.info(f"✅ Yangi kunlik worksheet yaratildi: '{worksheet_name}'")
         
         return worksheet
     
@@ -189,7 +241,7 @@ def get_or_create_daily_worksheet(spreadsheet_id: str, is_tashkent: bool = False
 def get_worksheet(spreadsheet_id: str, worksheet_name: str):
     """Oddiy worksheet olish (kunlik emas)"""
     try:
-        client = get_google_sheets_client()
+        client = get_google_sheets_client(spreadsheet_id, write=True)
         if not client:
             logging.error("❌ Google Sheets client yaratilmadi")
             return None
@@ -230,29 +282,41 @@ def get_worksheet(spreadsheet_id: str, worksheet_name: str):
 
 # ==================== FORMATLASH ====================
 
+DAILY_HEADER_FORMAT = {
+    'backgroundColor': {
+        'red': 0.2,
+        'green': 0.4,
+        'blue': 0.8
+    },
+    'textFormat': {
+        'bold': True,
+        'foregroundColor': {
+            'red': 1.0,
+            'green': 1.0,
+            'blue': 1.0
+        },
+        'fontSize': 11
+    },
+    'horizontalAlignment': 'CENTER',
+    'verticalAlignment': 'MIDDLE'
+}
+
+ALL_DATA_HEADER_FORMAT = {
+    **DAILY_HEADER_FORMAT,
+    'backgroundColor': {
+        'red': 0.1,
+        'green': 0.3,
+        'blue': 0.6
+    }
+}
+
+
 def format_worksheet_headers(worksheet):
     """Sarlavhalarni formatlash"""
     try:
         header_range = f"A1:{chr(64 + len(COLUMN_HEADERS))}1"
         
-        worksheet.format(header_range, {
-            'backgroundColor': {
-                'red': 0.2,
-                'green': 0.4,
-                'blue': 0.8
-            },
-            'textFormat': {
-                'bold': True,
-                'foregroundColor': {
-                    'red': 1.0,
-                    'green': 1.0,
-                    'blue': 1.0
-                },
-                'fontSize': 11
-            },
-            'horizontalAlignment': 'CENTER',
-            'verticalAlignment': 'MIDDLE'
-        })
+        worksheet.format(header_range, DAILY_HEADER_FORMAT)
         
         worksheet.columns_auto_resize(0, len(COLUMN_HEADERS) - 1)
         
@@ -344,24 +408,7 @@ def format_all_data_worksheet_headers(worksheet):
     try:
         header_range = f"A1:{chr(64 + len(ALL_DATA_COLUMN_HEADERS))}1"
         
-        worksheet.format(header_range, {
-            'backgroundColor': {
-                'red': 0.1,
-                'green': 0.3,
-                'blue': 0.6
-            },
-            'textFormat': {
-                'bold': True,
-                'foregroundColor': {
-                    'red': 1.0,
-                    'green': 1.0,
-                    'blue': 1.0
-                },
-                'fontSize': 11
-            },
-            'horizontalAlignment': 'CENTER',
-            'verticalAlignment': 'MIDDLE'
-        })
+        worksheet.format(header_range, ALL_DATA_HEADER_FORMAT)
         
         worksheet.columns_auto_resize(0, len(ALL_DATA_COLUMN_HEADERS) - 1)
         
@@ -370,8 +417,165 @@ def format_all_data_worksheet_headers(worksheet):
         logging.warning(f"⚠️ ALL DATA sarlavhalarni formatlashda xato: {e}")
 
 
+def _repeat_cell_request(sheet_id: int, cell_format: Dict, start_column: int, end_column: int,
+                         start_row: Optional[int] = None, end_row: Optional[int] = None) -> Dict:
+    grid_range = {'sheetId': sheet_id, 'startColumnIndex': start_column, 'endColumnIndex': end_column}
+    if start_row is not None:
+        grid_range['startRowIndex'] = start_row
+        grid_range['endRowIndex'] = end_row
+    return {'repeatCell': {
+        'range': grid_range,
+        'cell': {'userEnteredFormat': cell_format},
+        'fields': f"userEnteredFormat({','.join(cell_format)})"
+    }}
+
+
+def header_format_requests(sheet_id: int, headers: List[str]) -> List[Dict]:
+    """
+    format_worksheet_headers / format_all_data_worksheet_headers bilan bir xil formatlash,
+    lekin batchUpdate so'rovlari ko'rinishida - bir nechta worksheetni bitta so'rovda formatlash uchun
+    """
+    is_all_data = len(headers) == len(ALL_DATA_COLUMN_HEADERS)
+    requests = [
+        _repeat_cell_request(
+            sheet_id, ALL_DATA_HEADER_FORMAT if is_all_data else DAILY_HEADER_FORMAT,
+            0, len(headers), 0, 1
+        ),
+        {'autoResizeDimensions': {'dimensions': {
+            'sheetId': sheet_id, 'dimension': 'COLUMNS', 'startIndex': 0, 'endIndex': len(headers)
+        }}}
+    ]
+    if not is_all_data:
+        requests.append(_repeat_cell_request(
+            sheet_id, {'horizontalAlignment': 'CENTER', 'textFormat': {'bold': True}}, 0, 1
+        ))
+        requests.append(_repeat_cell_request(sheet_id, {'horizontalAlignment': 'CENTER'}, 8, 11))
+    return requests
+
+
+def row_format_requests(sheet_id: int, row_index: int, row_number: int) -> List[Dict]:
+    """format_new_row bilan bir xil formatlash - bitta batchUpdate so'rovi uchun"""
+    if row_number == 1:
+        background_color = {'red': 0.9, 'green': 0.95, 'blue': 1.0}
+    elif row_number % 2 == 0:
+        background_color = {'red': 0.95, 'green': 0.95, 'blue': 0.95}
+    else:
+        background_color = {'red': 1.0, 'green': 1.0, 'blue': 1.0}
+    
+    solid = {'style': 'SOLID', 'width': 1}
+    start_row, end_row = row_index - 1, row_index
+    return [
+        _repeat_cell_request(sheet_id, {
+            'backgroundColor': background_color,
+            'borders': {'top': solid, 'bottom': solid, 'left': solid, 'right': solid}
+        }, 0, len(COLUMN_HEADERS), start_row, end_row),
+        _repeat_cell_request(
+            sheet_id, {'horizontalAlignment': 'CENTER', 'textFormat': {'bold': True}}, 0, 1, start_row, end_row
+        ),
+        _repeat_cell_request(sheet_id, {'horizontalAlignment': 'CENTER'}, 8, 11, start_row, end_row)
+    ]
+
+
+# ==================== QATOR INDEKSI ====================
+
+CONTRACT_ID_COLUMN = COLUMN_HEADERS.index("Shartnoma raqami")
+CONTRACT_AMOUNT_COLUMN = COLUMN_HEADERS.index("Shartnoma summasi")
+
+# Qo'lda to'ldiriladigan ustunlar (F va K)
+SHIPMENT_TYPE_COLUMN = COLUMN_HEADERS.index("Jo'natma turi")
+SHIPPED_DATE_COLUMN = COLUMN_HEADERS.index("Yuborilgan sana")
+
+# Eski hisobotlarda (ustunlar qo'shilishidan oldin) DB da NULL bo'lishi mumkin (G va H)
+DELIVERY_COLUMN = COLUMN_HEADERS.index("Dastavka")
+NOTE_COLUMN = COLUMN_HEADERS.index("Izoh")
+
+
+def get_appended_row_index(append_response) -> Optional[int]:
+    """
+    Append javobidan yangi qator raqamini olish
+    Masalan: updatedRange = "'SH 28.11.2025'!A5:N5" -> 5
+    """
+    try:
+        updated_range = append_response['updates']['updatedRange']
+        match = re.search(r'![A-Z]+(\d+)', updated_range)
+        return int(match.group(1)) if match else None
+    except (KeyError, TypeError):
+        return None
+
+
+def index_contract_row(contract_id: str, spreadsheet_id: str, worksheet_name: str, row_index: Optional[int]):
+    """Shartnoma joylashuvini indeksga yozish"""
+    if contract_id and row_index:
+        save_sheet_row_location(str(contract_id), spreadsheet_id, worksheet_name, row_index)
+
+
+def index_contract_rows(contract_ids: List, spreadsheet_id: str, worksheet_name: str, first_row_index: Optional[int]):
+    """Ketma-ket qo'shilgan qatorlar shartnomalarini indeksga bitta tranzaksiyada yozish"""
+    if first_row_index:
+        save_sheet_row_locations(spreadsheet_id, worksheet_name, {
+            contract_id: first_row_index + offset for offset, contract_id in enumerate(contract_ids)
+        })
+
+
+# ==================== YOZISH QULFLARI ====================
+
+# (spreadsheet_id, worksheet nomi) -> qulf. Tartib raqamini o'qish va qatorni qo'shish
+# bitta qulf ostida bajariladi, aks holda bir vaqtda saqlangan ikki hisobot bir xil "№" oladi.
+# RLock: reconcile qulf ostida get_or_create_* ni chaqiradi, u ham shu qulfni oladi
+_worksheet_locks: Dict[Tuple[str, str], threading.RLock] = {}
+_worksheet_locks_guard = threading.Lock()
+
+
+def get_worksheet_lock(spreadsheet_id: str, worksheet_name: str) -> threading.RLock:
+    """Worksheet uchun yagona qulf (sinxron va asinxron saqlash yo'llari uchun umumiy)"""
+    key = (spreadsheet_id, worksheet_name)
+    with _worksheet_locks_guard:
+        lock = _worksheet_locks.get(key)
+        if lock is None:
+            lock = _worksheet_locks[key] = threading.RLock()
+        return lock
+
+
+@contextmanager
+def worksheet_lock(spreadsheet_id: str, *worksheet_names: str):
+    """Bir nechta worksheet qulfini olish - har doim bir xil tartibda, deadlock bo'lmasligi uchun"""
+    locks = [get_worksheet_lock(spreadsheet_id, name) for name in sorted(set(worksheet_names))]
+    for lock in locks:
+        lock.acquire()
+    try:
+        yield
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
 # ==================== HISOBOTLARNI SAQLASH ====================
 
+def build_daily_row(row_number: int, report_data: dict, signed_date: str) -> List:
+    """Kunlik (SH/VL) sheet qatori - COLUMN_HEADERS tartibida"""
+    return [
+        str(row_number),  # A: № (Tartib raqami)
+        report_data.get('client_name', ''),  # B: Mijoz ismi
+        report_data.get('phone_number', ''),  # C: Telefon raqami
+        report_data.get('additional_phone_number', ''),  # D: Qo'shimcha telefon
+        report_data.get('product_type', ''),  # E: Mahsulot nomi
+        '',  # F: Jo'natma turi (bo'sh)
+        report_data.get('delivery', ''),  # G: Dastavka
+        report_data.get('note', ''),  # H: Izoh
+        report_data.get('client_location', ''),  # I: Mijoz manzili
+        signed_date,  # J: Shartnoma imzolangan sana
+        '',  # K: Yuborilgan sana (bo'sh)
+        report_data.get('contract_id', ''),  # L: Shartnoma raqami
+        report_data.get('contract_amount', ''),  # M: Shartnoma summasi
+        report_data.get('sender_full_name', '')  # N: Sotuvchi ismi
+    ]
+
+
+def build_all_data_row(row_number: int, report_data: dict, signed_date: str, source_sheet_name: str) -> List:
+    """ALL DATA sheet qatori - kunlik qator + O: Manba sheet"""
+    return build_daily_row(row_number, report_data, signed_date) + [source_sheet_name]
+
+
 def get_next_row_number(worksheet) -> int:
     """Keyingi tartib raqamini olish"""
     try:
@@ -391,6 +595,7 @@ def get_next_row_number(worksheet) -> int:
         return 1
 
 
+@track_sheets_operation("save_report_to_daily_sheet")
 def save_report_to_daily_sheet(spreadsheet_id: str, report_data: dict, is_tashkent: bool = False) -> bool:
     """
     Hisobotni kunlik sheetga saqlash
@@ -403,34 +608,23 @@ def save_report_to_daily_sheet(spreadsheet_id: str, report_data: dict, is_tashke
             logging.error("❌ Kunlik worksheet topilmadi yoki yaratilmadi")
             return False
         
-        row_number = get_next_row_number(worksheet)
-        
+        worksheet_name = get_daily_worksheet_name(is_tashkent)
         current_date = datetime.now().strftime('%d.%m.%Y')
         
-        row_data = [
-            str(row_number),  # A: № (Tartib raqami)
-            report_data.get('client_name', ''),  # B: Mijoz ismi
-            report_data.get('phone_number', ''),  # C: Telefon raqami
-            report_data.get('additional_phone_number', ''),  # D: Qo'shimcha telefon
-            report_data.get('product_type', ''),  # E: Mahsulot nomi
-            '',  # F: Jo'natma turi (bo'sh)
-            report_data.get('delivery', ''),  # G: Dastavka (YANGI)
-            report_data.get('note', ''),  # H: Izoh
-            report_data.get('client_location', ''),  # I: Mijoz manzili
-            current_date,  # J: Shartnoma imzolangan sana
-            '',  # K: Yuborilgan sana (bo'sh)
-            report_data.get('contract_id', ''),  # L: Shartnoma raqami
-            report_data.get('contract_amount', ''),  # M: Shartnoma summasi
-            report_data.get('sender_full_name', '')  # N: Sotuvchi ismi
-        ]
-        
-        worksheet.append_row(row_data)
+        with worksheet_lock(spreadsheet_id, worksheet_name):
+            row_number = get_next_row_number(worksheet)
+            row_data = build_daily_row(row_number, report_data, current_date)
+            append_response = worksheet.append_row(row_data)
         
-        new_row_index = len(worksheet.get_all_values())
+        # Qator raqami append javobidan olinadi, butun sheet qayta yuklanmaydi
+        new_row_index = get_appended_row_index(append_response)
+        if new_row_index is None:
+            new_row_index = len(worksheet.get_all_values())
         format_new_row(worksheet, new_row_index, row_number)
         
         sheet_type = "Toshkent shahar (SH)" if is_tashkent else "Viloyat (VL)"
-        worksheet_name = get_daily_worksheet_name(is_tashkent)
+        
+        index_contract_row(report_data.get('contract_id'), spreadsheet_id, worksheet_name, new_row_index)
         
         logging.info(
             f"✅ Hisobot #{row_number} {sheet_type} sheetga saqlandi: '{worksheet_name}' - "
@@ -467,12 +661,18 @@ def save_report_to_sheets(spreadsheet_id: str, worksheet_name: str, report_data:
 
 # ==================== LINK SAQLASH FUNKSIYALARI ====================
 
+LINKS_WORKSHEET_NAME = "Linklar"
+
+# Dublikatni aniqlashda e'tiborga olinmaydigan kuzatuv parametrlari
+TRACKING_QUERY_PARAMS = {'fbclid', 'gclid', 'yclid', 'igshid', 'igsh', 'si', 'ref'}
+
+
 def get_or_create_links_worksheet(spreadsheet_id: str):
     """
     Linklar uchun worksheet olish yoki yaratish
     """
     try:
-        client = get_google_sheets_client()
+        client = get_google_sheets_client(spreadsheet_id, write=True)
         if not client:
             logging.error("❌ Google Sheets client yaratilmadi")
             return None
@@ -480,7 +680,7 @@ def get_or_create_links_worksheet(spreadsheet_id: str):
         spreadsheet = client.open_by_key(spreadsheet_id)
         logging.info(f"📄 Spreadsheet ochildi: {spreadsheet.title}")
         
-        worksheet_name = "Linklar"
+        worksheet_name = LINKS_WORKSHEET_NAME
         
         try:
             worksheet = spreadsheet.worksheet(worksheet_name)
@@ -513,83 +713,166 @@ def get_or_create_links_worksheet(spreadsheet_id: str):
         return None
 
 
+def normalize_link(link: str) -> str:
+    """
+    Linkni solishtirish uchun normallashtirish: sxema/host kichik harfda, www. va
+    oxirgi '/' olib tashlanadi, utm_* va boshqa kuzatuv parametrlari hamda #fragment tashlanadi
+    """
+    link = link.strip()
+    parts = urlsplit(link if '://' in link else f"https://{link}")
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_QUERY_PARAMS
+    ]
+    scheme = 'https' if parts.scheme.lower() in ('http', 'https') else parts.scheme.lower()
+    return urlunsplit((scheme, host, parts.path.rstrip('/'), urlencode(query), ''))
+
+
+def _ensure_links_imported(spreadsheet_id: str):
+    """
+    Spreadsheetdagi mavjud Linklar worksheetini lokal jadvalga bir marta ko'chirish.
+    Keyingi barcha o'qish va dublikat tekshiruvlari faqat SQLite dan bajariladi.
+    """
+    setting_key = f"links_imported:{spreadsheet_id}"
+    if get_setting(setting_key):
+        return
+
+    client = get_google_sheets_client(spreadsheet_id)
+    if not client:
+        raise RuntimeError("Google Sheets client yaratilmadi")
+
+    spreadsheet = client.open_by_key(spreadsheet_id)
+    values = batch_read_worksheets(spreadsheet, [LINKS_WORKSHEET_NAME])[LINKS_WORKSHEET_NAME] or []
+
+    imported = 0
+    for row in values[1:]:
+        if len(row) < 2 or not row[1].strip():
+            continue
+        number = int(row[0]) if row[0].strip().isdigit() else None
+        added = add_sheet_link(
+            spreadsheet_id,
+            row[1],
+            normalize_link(row[1]),
+            row[3] if len(row) > 3 else "",
+            row[4] if len(row) > 4 else "-",
+            row[2] if len(row) > 2 else "",
+            number
+        )
+        if added:
+            imported += 1
+
+    set_setting(setting_key, datetime.now().isoformat())
+    logging.info(f"📥 Linklar lokal jadvalga ko'chirildi: {imported} ta ({spreadsheet_id})")
+
+
+def _values_append(client, spreadsheet_id: str, range_name: str, params: Dict, body: Dict):
+    """values.append ni spreadsheet metadata o'qimasdan yuborish"""
+    http_client = getattr(client, 'http_client', None)
+    if http_client is not None and hasattr(http_client, 'values_append'):
+        return http_client.values_append(spreadsheet_id, range_name, params, body)
+    return client.open_by_key(spreadsheet_id).values_append(range_name, params=params, body=body)
+
+
+def _append_link_row(spreadsheet_id: str, row_data: List):
+    """Link qatorini Linklar worksheetiga qo'shish; worksheet bo'lmasa yaratib qayta urinish"""
+    client = get_google_sheets_client(spreadsheet_id, write=True)
+    if not client:
+        raise RuntimeError("Google Sheets client yaratilmadi")
+
+    range_name = gspread.utils.absolute_range_name(LINKS_WORKSHEET_NAME, "A1")
+    params = {'valueInputOption': 'USER_ENTERED'}
+    body = {'values': [row_data]}
+    try:
+        return _values_append(client, spreadsheet_id, range_name, params, body)
+    except gspread.exceptions.APIError as e:
+        if 'Unable to parse range' not in str(e):
+            raise
+        if not get_or_create_links_worksheet(spreadsheet_id):
+            raise
+        return _values_append(client, spreadsheet_id, range_name, params, body)
+
+
+@track_sheets_operation("save_link_to_sheets")
 def save_link_to_sheets(spreadsheet_id: str, link: str, admin_name: str, note: str = "") -> Tuple[bool, str]:
     """
     Linkni Google Sheets ga saqlash
+    Tartib raqami va dublikat tekshiruvi lokal jadvaldan, Sheets'ga faqat bitta append yuboriladi
     """
     try:
-        worksheet = get_or_create_links_worksheet(spreadsheet_id)
-        if not worksheet:
-            return False, "❌ Linklar worksheet ochilmadi"
-        
-        all_values = worksheet.get_all_values()
-        row_count = len(all_values)
-        
-        new_row_number = row_count
-        
+        _ensure_links_imported(spreadsheet_id)
+
+        normalized_link = normalize_link(link)
         current_datetime = datetime.now().strftime('%d.%m.%Y %H:%M')
-        
-        row_data = [
-            new_row_number,
-            link,
-            current_datetime,
-            admin_name,
-            note if note else "-"
-        ]
-        
-        worksheet.append_row(row_data, value_input_option='USER_ENTERED')
-        
+        note = note if note else "-"
+
+        with worksheet_lock(spreadsheet_id, LINKS_WORKSHEET_NAME):
+            added = add_sheet_link(spreadsheet_id, link, normalized_link, admin_name, note, current_datetime)
+            if not added:
+                existing = get_sheet_link_by_normalized(spreadsheet_id, normalized_link)
+                if not existing:
+                    return False, "❌ Linkni saqlashda xato"
+                number, _, created_date, existing_admin = existing
+                return False, (
+                    f"⚠️ Bu link allaqachon saqlangan!\n"
+                    f"📊 Tartib raqami: {number}\n"
+                    f"📅 Sana: {created_date}\n"
+                    f"👤 Admin: {existing_admin}"
+                )
+
+            link_id, new_row_number = added
+            row_data = [new_row_number, link, current_datetime, admin_name, note]
+            try:
+                _append_link_row(spreadsheet_id, row_data)
+            except Exception:
+                # Sheets'ga yozilmagan link lokal jadvalda qolmasligi kerak
+                delete_sheet_link(link_id)
+                raise
+
         logging.info(f"✅ Link saqlandi: {link[:50]}... (№{new_row_number})")
-        
+
         return True, f"✅ Link muvaffaqiyatli saqlandi!\n📊 Tartib raqami: {new_row_number}\n📅 Sana: {current_datetime}"
-    
+
     except Exception as e:
         logging.error(f"❌ Linkni saqlashda xato: {e}")
         return False, f"❌ Linkni saqlashda xato: {str(e)}"
 
 
+@track_sheets_operation("get_all_links_from_sheets")
 def get_all_links_from_sheets(spreadsheet_id: str) -> Tuple[bool, List[Dict] | str]:
     """
-    Barcha linklar ro'yxatini olish
+    Barcha linklar ro'yxatini olish (lokal jadvaldan)
     """
     try:
-        worksheet = get_or_create_links_worksheet(spreadsheet_id)
-        if not worksheet:
-            return False, "❌ Linklar worksheet ochilmadi"
-        
-        all_values = worksheet.get_all_values()
-        
-        if len(all_values) <= 1:
-            return True, []
-        
-        links = []
-        for row in all_values[1:]:
-            if len(row) >= 4:
-                links.append({
-                    'number': row[0],
-                    'link': row[1],
-                    'date': row[2],
-                    'admin': row[3],
-                    'note': row[4] if len(row) > 4 else "-"
-                })
-        
+        _ensure_links_imported(spreadsheet_id)
+
+        links = [
+            {
+                'number': str(number),
+                'link': link,
+                'date': created_date,
+                'admin': admin_name,
+                'note': note or "-"
+            }
+            for number, link, created_date, admin_name, note in get_sheet_links(spreadsheet_id)
+        ]
+
         return True, links
-    
+
     except Exception as e:
         logging.error(f"❌ Linklar olishda xato: {e}")
         return False, f"❌ Linklar olishda xato: {str(e)}"
 
 
+@track_sheets_operation("get_links_count")
 def get_links_count(spreadsheet_id: str) -> int:
-    """Linklar sonini olish"""
+    """Linklar sonini olish (lokal jadvaldan)"""
     try:
-        worksheet = get_or_create_links_worksheet(spreadsheet_id)
-        if not worksheet:
-            return 0
-        
-        all_values = worksheet.get_all_values()
-        return max(0, len(all_values) - 1)
-    
+        _ensure_links_imported(spreadsheet_id)
+        return get_sheet_links_count(spreadsheet_id)
+
     except Exception as e:
         logging.error(f"❌ Linklar sonini olishda xato: {e}")
         return 0
@@ -597,14 +880,14 @@ def get_links_count(spreadsheet_id: str) -> int:
 
 # ==================== ALL DATA ====================
 
-def get_or_create_all_data_worksheet(spreadsheet_id: str):
+def get_or_create_all_data_worksheet(spreadsheet_id: str, for_date: Optional[date] = None):
     """
     Kunlik ALL DATA worksheet olish yoki yaratish
     Format: ALL DATA 06.12.2025
     Barcha hisobotlar kun bo'yicha alohida sheetlarga saqlanadi
     """
     try:
-        client = get_google_sheets_client()
+        client = get_google_sheets_client(spreadsheet_id, write=True)
         if not client:
             logging.error("❌ Google Sheets client yaratilmadi")
             return None
@@ -613,36 +896,31 @@ def get_or_create_all_data_worksheet(spreadsheet_id: str):
         logging.info(f"📄 ALL DATA Spreadsheet ochildi: {spreadsheet.title}")
         
         # Kunlik worksheet nomini olish
-        worksheet_name = get_daily_all_data_worksheet_name()
+        worksheet_name = get_daily_all_data_worksheet_name(for_date)
         
-        try:
-            # Mavjud worksheet ni tekshirish
-            worksheet = spreadsheet.worksheet(worksheet_name)
-            logging.info(f"📋 Mavjud kunlik ALL DATA worksheet topildi: '{worksheet_name}'")
-            
-            # Sarlavhalarni tekshirish
-            existing_headers = worksheet.row_values(1)
-            if not existing_headers or len(existing_headers) < len(ALL_DATA_COLUMN_HEADERS):
-                logging.info("🔧 ALL DATA sarlavhalar yangilanmoqda...")
-                worksheet.clear()
-                worksheet.append_row(ALL_DATA_COLUMN_HEADERS)
-                format_all_data_worksheet_headers(worksheet)
-        
-        except gspread.WorksheetNotFound:
-            # Yangi kunlik ALL DATA worksheet yaratish (eng chapga)
-            logging.info(f"➕ Yangi kunlik ALL DATA worksheet yaratilmoqda: '{worksheet_name}'")
-            worksheet = spreadsheet.add_worksheet(
-                title=worksheet_name,
-                rows=5000,
-                cols=len(ALL_DATA_COLUMN_HEADERS),
-                index=0  # Eng chapga qo'yish
-            )
-            
-            # Sarlavhalarni qo'shish
-            worksheet.append_row(ALL_DATA_COLUMN_HEADERS)
-            format_all_data_worksheet_headers(worksheet)
+        with worksheet_lock(spreadsheet_id, worksheet_name):
+            try:
+                # Mavjud worksheet ni tekshirish
+                worksheet = spreadsheet.worksheet(worksheet_name)
+                logging.info(f"📋 Mavjud kunlik ALL DATA worksheet topildi: '{worksheet_name}'")
+                
+                # Sarlavhalarni tekshirish
+                existing_headers = worksheet.row_values(1)
+                if not existing_headers or len(existing_headers) < len(ALL_DATA_COLUMN_HEADERS):
+                    logging.info("🔧 ALL DATA sarlavhalar yangilanmoqda...")
+                    worksheet.clear()
+                    worksheet.append_row(ALL_DATA_COLUMN_HEADERS)
+                    format_all_data_worksheet_headers(worksheet)
             
-            logging.info(f"✅ Kunlik ALL DATA worksheet yaratildi: '{worksheet_name}'")
+            except gspread.WorksheetNotFound:
+                # Yangi kunlik ALL DATA worksheet yaratish (eng chapga)
+                logging.info(f"➕ Yangi kunlik ALL DATA worksheet yaratilmoqda: '{worksheet_name}'")
+                worksheet, created = _add_worksheet_or_get(spreadsheet, worksheet_name, 5000, len(ALL_DATA_COLUMN_HEADERS))
+                if created:
+                    # Sarlavhalarni qo'shish
+                    worksheet.append_row(ALL_DATA_COLUMN_HEADERS)
+                    format_all_data_worksheet_headers(worksheet)
+                    logging.info(f"✅ Kunlik ALL DATA worksheet yaratildi: '{worksheet_name}'")
         
         return worksheet
     
@@ -651,6 +929,7 @@ def get_or_create_all_data_worksheet(spreadsheet_id: str):
         return None
 
 
+@track_sheets_operation("save_report_to_all_data")
 def save_report_to_all_data(spreadsheet_id: str, report_data: dict, is_tashkent: bool = False) -> bool:
     """
     Hisobotni kunlik ALL DATA sheetga saqlash
@@ -663,16 +942,6 @@ def save_report_to_all_data(spreadsheet_id: str, report_data: dict, is_tashkent:
             logging.error("❌ ALL DATA worksheet topilmadi")
             return False
         
-        all_values = worksheet.get_all_values()
-        if len(all_values) <= 1:
-            row_number = 1
-        else:
-            last_row = all_values[-1]
-            if last_row and len(last_row) > 0 and str(last_row[0]).isdigit():
-                row_number = int(last_row[0]) + 1
-            else:
-                row_number = len(all_values)
-        
         current_date = datetime.now().strftime('%d.%m.%Y')
         
         # Manba sheet nomini aniqlash (SH yoki VL)
@@ -681,25 +950,17 @@ def save_report_to_all_data(spreadsheet_id: str, report_data: dict, is_tashkent:
         # ALL DATA worksheet nomi
         all_data_sheet_name = get_daily_all_data_worksheet_name()
         
-        row_data = [
-            str(row_number),  # A: № (Tartib raqami)
-            report_data.get('client_name', ''),  # B: Mijoz ismi
-            report_data.get('phone_number', ''),  # C: Telefon raqami
-            report_data.get('additional_phone_number', ''),  # D: Qo'shimcha telefon
-            report_data.get('product_type', ''),  # E: Mahsulot nomi
-            '',  # F: Jo'natma turi (bo'sh)
-            report_data.get('delivery', ''),  # G: Dastavka
-            report_data.get('note', ''),  # H: Izoh
-            report_data.get('client_location', ''),  # I: Mijoz manzili
-            current_date,  # J: Shartnoma imzolangan sana
-            '',  # K: Yuborilgan sana (bo'sh)
-            report_data.get('contract_id', ''),  # L: Shartnoma raqami
-            report_data.get('contract_amount', ''),  # M: Shartnoma summasi
-            report_data.get('sender_full_name', ''),  # N: Sotuvchi ismi
-            source_sheet_name  # O: Manba sheet (SH/VL kun raqami bilan)
-        ]
+        with worksheet_lock(spreadsheet_id, all_data_sheet_name):
+            row_number = get_next_row_number(worksheet)
+            row_data = build_all_data_row(row_number, report_data, current_date, source_sheet_name)
+            append_response = worksheet.append_row(row_data)
         
-        worksheet.append_row(row_data)
+        index_contract_row(
+            report_data.get('contract_id'),
+            spreadsheet_id,
+            all_data_sheet_name,
+            get_appended_row_index(append_response)
+        )
         
         logging.info(
             f"✅ Hisobot #{row_number} kunlik ALL DATA sheetga saqlandi: '{all_data_sheet_name}' - "
@@ -714,6 +975,7 @@ def save_report_to_all_data(spreadsheet_id: str, report_data: dict, is_tashkent:
         return False
 
 
+@track_sheets_operation("get_all_data_stats")
 def get_all_data_stats(spreadsheet_id: str) -> Dict:
     """Kunlik ALL DATA sheet statistikasini olish"""
     try:
@@ -721,24 +983,22 @@ def get_all_data_stats(spreadsheet_id: str) -> Dict:
         if not worksheet:
             return {'total': 0, 'tashkent': 0, 'regions': 0, 'sheet_name': ''}
         
-        all_values = worksheet.get_all_values()
         sheet_name = get_daily_all_data_worksheet_name()
+        source_column = len(ALL_DATA_COLUMN_HEADERS) - 1  # Manba sheet ustuni (oxirgi ustun)
         
-        if len(all_values) <= 1:
-            return {'total': 0, 'tashkent': 0, 'regions': 0, 'sheet_name': sheet_name}
-        
-        total = len(all_values) - 1
+        total = 0
         tashkent = 0
         regions = 0
         
-        for row in all_values[1:]:
-            # Manba sheet ustuni (oxirgi ustun)
-            if len(row) >= 15:
-                source_sheet = row[14]  # Manba sheet ustuni
-                if source_sheet.startswith("SH"):
-                    tashkent += 1
-                elif source_sheet.startswith("VL"):
-                    regions += 1
+        for _, row in iter_worksheet_rows(worksheet, start_row=2):
+            if not row:
+                continue
+            total += 1
+            source_sheet = _cell(row, source_column)
+            if source_sheet.startswith("SH"):
+                tashkent += 1
+            elif source_sheet.startswith("VL"):
+                regions += 1
         
         return {
             'total': total,
@@ -752,8 +1012,118 @@ def get_all_data_stats(spreadsheet_id: str) -> Dict:
         return {'total': 0, 'tashkent': 0, 'regions': 0, 'sheet_name': ''}
 
 
+# ==================== STATISTIKA HISOBLASH ====================
+
+@lru_cache(maxsize=4096)
+def _parse_report_date(date_str: str) -> Optional[Tuple[str, str]]:
+    """'dd.mm.YYYY [HH:MM]' -> (oy kaliti, kun kaliti); bir xil sana bir marta tahlil qilinadi"""
+    try:
+        date_obj = datetime.strptime(date_str.split(' ')[0], '%d.%m.%Y')
+    except ValueError:
+        return None
+    return date_obj.strftime('%Y-%m'), date_obj.strftime('%Y-%m-%d')
+
+
+def _location_city(location: str) -> str:
+    """Manzildan shahar/viloyat nomini ajratish"""
+    location_lower = location.lower()
+    if 'shahar' in location_lower:
+        return location.split('shahar')[0].strip() + ' shahar'
+    if 'viloyat' in location_lower:
+        return location.split('viloyat')[0].strip() + ' viloyat'
+    return location.split(',')[0].strip() if ',' in location else 'Boshqa'
+
+
+def _top(stats: Dict[str, int], limit: int = 10) -> Dict[str, int]:
+    return dict(sorted(stats.items(), key=lambda x: x[1], reverse=True)[:limit])
+
+
+def compute_report_statistics(rows: Iterable[List[str]], columns: Dict[str, int]) -> Dict:
+    """
+    Hisobotlar statistikasini ustunlar bo'yicha hisoblash
+    Bitta o'tishda har bir ustunning xom qiymatlari sanaladi (Counter), keyin TEST filtri,
+    Toshkent/viloyat, shahar va sana tahlili faqat noyob qiymatlar uchun bir marta bajariladi
+    """
+    seller_column = columns.get('Sotuvchi ismi')
+    product_column = columns.get('Mahsulot nomi')
+    location_column = columns.get('Mijoz manzili')
+    date_column = columns.get('Shartnoma imzolangan sana')
+    
+    sellers = Counter()
+    products = Counter()
+    locations = Counter()
+    dates = Counter()
+    total_reports = 0
+    
+    for row in rows:
+        if not row:
+            continue
+        total_reports += 1
+        sellers[_cell(row, seller_column)] += 1
+        products[_cell(row, product_column)] += 1
+        locations[_cell(row, location_column)] += 1
+        dates[_cell(row, date_column)] += 1
+    
+    sellers_stats = {
+        seller: count for seller, count in sellers.items()
+        if seller and 'TEST' not in seller.upper()
+    }
+    product_stats = {
+        product: count for product, count in products.items()
+        if product and 'TEST' not in product.upper()
+    }
+    
+    location_stats = Counter()
+    tashkent_count = 0
+    viloyat_count = 0
+    for location, count in locations.items():
+        if not location or 'TEST' in location.upper():
+            continue
+        if is_tashkent_region(location):
+            tashkent_count += count
+        else:
+            viloyat_count += count
+        location_stats[_location_city(location)] += count
+    
+    monthly_stats = Counter()
+    daily_stats = Counter()
+    for date_str, count in dates.items():
+        if not date_str:
+            continue
+        keys = _parse_report_date(date_str)
+        if keys is None:
+            logging.warning(f"⚠️ Sanani tahlil qilishda xato: {date_str} ({count} ta qator)")
+            continue
+        month_key, day_key = keys
+        monthly_stats[month_key] += count
+        daily_stats[day_key] += count
+    
+    today = date.today()
+    last_30_days = {}
+    for i in range(30):
+        day_key = (today - timedelta(days=i)).strftime('%Y-%m-%d')
+        last_30_days[day_key] = daily_stats.get(day_key, 0)
+    
+    return {
+        'total_reports': total_reports,
+        'sellers_stats': sellers_stats,
+        'top_sellers': _top(sellers_stats),
+        'monthly_stats': dict(monthly_stats),
+        'daily_stats': dict(daily_stats),
+        'last_30_days': last_30_days,
+        'product_stats': product_stats,
+        'top_products': _top(product_stats),
+        'location_stats': dict(location_stats),
+        'top_locations': _top(location_stats),
+        'tashkent_count': tashkent_count,
+        'viloyat_count': viloyat_count,
+        'last_updated': datetime.now().strftime('%d.%m.%Y %H:%M:%S')
+    }
+
+
 # ==================== TEST VA STATISTIKA ====================
 
+@track_sheets_operation("test_all_data_sheet_connection")
 def test_all_data_sheet_connection(spreadsheet_id: str) -> Tuple[bool, str]:
     """
     Kunlik ALL DATA Google Sheets ulanishini test qilish
@@ -817,6 +1187,7 @@ def test_all_data_sheet_connection(spreadsheet_id: str) -> Tuple[bool, str]:
         return False, error_msg
 
 
+@track_sheets_operation("test_google_sheets_connection")
 def test_google_sheets_connection(spreadsheet_id: str, worksheet_name: str, is_tashkent: bool = False) -> Tuple[bool, str]:
     """
     Google Sheets ulanishini test qilish
@@ -882,12 +1253,13 @@ def test_google_sheets_connection(spreadsheet_id: str, worksheet_name: str, is_t
         return False, error_msg
 
 
+@track_sheets_operation("get_daily_sheets_list")
 def get_daily_sheets_list(spreadsheet_id: str) -> List[Dict]:
     """
     Spreadsheetdagi barcha kunlik sheetlar ro'yxatini olish
     """
     try:
-        client = get_google_sheets_client()
+        client = get_google_sheets_client(spreadsheet_id)
         if not client:
             return []
         
@@ -918,6 +1290,7 @@ def get_daily_sheets_list(spreadsheet_id: str) -> List[Dict]:
         return []
 
 
+@track_sheets_operation("get_reports_statistics")
 def get_reports_statistics(spreadsheet_id: str, worksheet_name: str) -> Dict:
     """Hisobotlar statistikasini olish"""
     try:
@@ -926,101 +1299,16 @@ def get_reports_statistics(spreadsheet_id: str, worksheet_name: str) -> Dict:
             logging.error("❌ Worksheet topilmadi")
             return {}
         
-        all_records = worksheet.get_all_records()
-        
-        if not all_records:
-            logging.info("ℹ️ Google Sheets'da ma'lumotlar topilmadi")
-            return {
-                'total_reports': 0,
-                'sellers_stats': {},
-                'monthly_stats': {},
-                'daily_stats': {},
-                'product_stats': {},
-                'location_stats': {},
-                'tashkent_count': 0,
-                'viloyat_count': 0,
-                'last_updated': datetime.now().strftime('%d.%m.%Y %H:%M:%S')
-            }
-        
-        total_reports = len(all_records)
-        sellers_stats = {}
-        monthly_stats = {}
-        daily_stats = {}
-        product_stats = {}
-        location_stats = {}
+        rows = iter_worksheet_rows(worksheet)
+        _, headers = next(rows, (1, []))
+        columns = {header: index for index, header in enumerate(headers)}
         
-        tashkent_count = 0
-        viloyat_count = 0
+        statistics = compute_report_statistics((row for _, row in rows), columns)
+        total_reports = statistics['total_reports']
         
-        for record in all_records:
-            seller = record.get('Sotuvchi ismi', '').strip()
-            if seller and seller != '' and 'TEST' not in seller.upper():
-                sellers_stats[seller] = sellers_stats.get(seller, 0) + 1
-            
-            product = record.get('Mahsulot nomi', '').strip()
-            if product and product != '' and 'TEST' not in product.upper():
-                product_stats[product] = product_stats.get(product, 0) + 1
-            
-            location = record.get('Mijoz manzili', '').strip()
-            if location and 'TEST' not in location.upper():
-                if is_tashkent_region(location):
-                    tashkent_count += 1
-                else:
-                    viloyat_count += 1
-                
-                if 'shahar' in location.lower():
-                    city = location.split('shahar')[0].strip() + ' shahar'
-                elif 'viloyat' in location.lower():
-                    city = location.split('viloyat')[0].strip() + ' viloyat'
-                else:
-                    city = location.split(',')[0].strip() if ',' in location else 'Boshqa'
-                
-                location_stats[city] = location_stats.get(city, 0) + 1
-            
-            try:
-                date_str = record.get('Shartnoma imzolangan sana', '').strip()
-                if date_str:
-                    if ' ' in date_str:
-                        date_str = date_str.split(' ')[0]
-                    
-                    date_obj = datetime.strptime(date_str, '%d.%m.%Y')
-                    
-                    month_key = date_obj.strftime('%Y-%m')
-                    monthly_stats[month_key] = monthly_stats.get(month_key, 0) + 1
-                    
-                    day_key = date_obj.strftime('%Y-%m-%d')
-                    daily_stats[day_key] = daily_stats.get(day_key, 0) + 1
-            
-            except ValueError as e:
-                logging.warning(f"⚠️ Sanani tahlil qilishda xato: {date_str} - {e}")
-                continue
-        
-        top_sellers = dict(sorted(sellers_stats.items(), key=lambda x: x[1], reverse=True)[:10])
-        top_products = dict(sorted(product_stats.items(), key=lambda x: x[1], reverse=True)[:10])
-        top_locations = dict(sorted(location_stats.items(), key=lambda x: x[1], reverse=True)[:10])
-        
-        today = date.today()
-        last_30_days = {}
-        for i in range(30):
-            day = today - timedelta(days=i)
-            day_key = day.strftime('%Y-%m-%d')
-            last_30_days[day_key] = daily_stats.get(day_key, 0)
-        
-        statistics = {
-            'total_reports': total_reports,
-            'sellers_stats': sellers_stats,
-            'top_sellers': top_sellers,
-            'monthly_stats': monthly_stats,
-            'daily_stats': daily_stats,
-            'last_30_days': last_30_days,
-            'product_stats': product_stats,
-            'top_products': top_products,
-            'location_stats': location_stats,
-            'top_locations': top_locations,
-            'tashkent_count': tashkent_count,
-            'viloyat_count': viloyat_count,
-            'last_updated': datetime.now().strftime('%d.%m.%Y %H:%M:%S')
-        }
+        if not total_reports:
+            logging.info("ℹ️ Google Sheets'da ma'lumotlar topilmadi")
+            return statistics
         
         logging.info(f"📊 Statistika muvaffaqiyatli olindi: {total_reports} ta yozuv")
         return statistics
@@ -1030,6 +1318,7 @@ def get_reports_statistics(spreadsheet_id: str, worksheet_name: str) -> Dict:
         return {}
 
 
+@track_sheets_operation("get_reports_by_date_range")
 def get_reports_by_date_range(spreadsheet_id: str, worksheet_name: str, start_date: str, end_date: str) -> List[Dict]:
     """Sana oralig'idagi hisobotlarni olish"""
     try:
@@ -1065,6 +1354,7 @@ def get_reports_by_date_range(spreadsheet_id: str, worksheet_name: str, start_da
         return []
 
 
+@track_sheets_operation("get_seller_reports")
 def get_seller_reports(spreadsheet_id: str, worksheet_name: str, seller_name: str) -> List[Dict]:
     """Sotuvchi bo'yicha hisobotlarni olish"""
     try:
@@ -1088,19 +1378,30 @@ def get_seller_reports(spreadsheet_id: str, worksheet_name: str, seller_name: st
         return []
 
 
+@track_sheets_operation("update_contract_amount")
 def update_contract_amount(spreadsheet_id: str, worksheet_name: str, contract_id: str, amount: str) -> bool:
-    """Shartnoma summasini yangilash"""
+    """
+    Shartnoma summasini yangilash
+    Avval indeksdagi qator tekshiriladi (bitta katak o'qish + bitta katak yozish).
+    Sheet qo'lda o'zgartirilgan bo'lsa, to'liq skanerlanadi va indeks yangilanadi.
+    """
     try:
         worksheet = get_worksheet(spreadsheet_id, worksheet_name)
         if not worksheet:
             return False
         
-        all_values = worksheet.get_all_values()
-        
-        if len(all_values) <= 1:
-            return False
+        row_index = get_sheet_row_location(spreadsheet_id, worksheet_name, contract_id)
+        if row_index:
+            contract_cell = f"{chr(65 + CONTRACT_ID_COLUMN)}{row_index}"
+            if worksheet.acell(contract_cell).value == contract_id:
+                worksheet.update_acell(f"{chr(65 + CONTRACT_AMOUNT_COLUMN)}{row_index}", amount)
+                logging.info(f"💰 Shartnoma {contract_id} uchun summa '{amount}' ga yangilandi (indeks: {row_index}-qator)")
+                return True
+            
+            logging.info(f"🔎 Shartnoma {contract_id} indeksi eskirgan, sheet qayta skanerlanmoqda")
         
-        headers = all_values[0]
+        rows = iter_worksheet_rows(worksheet)
+        _, headers = next(rows, (1, []))
         contract_col = None
         amount_col = None
         
@@ -1114,10 +1415,12 @@ def update_contract_amount(spreadsheet_id: str, worksheet_name: str, contract_id
             logging.error("❌ Kerakli ustunlar topilmadi")
             return False
         
-        for row_idx, row in enumerate(all_values[1:], start=2):
+        for row_idx, row in rows:
             if len(row) > contract_col and row[contract_col] == contract_id:
                 cell_address = f"{chr(65 + amount_col)}{row_idx}"
-                worksheet.update(cell_address, amount)
+                worksheet.update_acell(cell_address, amount)
+                
+                save_sheet_row_location(contract_id, spreadsheet_id, worksheet_name, row_idx)
                 
                 logging.info(f"💰 Shartnoma {contract_id} uchun summa '{amount}' ga yangilandi")
                 return True
@@ -1130,6 +1433,7 @@ def update_contract_amount(spreadsheet_id: str, worksheet_name: str, contract_id
         return False
 
 
+@track_sheets_operation("clear_test_data")
 def clear_test_data(spreadsheet_id: str, worksheet_name: str) -> bool:
     """Test ma'lumotlarini tozalash"""
     try:
@@ -1137,25 +1441,18 @@ def clear_test_data(spreadsheet_id: str, worksheet_name: str) -> bool:
         if not worksheet:
             return False
         
-        all_values = worksheet.get_all_values()
-        
-        if len(all_values) <= 1:
-            return True
-        
-        rows_to_delete = []
-        
-        for row_idx, row in enumerate(all_values[1:], start=2):
-            if len(row) >= len(COLUMN_HEADERS):
-                is_test_row = any('TEST' in str(cell).upper() for cell in row)
-                
-                if is_test_row:
-                    rows_to_delete.append(row_idx)
+        # Faqat o'chiriladigan qator raqamlari xotirada saqlanadi
+        rows_to_delete = [
+            row_idx for row_idx, row in iter_worksheet_rows(worksheet, start_row=2)
+            if any('TEST' in str(cell).upper() for cell in row)
+        ]
         
-        for row_idx in reversed(rows_to_delete):
-            worksheet.delete_rows(row_idx)
+        delete_worksheet_rows(worksheet, rows_to_delete)
         
         if rows_to_delete:
             renumber_rows(worksheet)
+            # Qatorlar siljidi - indeks keyingi yangilashda skanerlash orqali qayta yoziladi
+            delete_sheet_row_locations(spreadsheet_id, worksheet_name)
         
         logging.info(f"🧹 {len(rows_to_delete)} ta test ma'lumoti tozalandi")
         return True
@@ -1168,26 +1465,32 @@ def clear_test_data(spreadsheet_id: str, worksheet_name: str) -> bool:
 def renumber_rows(worksheet):
     """Qator raqamlarini qayta tartibga solish"""
     try:
-        all_values = worksheet.get_all_values()
+        last_row = 1
+        for row_idx, row in iter_worksheet_rows(worksheet, start_row=2):
+            if row:
+                last_row = row_idx
         
-        if len(all_values) <= 1:
+        if last_row <= 1:
             return
         
-        for i in range(1, len(all_values)):
-            new_number = i
-            cell_address = f"A{i + 1}"
-            worksheet.update(cell_address, str(new_number))
+        # Barcha raqamlar bitta values.update bilan yoziladi
+        worksheet.spreadsheet.values_update(
+            gspread.utils.absolute_range_name(worksheet.title, f"A2:A{last_row}"),
+            params={'valueInputOption': 'RAW'},
+            body={'values': [[number] for number in range(1, last_row)]}
+        )
         
-        logging.info(f"🔢 {len(all_values) - 1} ta qatordagi raqamlar yangilandi")
+        logging.info(f"🔢 {last_row - 1} ta qatordagi raqamlar yangilandi")
     
     except Exception as e:
         logging.error(f"❌ Qator raqamlarini yangilashda xato: {e}")
 
 
+@track_sheets_operation("get_sheet_info")
 def get_sheet_info(spreadsheet_id: str) -> Dict:
     """Sheet ma'lumotlarini olish"""
     try:
-        client = get_google_sheets_client()
+        client = get_google_sheets_client(spreadsheet_id)
         if not client:
             return {}
         
@@ -1253,6 +1556,200 @@ def handle_sheets_errors(func):
     return wrapper
 
 
+# ==================== BO'LAKLAB O'QISH ====================
+
+# Katta worksheetlar (50k+ qator) bir so'rovda emas, sahifalab o'qiladi
+READ_PAGE_SIZE = 2000
+READ_LAST_COLUMN = gspread.utils.rowcol_to_a1(1, len(ALL_DATA_COLUMN_HEADERS)).rstrip("0123456789")
+
+
+def iter_worksheet_rows(worksheet, start_row: int = 1, page_size: int = READ_PAGE_SIZE,
+                        last_column: str = READ_LAST_COLUMN) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Worksheet qatorlarini A{n}:O{n+k} sahifalari bilan o'qiydigan generator
+    (qator raqami, qiymatlar) juftlarini qaytaradi. Xotirada faqat bitta sahifa turadi.
+    Qiymatlar oxiridagi bo'sh kataklarsiz keladi, o'rtadagi bo'sh qatorlar [] bo'ladi.
+    """
+    row = start_row
+    while True:
+        end_row = row + page_size - 1
+        page = worksheet.get(f"A{row}:{last_column}{end_row}")
+        for offset, values in enumerate(page):
+            yield row + offset, values
+        
+        # Sahifa to'lmagan va grid tugagan bo'lsa - boshqa qator yo'q
+        if len(page) < page_size and end_row >= worksheet.row_count:
+            break
+        row = end_row + 1
+
+
+def _cell(row: List[str], column: Optional[int]) -> str:
+    """Qatordan ustun qiymatini xavfsiz olish (qisqartirilgan qatorlar uchun)"""
+    if column is None or column >= len(row):
+        return ''
+    return str(row[column]).strip()
+
+
+def delete_worksheet_rows(worksheet, row_indexes: List[int]):
+    """Qatorlarni bitta batchUpdate bilan o'chirish (ketma-ket qatorlar bitta oraliqqa birlashtiriladi)"""
+    ranges = []
+    for row_index in sorted(set(row_indexes), reverse=True):
+        if ranges and ranges[-1][0] == row_index + 1:
+            ranges[-1][0] = row_index
+        else:
+            ranges.append([row_index, row_index])
+    
+    if not ranges:
+        return
+    
+    worksheet.spreadsheet.batch_update({'requests': [
+        {
+            'deleteDimension': {
+                'range': {
+                    'sheetId': worksheet.id,
+                    'dimension': 'ROWS',
+                    'startIndex': start - 1,
+                    'endIndex': end
+                }
+            }
+        }
+        for start, end in ranges
+    ]})
+
+
+# ==================== BATCH O'QISH / YOZISH ====================
+
+def batch_read_worksheets(spreadsheet, worksheet_names: List[str]) -> Dict[str, Optional[List[List[str]]]]:
+    """
+    Bir nechta worksheetni bitta values.batchGet so'rovi bilan o'qish
+    Mavjud bo'lmagan worksheetlar uchun None qaytariladi
+    """
+    result = {name: None for name in worksheet_names}
+    existing = {worksheet.title for worksheet in spreadsheet.worksheets()}
+    names = [name for name in result if name in existing]
+    if not names:
+        return result
+    
+    response = spreadsheet.values_batch_get([gspread.utils.absolute_range_name(name) for name in names])
+    for name, value_range in zip(names, response.get('valueRanges', [])):
+        result[name] = value_range.get('values', [])
+    
+    return result
+
+
+def batch_read_columns(spreadsheet, worksheet_names: List[str], columns: List[int],
+                       start_row: int = 2) -> Dict[str, Optional[List[List[str]]]]:
+    """
+    Bir nechta worksheetning faqat kerakli ustunlarini bitta values.batchGet bilan o'qish
+    columns - 0 dan boshlanuvchi ustun indekslari. Natija: worksheet nomi -> qatorlar
+    (har bir qatorda columns tartibidagi qiymatlar, start_row dan boshlab)
+    """
+    result = {name: None for name in worksheet_names}
+    existing = {worksheet.title for worksheet in spreadsheet.worksheets()}
+    names = [name for name in result if name in existing]
+    if not names:
+        return result
+    
+    letters = [re.sub(r'\d', '', gspread.utils.rowcol_to_a1(1, column + 1)) for column in columns]
+    ranges = [
+        gspread.utils.absolute_range_name(name, f"{letter}{start_row}:{letter}")
+        for name in names for letter in letters
+    ]
+    value_ranges = spreadsheet.values_batch_get(ranges).get('valueRanges', [])
+    
+    for position, name in enumerate(names):
+        column_values = [
+            value_range.get('values', [])
+            for value_range in value_ranges[position * len(letters):(position + 1) * len(letters)]
+        ]
+        height = max((len(values) for values in column_values), default=0)
+        result[name] = [
+            [values[row][0] if row < len(values) and values[row] else '' for values in column_values]
+            for row in range(height)
+        ]
+    
+    return result
+
+
+def bulk_append_rows(spreadsheet, worksheet_name: str, rows: List[List]) -> Optional[int]:
+    """
+    Ko'p qatorni bitta values.append so'rovi bilan qo'shish
+    Birinchi qo'shilgan qator raqamini qaytaradi
+    """
+    if not rows:
+        return None
+    
+    response = spreadsheet.values_append(
+        gspread.utils.absolute_range_name(worksheet_name, "A1"),
+        params={'valueInputOption': 'RAW'},
+        body={'values': rows}
+    )
+    return get_appended_row_index(response)
+
+
+def write_worksheets_bulk(spreadsheet, worksheets: Dict[str, Tuple[List[str], List[List]]]) -> Dict[str, int]:
+    """
+    Worksheetlarni to'liq qayta yozish: worksheet nomi -> (sarlavhalar, qatorlar)
+    Yetishmayotgan worksheetlar bitta batchUpdate bilan yaratiladi, eski qiymatlar
+    bitta values.batchClear bilan tozalanadi, yangi qiymatlar bitta values.batchUpdate bilan yoziladi
+    """
+    if not worksheets:
+        return {}
+    
+    existing = {worksheet.title: worksheet for worksheet in spreadsheet.worksheets()}
+    
+    requests = []
+    created = []
+    for name, (headers, rows) in worksheets.items():
+        needed_rows = len(rows) + 1
+        worksheet = existing.get(name)
+        if worksheet is None:
+            created.append(name)
+            requests.append({'addSheet': {'properties': {
+                'title': name,
+                'index': 0,
+                'gridProperties': {'rowCount': max(1000, needed_rows), 'columnCount': len(headers)}
+            }}})
+        elif worksheet.row_count < needed_rows:
+            requests.append({'updateSheetProperties': {
+                'properties': {'sheetId': worksheet.id, 'gridProperties': {'rowCount': needed_rows}},
+                'fields': 'gridProperties.rowCount'
+            }})
+    
+    created_ids = {}
+    if requests:
+        response = spreadsheet.batch_update({'requests': requests})
+        for reply in response.get('replies', []):
+            properties = reply.get('addSheet', {}).get('properties')
+            if properties:
+                created_ids[properties['title']] = properties['sheetId']
+    
+    cleared = [gspread.utils.absolute_range_name(name) for name in worksheets if name in existing]
+    if cleared:
+        spreadsheet.values_batch_clear(body={'ranges': cleared})
+    
+    spreadsheet.values_batch_update(body={
+        'valueInputOption': 'RAW',
+        'data': [
+            {'range': gspread.utils.absolute_range_name(name, "A1"), 'values': [headers] + rows}
+            for name, (headers, rows) in worksheets.items()
+        ]
+    })
+    
+    # Yangi worksheetlarning sarlavhalari bitta batchUpdate bilan formatlanadi
+    format_requests = []
+    for name in created:
+        if name in created_ids:
+            format_requests.extend(header_format_requests(created_ids[name], worksheets[name][0]))
+    if format_requests:
+        try:
+            spreadsheet.batch_update({'requests': format_requests})
+        except Exception as e:
+            logging.warning(f"⚠️ Yangi worksheet sarlavhalarini formatlashda xato: {e}")
+    
+    return {name: len(rows) for name, (_, rows) in worksheets.items()}
+
+
 # ==================== LOGGING SOZLAMALARI ====================
 
 logging.basicConfig(
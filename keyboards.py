@@ -52,6 +52,13 @@ def get_report_confirmation_keyboard() -> InlineKeyboardMarkup:
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
+def get_batch_report_confirmation_keyboard() -> InlineKeyboardMarkup:
+    buttons = [
+        [InlineKeyboardButton(text="✅ Hammasini tasdiqlash", callback_data="confirm_batch_report")],
+        [InlineKeyboardButton(text="🚫 Bekor qilish", callback_data="cancel_report_submission")]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
 def get_report_confirmed_keyboard() -> InlineKeyboardMarkup:
     buttons = [
         [InlineKeyboardButton(text="✅ Tasdiqlandi", callback_data="status_confirmed_noop")]
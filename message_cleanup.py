@@ -0,0 +1,100 @@
+"""
+message_cleanup.py - hisobot jarayonidagi eski xabarlarni fonda o'chirish
+Handlerlar o'chiriladigan xabarlarni navbatga qo'yadi va kutmaydi. Har bir chat uchun
+qisqa oraliqda yig'ilgan xabarlar bitta Bot API deleteMessages chaqiruvi bilan o'chiriladi.
+Xatolar (xabar topilmadi, juda eski va h.k.) yutiladi va hisoblanadi.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Optional, Set, Tuple
+
+from aiogram import Bot
+
+# Bir chat uchun o'chirishlarni yig'ish oralig'i (soniya)
+CLEANUP_DELAY = 0.3
+
+# deleteMessages bitta chaqiruvda qabul qiladigan xabarlar soni
+MAX_MESSAGES_PER_CALL = 100
+
+
+class MessageCleanupScheduler:
+    """Chat bo'yicha o'chirish navbati: (bot id, chat id) -> xabar id lari"""
+
+    def __init__(self, delay: float = CLEANUP_DELAY):
+        self.delay = delay
+        self.stats: Counter = Counter()
+        self._pending: Dict[Tuple[int, int], Tuple[Bot, Set[int]]] = {}
+        self._tasks: Dict[Tuple[int, int], asyncio.Task] = {}
+
+    def schedule(self, bot: Bot, chat_id: int, *message_ids: Optional[int]):
+        """Xabarlarni o'chirishga navbatga qo'yish (kutilmaydi)"""
+        message_ids = {message_id for message_id in message_ids if message_id}
+        if not message_ids:
+            return
+
+        key = (bot.id, chat_id)
+        self._pending.setdefault(key, (bot, set()))[1].update(message_ids)
+        self.stats['scheduled'] += len(message_ids)
+
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._flush_later(key), name=f"message_cleanup_{chat_id}")
+
+    async def _flush_later(self, key: Tuple[int, int]):
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            # Shu paytdan keyingi navbatlar yangi vazifa ochadi
+            self._tasks.pop(key, None)
+        await self._flush(key)
+
+    async def _flush(self, key: Tuple[int, int]):
+        entry = self._pending.pop(key, None)
+        if not entry:
+            return
+
+        bot, message_ids = entry
+        chat_id = key[1]
+        message_ids = sorted(message_ids)
+        for start in range(0, len(message_ids), MAX_MESSAGES_PER_CALL):
+            chunk = message_ids[start:start + MAX_MESSAGES_PER_CALL]
+            self.stats['calls'] += 1
+            try:
+                await bot.delete_messages(chat_id=chat_id, message_ids=chunk)
+                self.stats['deleted'] += len(chunk)
+            except Exception as e:
+                self.stats['failed_calls'] += 1
+                self.stats['failed'] += len(chunk)
+                logging.debug(f"Xabarlarni o'chirishda xato (chat {chat_id}, {len(chunk)} ta): {e}")
+
+    async def flush(self, timeout: float = 10):
+        """Navbatdagi barcha o'chirishlarni darhol bajarish (bot to'xtashidan oldin)"""
+        # Kutayotgan vazifalar uyg'onganda navbat bo'sh bo'ladi, o'chirayotganlari esa tugatiladi
+        waiting = [self._flush(key) for key in list(self._pending)] + list(self._tasks.values())
+        if waiting:
+            await asyncio.wait_for(asyncio.gather(*waiting, return_exceptions=True), timeout=timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+
+cleanup_scheduler = MessageCleanupScheduler()
+
+
+def schedule_message_cleanup(bot: Bot, chat_id: int, *message_ids: Optional[int]):
+    cleanup_scheduler.schedule(bot, chat_id, *message_ids)
+
+
+async def flush_message_cleanup(timeout: float = 10):
+    """bot.main dan chaqiriladi"""
+    try:
+        await cleanup_scheduler.flush(timeout)
+    except asyncio.TimeoutError:
+        logging.warning("⚠️ Navbatdagi xabarlarni o'chirish vaqti tugadi")
+    stats = cleanup_scheduler.get_stats()
+    if stats:
+        logging.info(
+            f"🧹 Xabar tozalash: {stats.get('deleted', 0)} ta o'chirildi, "
+            f"{stats.get('failed', 0)} ta xato, {stats.get('calls', 0)} ta deleteMessages"
+        )
@@ -1,30 +1,41 @@
+import asyncio
 import logging
 import re
-from datetime import datetime
-from typing import Optional, Dict, Any
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Optional, Dict, Any, List, Set, Tuple
 
 from aiogram import Router, F, Bot
 from aiogram.enums import ParseMode
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton, PhotoSize
 
 from config import ADMIN_ID, HELPER_ID
 from database import (
-    add_sales_report, get_user_assigned_group, update_report_status_in_db,
-    check_user_blocked, get_user_by_telegram_id, get_group_google_sheet,
-    get_user_reports_count, get_reports_by_user, get_all_users
+    add_sales_report, add_sales_reports_batch, get_user_assigned_group, update_report_status_in_db,
+    check_user_blocked, get_group_google_sheet,
+    get_seller_profile, get_telegram_id_by_name,
+    claim_report_submission, complete_report_submission, release_report_submission,
+    claim_report_submissions, release_report_submissions
 )
 from keyboards import (
     get_cancel_report_inline_keyboard, get_main_menu_reply_keyboard,
-    get_report_confirmation_keyboard, get_report_confirmed_keyboard,
+    get_report_confirmation_keyboard, get_report_confirmed_keyboard, get_batch_report_confirmation_keyboard,
     get_group_report_keyboard, get_edit_selection_keyboard,
     get_rejection_reason_keyboard, get_contact_helper_keyboard,
     get_yes_no_additional_phone_inline_keyboard, get_region_selection_keyboard
 )
-from google_sheets_integration import save_report_to_sheets, is_tashkent_region, get_daily_worksheet_name, save_report_to_all_data, get_daily_all_data_worksheet_name
-from additional import get_all_data_spreadsheet_id
+from google_sheets_integration import is_tashkent_region, get_daily_worksheet_name, get_daily_all_data_worksheet_name
+from sheets_async import (
+    save_report_to_daily_sheet_async, save_report_to_all_data_async,
+    save_reports_to_daily_sheet_async, save_reports_to_all_data_async
+)
+from additional import get_all_data_spreadsheet_id, should_write_all_data_live
+from message_cleanup import schedule_message_cleanup
+from photo_store import store_report_photo
 
 # Router yaratish
 otchot_router = Router()
@@ -38,6 +49,8 @@ class ReportState(StatesGroup):
     waiting_for_product_image = State()
     waiting_for_confirmation = State()
     waiting_for_edit_selection = State()
+    waiting_for_batch_images = State()
+    waiting_for_batch_confirmation = State()
 
 
 # ==================== KONSTANTALAR ====================
@@ -112,56 +125,125 @@ def validate_text_field(text: str, min_length: int = 2) -> bool:
     return bool(text and text.strip() and len(text.strip()) >= min_length)
 
 
+# Template maydonlari (maydon, emoji, yorliq) - foydalanuvchiga yuboriladigan template tartibida
+TEMPLATE_FIELDS = [
+    ('client_name', '👤', "Mijoz"),
+    ('phone_number', '📞', "Asosiy raqam"),
+    ('additional_phone_number', '📞', "Qo'shimcha raqam"),
+    ('product_type', '📦', "Mahsulot"),
+    ('client_location', '📍', "Manzil"),
+    ('contract_amount', '💵', "Narx"),
+    ('contract_id', '🆔', "Shartnoma raqami"),
+    ('delivery', '🚛', "Dastavka"),
+    ('note', '📝', "Izoh"),
+    ('seller_name', '👫', "Sotuvchi")
+]
+
+REQUIRED_TEMPLATE_FIELDS = [
+    'client_name', 'phone_number', 'product_type', 'client_location', 'contract_id', 'contract_amount', 'seller_name'
+]
+
+TEMPLATE_FIELD_LABELS = {field: f"{emoji} {label}" for field, emoji, label in TEMPLATE_FIELDS}
+
+_APOSTROPHES = "'’ʻʼ`‘"
+
+
+def _normalize_label(label: str) -> str:
+    label = re.sub(f"[{_APOSTROPHES}]", "'", label)
+    return " ".join(label.split()).lower()
+
+
+_LABEL_TO_FIELD = {_normalize_label(label): field for field, _, label in TEMPLATE_FIELDS}
+
+# Uchragan yorliq yozilishlari -> maydon (normallashtirish har bir yozilish uchun bir marta)
+_label_field_cache: Dict[str, str] = {label: field for field, _, label in TEMPLATE_FIELDS}
+
+# Bitta qator: [emoji/belgilar] yorliq : qiymat. Emoji bo'lmasligi yoki boshqacha bo'lishi,
+# bo'shliqlar va apostrof turlari farq qilishi mumkin. Barcha yorliqlar bitta alternatsiyada.
+_TEMPLATE_LINE_RE = re.compile(
+    r"^[^\S\n]*(?:[^\w\s:]+[^\S\n]*)?(?P<label>"
+    + "|".join(
+        re.escape(label).replace("'", f"[{_APOSTROPHES}]?").replace(r"\ ", r"[^\S\n]+")
+        for _, _, label in sorted(TEMPLATE_FIELDS, key=lambda field: -len(field[2]))
+    )
+    + r")[^\S\n]*:(?P<value>[^\n]*)$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def _match_field(match: re.Match) -> str:
+    label = match.group('label')
+    field = _label_field_cache.get(label)
+    if field is None:
+        field = _label_field_cache[label] = _LABEL_TO_FIELD[_normalize_label(label)]
+    return field
+
+
+def split_templates(text: str) -> List[str]:
+    """
+    Bir xabardagi bir nechta templateni ajratish - har bir template "👤 Mijoz" qatoridan boshlanadi
+    Bitta template bo'lsa - matnning o'zi qaytadi. Bo'laklardan birida maydon qatori umuman
+    bo'lmasa (masalan, bitta templateda "Mijoz" ikki marta yozilgan) - bu bitta template deb olinadi
+    """
+    starts = [match.start() for match in _TEMPLATE_LINE_RE.finditer(text) if _match_field(match) == 'client_name']
+    if len(starts) <= 1:
+        return [text]
+    starts[0] = 0
+    templates = [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+    for template in templates:
+        _, errors = parse_template(template)
+        if any(reason == "maydon topilmadi" for reason in errors.values()):
+            return [text]
+    return templates
+
+
+def parse_template(text: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Template matnini bitta o'tishda parse qilish
+    Qaytaradi: (ma'lumotlar, xatolar) - xatolar: maydon -> sabab (majburiy maydonlar uchun)
+    """
+    found = set()
+    data = {}
+    for match in _TEMPLATE_LINE_RE.finditer(text):
+        field = _match_field(match)
+        found.add(field)
+        value = match.group('value').strip()
+        if value:
+            data[field] = value
+    
+    errors = {}
+    for field in REQUIRED_TEMPLATE_FIELDS:
+        if field not in found:
+            errors[field] = "maydon topilmadi"
+        elif field not in data:
+            errors[field] = "qiymat kiritilmagan"
+    
+    # Telefon raqamlarni formatlash
+    if 'phone_number' in data:
+        data['phone_number'] = format_phone_number(data['phone_number'])
+    if 'additional_phone_number' in data:
+        data['additional_phone_number'] = format_phone_number(data['additional_phone_number'])
+    
+    # Default qiymatlar
+    data.setdefault('delivery', 'Belgilanmagan')
+    data.setdefault('note', 'Yo\'q')
+    
+    return data, errors
+
+
+def format_template_errors(errors: Dict[str, str]) -> str:
+    """Maydon xatolarini sotuvchiga ko'rsatiladigan ro'yxatga aylantirish"""
+    return "\n".join(f"• {TEMPLATE_FIELD_LABELS[field]}: {reason}" for field, reason in errors.items())
+
+
 def parse_template_data(text: str) -> Optional[Dict[str, str]]:
     """
     Template ma'lumotlarini parse qilish
-    YANGILANGAN: Dastavka maydoni qo'shildi
+    Majburiy maydonlardan biri bo'lmasa None (xatolar kerak bo'lsa - parse_template)
     """
     try:
-        data = {}
-        lines = text.strip().split('\n')
-        
-        field_mapping = {
-            '👤 Mijoz:': 'client_name',
-            '📞 Asosiy raqam:': 'phone_number',
-            '📞 Qo\'shimcha raqam:': 'additional_phone_number',
-            '📦 Mahsulot:': 'product_type',
-            '📍 Manzil:': 'client_location',
-            '💵 Narx:': 'contract_amount',
-            '🆔 Shartnoma raqami:': 'contract_id',
-            '🚛 Dastavka:': 'delivery',  # YANGI MAYDON
-            '📝 Izoh:': 'note',
-            '👫 Sotuvchi:': 'seller_name'
-        }
-        
-        for line in lines:
-            line = line.strip()
-            for key, field_name in field_mapping.items():
-                if line.startswith(key):
-                    value = line.split(':', 1)[1].strip() if ':' in line else ''
-                    if value:
-                        data[field_name] = value
-                    break
-        
-        # Majburiy maydonlar
-        required_fields = ['client_name', 'phone_number', 'product_type', 'client_location', 'contract_id', 'contract_amount', 'seller_name']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return None
-        
-        # Telefon raqamlarni formatlash
-        if 'phone_number' in data:
-            data['phone_number'] = format_phone_number(data['phone_number'])
-        if 'additional_phone_number' in data:
-            data['additional_phone_number'] = format_phone_number(data['additional_phone_number'])
-        
-        # Default qiymatlar
-        if 'delivery' not in data:
-            data['delivery'] = 'Belgilanmagan'
-        if 'note' not in data:
-            data['note'] = 'Yo\'q'
-        
-        return data
+        data, errors = parse_template(text)
+        return None if errors else data
     except Exception as e:
         logging.error(f"Template parse qilishda xatolik: {e}")
         return None
@@ -187,64 +269,29 @@ def get_seller_contact_keyboard(seller_telegram_id: int) -> InlineKeyboardMarkup
 
 
 async def get_seller_detailed_profile(telegram_id: int) -> Optional[Dict[str, Any]]:
-    """Sotuvchi batafsil profil ma'lumotlarini olish"""
+    """Sotuvchi batafsil profil ma'lumotlarini olish (bitta so'rov, keshlanadi)"""
     try:
-        user_info = await get_user_by_telegram_id(telegram_id)
-        if not user_info:
+        profile = await get_seller_profile(telegram_id)
+        if not profile:
             return None
         
-        user_id, telegram_id, full_name, reg_date, is_blocked, group_name = user_info
-        
-        total_reports = await get_user_reports_count(telegram_id)
-        recent_reports = await get_reports_by_user(telegram_id, 10)
-        
-        confirmed_count = 0
-        pending_count = 0
-        rejected_count = 0
-        
-        for report in recent_reports:
-            status = report[12]
-            if status == "confirmed":
-                confirmed_count += 1
-            elif status == "pending":
-                pending_count += 1
-            elif status == "rejected":
-                rejected_count += 1
+        reg_date = profile['registration_date']
+        reg_date_formatted = str(reg_date).split(' ')[0] if reg_date else "Noma'lum"
         
-        reg_date_formatted = "Noma'lum"
-        if reg_date:
-            try:
-                if " " in reg_date:
-                    reg_date_formatted = reg_date.split(' ')[0]
-                else:
-                    reg_date_formatted = reg_date
-            except:
-                reg_date_formatted = reg_date
-        
-        last_activity = "Hech qachon"
-        if recent_reports:
-            try:
-                last_report = recent_reports[0]
-                last_submission = last_report[11]
-                if last_submission:
-                    if isinstance(last_submission, str):
-                        last_activity = last_submission.split(' ')[0] if ' ' in last_submission else last_submission
-                    else:
-                        last_activity = str(last_submission)[:10]
-            except:
-                last_activity = "Noma'lum"
+        last_submission = profile['last_submission_timestamp']
+        last_activity = str(last_submission).split(' ')[0] if last_submission else "Hech qachon"
         
         return {
-            'telegram_id': telegram_id,
-            'full_name': full_name,
-            'group_name': group_name,
+            'telegram_id': profile['telegram_id'],
+            'full_name': profile['full_name'],
+            'group_name': profile['group_name'],
             'reg_date': reg_date_formatted,
-            'is_blocked': is_blocked,
-            'total_reports': total_reports,
-            'confirmed_count': confirmed_count,
-            'pending_count': pending_count,
-            'rejected_count': rejected_count,
-            'recent_reports': recent_reports[:5],
+            'is_blocked': profile['is_blocked'],
+            'total_reports': profile['total_reports'],
+            'confirmed_count': profile['confirmed_count'],
+            'pending_count': profile['pending_count'],
+            'rejected_count': profile['rejected_count'],
+            'recent_reports': profile['recent_reports'][:5],
             'last_activity': last_activity
         }
     
@@ -343,35 +390,21 @@ def format_seller_profile_message(profile_data: Dict[str, Any]) -> str:
 
 
 async def find_user_by_name(full_name: str) -> Optional[int]:
-    """Ism bo'yicha foydalanuvchi telegram ID'sini topish"""
+    """Ism bo'yicha foydalanuvchi telegram ID'sini topish (xotiradagi indeks, DB zaxira)"""
     try:
-        all_users = await get_all_users()
-        for user in all_users:
-            if user[2] == full_name:
-                return user[1]
-        return None
+        return await get_telegram_id_by_name(full_name)
     except Exception as e:
         logging.error(f"Foydalanuvchini topishda xatolik: {e}")
         return None
 
 
 async def delete_previous_messages(bot: Bot, chat_id: int, state: FSMContext):
-    """Oldingi bot va foydalanuvchi xabarlarini o'chirish"""
+    """
+    Oldingi bot va foydalanuvchi xabarlarini o'chirish
+    O'chirish fonda (message_cleanup) bajariladi - keyingi qadam Telegram javobini kutmaydi
+    """
     data = await state.get_data()
-    bot_prompt_id = data.get("last_bot_prompt_id")
-    user_reply_id = data.get("last_user_reply_id")
-    
-    if bot_prompt_id:
-        try:
-            await bot.delete_message(chat_id, bot_prompt_id)
-        except (TelegramBadRequest, Exception) as e:
-            logging.warning(f"Bot xabarini o'chirishda xatolik {bot_prompt_id}: {e}")
-    
-    if user_reply_id:
-        try:
-            await bot.delete_message(chat_id, user_reply_id)
-        except (TelegramBadRequest, Exception) as e:
-            logging.warning(f"Foydalanuvchi xabarini o'chirishda xatolik {user_reply_id}: {e}")
+    schedule_message_cleanup(bot, chat_id, data.get("last_bot_prompt_id"), data.get("last_user_reply_id"))
     
     await state.update_data(last_bot_prompt_id=None, last_user_reply_id=None)
 
@@ -426,6 +459,7 @@ async def start_report_submission(message: Message, state: FSMContext, bot: Bot)
         return
     
     await state.clear()
+    _drop_batch_image_state(state.key)
     
     today_date = datetime.now().strftime('%d.%m.%Y')
     
@@ -473,7 +507,9 @@ async def handle_region_selection(callback_query: CallbackQuery, state: FSMConte
         f"🗂️ <b>{region_type}</b>\n\n"
         f"⚠️ Diqqat: Har bir maydonni to'ldiring va `:` belgisidan keyin ma'lumotni kiriting.\n\n"
         f"<code>{template_text}</code>\n\n"
-        f"💡 Nusxa olish uchun yuqoridagi matnni bosib ushlab turing.",
+        f"💡 Nusxa olish uchun yuqoridagi matnni bosib ushlab turing.\n\n"
+        f"📚 Bir nechta hisobot: templatelarni bitta xabarda ketma-ket yuboring "
+        f"(har biri 👤 Mijoz qatoridan boshlanadi), keyin rasmlarni albom qilib yuboring.",
         reply_markup=get_cancel_report_inline_keyboard(),
         parse_mode=ParseMode.HTML
     )
@@ -487,22 +523,20 @@ async def process_template_data(message: Message, state: FSMContext, bot: Bot):
     """Template ma'lumotlarini parse qilish va tasdiqlashga o'tkazish"""
     template_text = message.text.strip()
     
-    parsed_data = parse_template_data(template_text)
+    templates = split_templates(template_text)
+    if len(templates) > 1:
+        await process_batch_templates(message, state, bot, templates)
+        return
+    
+    parsed_data, errors = parse_template(template_text)
     
-    if not parsed_data:
+    if errors:
         await show_error_and_retry(
             message, state, bot,
             "⚠️ Ma'lumotlarni to'g'ri formatda kiriting!\n\n"
-            "Iltimos, barcha majburiy maydonlarni to'ldiring:\n"
-            "• 👤 Mijoz:\n"
-            "• 📞 Asosiy raqam:\n"
-            "• 📦 Mahsulot:\n"
-            "• 📍 Manzil:\n"
-            "• 💵 Narx:\n"
-            "• 🆔 Shartnoma raqami:\n"
-            "• 🚛 Dastavka:\n"
-            "• 👫 Sotuvchi:\n\n"
-            "Qaytadan kiriting:"
+            "Quyidagi maydonlarda xato bor:\n"
+            f"{format_template_errors(errors)}\n\n"
+            "Har bir maydonda `:` belgisidan keyin ma'lumotni kiriting va qaytadan yuboring:"
         )
         return
     
@@ -510,12 +544,7 @@ async def process_template_data(message: Message, state: FSMContext, bot: Bot):
     selected_region = data.get('selected_region', '')
     is_tashkent = data.get('is_tashkent', False)
     
-    if selected_region and selected_region not in parsed_data['client_location']:
-        parsed_data['client_location'] = f"{parsed_data['client_location']}, {selected_region}"
-    
-    parsed_data['contract_amount'] = format_amount(parsed_data['contract_amount'])
-    
-    await state.update_data(**parsed_data)
+    await state.update_data(**_prepare_template_data(parsed_data, selected_region))
     
     await process_step(
         message, state, bot,
@@ -530,10 +559,7 @@ async def process_template_data(message: Message, state: FSMContext, bot: Bot):
 @otchot_router.message(ReportState.waiting_for_product_image, F.photo)
 async def process_product_image(message: Message, state: FSMContext, bot: Bot):
     """Mahsulot rasmini qayta ishlash va tasdiqlashni ko'rsatish"""
-    photo = message.photo[-1]
-    photo_id = photo.file_id
-    
-    await state.update_data(product_image_id=photo_id)
+    await state.update_data(**_photo_fields(message.photo))
     
     data = await state.get_data()
     
@@ -573,7 +599,7 @@ Ma'lumotlar to'g'rimi?"""
     await delete_previous_messages(bot, message.chat.id, state)
     
     sent_message = await message.answer_photo(
-        photo=photo_id,
+        photo=data['product_image_id'],
         caption=confirmation_text,
         reply_markup=get_report_confirmation_keyboard()
     )
@@ -597,30 +623,143 @@ async def handle_invalid_product_image(message: Message, state: FSMContext, bot:
 
 # ==================== TASDIQLASH VA YUBORISH ====================
 
-@otchot_router.callback_query(F.data == "confirm_report", ReportState.waiting_for_confirmation)
-async def confirm_and_send_report(callback_query: CallbackQuery, state: FSMContext, bot: Bot):
-    """Hisobotni tasdiqlash va guruhga yuborish"""
-    user_id = callback_query.from_user.id
-    data = await state.get_data()
-    
-    assigned_group = await get_user_assigned_group(user_id)
-    if not assigned_group:
-        await callback_query.answer("❌ Guruh topilmadi!", show_alert=True)
+# Fonda ishlayotgan yuborish pipeline'lari (bot to'xtaganda kutiladi)
+_report_pipelines: Set[asyncio.Task] = set()
+
+# Tasdiqlash handleri ishlayotgan FSM sessiyalari (StorageKey) - parallel ikkinchi bosishni to'xtatadi
+_confirming_sessions: Set[Any] = set()
+
+
+class _StageTimer:
+    """Pipeline bosqichlari davomiyligini o'lchash (loglar uchun)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - started
+
+    def summary(self) -> str:
+        parts = [f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.stages.items()]
+        parts.append(f"total={(time.perf_counter() - self.started) * 1000:.0f}ms")
+        return ", ".join(parts)
+
+
+def _seller_report_summary(data: Dict[str, Any], delivery: str, seller_name: str, sheet_name: str) -> str:
+    return (
+        f"🆔 Shartnoma raqami: {data.get('contract_id')}\n"
+        f"🛍️ Mahsulot: {data.get('product_type')}\n"
+        f"💰 Summa: {data.get('contract_amount')}\n"
+        f"📍 Hudud: {data.get('client_location')}\n"
+        f"🚛 Dastavka: {delivery}\n"
+        f"📝 Izoh: {data.get('note', 'Yo\'q')}\n"
+        f"👫 Sotuvchi: {seller_name}\n"
+        f"🗂️ Sheet: {sheet_name}"
+    )
+
+
+def _start_report_pipeline(coro, name: str) -> asyncio.Task:
+    task = asyncio.create_task(coro, name=name)
+    _report_pipelines.add(task)
+    task.add_done_callback(_report_pipelines.discard)
+    return task
+
+
+async def wait_report_pipelines(timeout: float = 30):
+    """bot.main dan chaqiriladi - yarim yo'lda qolgan hisobotlar tugashini kutish"""
+    if _report_pipelines:
+        logging.info(f"⏳ {len(_report_pipelines)} ta hisobot yuborilishi kutilmoqda...")
+        await asyncio.wait(list(_report_pipelines), timeout=timeout)
+
+
+async def _restore_confirmation(message: Message, state: FSMContext, data: Dict[str, Any],
+                                original_caption: str, error_text: str):
+    """
+    Xato bo'lsa - tasdiqlash holati va tugmalarini qaytarish, sotuvchi qayta urinishi mumkin.
+    Sotuvchi bu orada yangi hisobot boshlagan bo'lsa, uning holati ustidan yozilmaydi - faqat xato ko'rsatiladi
+    """
+    if await state.get_state() is not None:
+        logging.warning("Sotuvchi yangi hisobot boshlagan - tasdiqlash holati tiklanmadi")
+        try:
+            await message.edit_caption(caption=f"{original_caption}\n\n{error_text}")
+        except TelegramBadRequest as e:
+            logging.error(f"Tasdiqlash xabarini yangilashda xato: {e}")
         return
-    
-    group_id, group_name, topic_id, google_sheet_id = assigned_group
-    
+
+    await state.set_state(ReportState.waiting_for_confirmation)
+    await state.set_data(data)
+    try:
+        await message.edit_caption(
+            caption=f"{original_caption}\n\n{error_text}",
+            reply_markup=get_report_confirmation_keyboard()
+        )
+    except TelegramBadRequest as e:
+        logging.error(f"Tasdiqlash xabarini tiklashda xato: {e}")
+
+
+async def _save_report_to_sheets(group_id: int, report_id: int, report_data: Dict[str, Any], seller_name: str,
+                                 is_tashkent: bool, sheet_name: str, timer: _StageTimer):
+    """Hisobotni guruh sheetiga va ALL DATA ga yozish (xatolar faqat loglanadi)"""
+    try:
+        with timer.stage("sheet_lookup"):
+            sheet_info = await get_group_google_sheet(group_id)
+        if not sheet_info:
+            return
+        spreadsheet_id = sheet_info[2]
+
+        sheet_data = {
+            **report_data,
+            'sender_full_name': seller_name
+        }
+
+        # Kunlik sheetga saqlash (SH yoki VL)
+        with timer.stage("daily_sheet"):
+            sheet_success = await save_report_to_daily_sheet_async(
+                spreadsheet_id,
+                sheet_data,
+                is_tashkent
+            )
+
+        if sheet_success:
+            logging.info(f"✅ Hisobot Google Sheets'ga saqlandi: {sheet_name}")
+        else:
+            logging.warning("⚠️ Hisobot Google Sheets'ga saqlanmadi")
+
+        # ALL DATA sheetga ham saqlash (davriy rejimga tegishli bo'lsa sheets_sync DB dan to'ldiradi)
+        all_data_spreadsheet_id = get_all_data_spreadsheet_id()
+        if all_data_spreadsheet_id and should_write_all_data_live(report_id):
+            with timer.stage("all_data"):
+                all_data_success = await save_report_to_all_data_async(
+                    all_data_spreadsheet_id,
+                    sheet_data,
+                    is_tashkent
+                )
+            if all_data_success:
+                all_data_sheet_name = get_daily_all_data_worksheet_name()
+                logging.info(f"✅ Hisobot kunlik ALL DATA sheetga ham saqlandi: {all_data_sheet_name}")
+            else:
+                logging.warning("⚠️ Hisobot ALL DATA sheetga saqlanmadi")
+
+    except Exception as e:
+        logging.error(f"Google Sheets'ga saqlashda xato: {e}")
+
+
+def _build_group_caption(data: Dict[str, Any]) -> str:
+    """Guruhga yuboriladigan hisobot matni"""
     is_tashkent = data.get('is_tashkent', False)
     sheet_name = get_daily_worksheet_name(is_tashkent)
     region_type_text = f"🏙️ Toshkent shahar ({sheet_name})" if is_tashkent else f"📍 Viloyat ({sheet_name})"
-    
+
     additional_phone = data.get('additional_phone_number', '')
     additional_phone_line = f"📱 Qo'shimcha: {additional_phone}\n" if additional_phone and additional_phone != 'Mavjud emas' else ""
-    
-    seller_name = data.get('seller_name', 'Noma\'lum')
-    delivery = data.get('delivery', 'Belgilanmagan')
-    
-    group_caption = REPORT_CAPTION_TEMPLATE.format(
+
+    return REPORT_CAPTION_TEMPLATE.format(
         client_name=data.get('client_name'),
         phone_number=data.get('phone_number'),
         additional_phone_line=additional_phone_line,
@@ -628,127 +767,674 @@ async def confirm_and_send_report(callback_query: CallbackQuery, state: FSMConte
         client_location=data.get('client_location'),
         contract_id=data.get('contract_id'),
         contract_amount=data.get('contract_amount'),
-        delivery=delivery,
+        delivery=data.get('delivery', 'Belgilanmagan'),
         note=data.get('note', 'Yo\'q'),
-        seller_name=seller_name,
+        seller_name=data.get('seller_name', 'Noma\'lum'),
         region_type_line=region_type_text,
         status_line="✅ Tasdiqlandi"
     )
-    
+
+
+async def _post_report_to_group(bot: Bot, data: Dict[str, Any], group_id: int, topic_id: Optional[int]) -> Message:
+    """Hisobotni rasm bilan guruhga (topic bo'lsa topicga) yuborish"""
+    if topic_id:
+        return await bot.send_photo(
+            chat_id=group_id,
+            photo=data.get('product_image_id'),
+            caption=_build_group_caption(data),
+            reply_markup=get_report_confirmed_keyboard(),
+            message_thread_id=topic_id
+        )
+    return await bot.send_photo(
+        chat_id=group_id,
+        photo=data.get('product_image_id'),
+        caption=_build_group_caption(data),
+        reply_markup=get_report_confirmed_keyboard()
+    )
+
+
+def _photo_fields(photo_sizes: List[PhotoSize]) -> Dict[str, str]:
+    """Eng katta o'lcham - hisobot rasmi, eng kichigi - lokal ombor uchun thumbnail"""
+    return {
+        'product_image_id': photo_sizes[-1].file_id,
+        'product_image_unique_id': photo_sizes[-1].file_unique_id,
+        'product_thumb_id': photo_sizes[0].file_id
+    }
+
+
+def _build_report_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """FSM ma'lumotlaridan DB va Sheets uchun hisobot yozuvi"""
+    additional_phone = data.get('additional_phone_number', '')
+    return {
+        'client_name': data.get('client_name'),
+        'phone_number': data.get('phone_number'),
+        'additional_phone_number': additional_phone if additional_phone else 'Mavjud emas',
+        'product_type': data.get('product_type'),
+        'client_location': data.get('client_location'),
+        'contract_id': data.get('contract_id'),
+        'contract_amount': data.get('contract_amount'),
+        'product_image_id': data.get('product_image_id'),
+        'product_image_unique_id': data.get('product_image_unique_id'),
+        'product_thumb_id': data.get('product_thumb_id'),
+        'is_tashkent': data.get('is_tashkent', False),
+        'seller_name': data.get('seller_name', 'Noma\'lum'),
+        'delivery': data.get('delivery', 'Belgilanmagan'),
+        'note': data.get('note', 'Yo\'q')
+    }
+
+
+async def _run_report_pipeline(bot: Bot, message: Message, state: FSMContext, user_id: int,
+                               data: Dict[str, Any], assigned_group: tuple, original_caption: str,
+                               submission_day: str):
+    """
+    Tasdiqlangan hisobotni fonda yuborish: guruhga post -> DB -> sotuvchi xabarini yangilash -> Sheets
+    Sotuvchi Sheets yozuvlarini kutmaydi, har bir bosqich vaqti logga yoziladi
+    """
+    timer = _StageTimer()
+    group_id, group_name, topic_id, google_sheet_id = assigned_group
+
+    is_tashkent = data.get('is_tashkent', False)
+    sheet_name = get_daily_worksheet_name(is_tashkent)
+    seller_name = data.get('seller_name', 'Noma\'lum')
+    delivery = data.get('delivery', 'Belgilanmagan')
+
     try:
-        if topic_id:
-            sent_message = await bot.send_photo(
-                chat_id=group_id,
-                photo=data.get('product_image_id'),
-                caption=group_caption,
-                reply_markup=get_report_confirmed_keyboard(),
-                message_thread_id=topic_id
+        with timer.stage("group_post"):
+            sent_message = await _post_report_to_group(bot, data, group_id, topic_id)
+
+        group_message_id = sent_message.message_id
+
+        # Ma'lumotlar bazasiga saqlash
+        report_data = _build_report_data(data)
+
+        with timer.stage("db_insert"):
+            report_id = await add_sales_report(user_id, report_data, group_message_id, google_sheet_id)
+            if report_id is None:
+                # add_sales_report xatoni o'zi loglaydi - kalit bo'shatiladi, sotuvchi qayta yuboradi
+                raise RuntimeError("Hisobot DB ga saqlanmadi")
+            await complete_report_submission(
+                user_id, str(data.get('contract_id') or '').strip(), submission_day, report_id, group_message_id
             )
-        else:
-            sent_message = await bot.send_photo(
-                chat_id=group_id,
-                photo=data.get('product_image_id'),
-                caption=group_caption,
+
+    except TelegramBadRequest as e:
+        logging.error(f"Guruhga yuborishda xato: {e}")
+        await release_report_submission(user_id, str(data.get('contract_id') or '').strip(), submission_day)
+        await _restore_confirmation(
+            message, state, data, original_caption, "❌ Guruhga yuborishda xato. Admin bilan bog'laning."
+        )
+        return
+    except Exception as e:
+        logging.error(f"Hisobotni yuborishda xato: {e}")
+        await release_report_submission(user_id, str(data.get('contract_id') or '').strip(), submission_day)
+        await _restore_confirmation(
+            message, state, data, original_caption, "❌ Xatolik yuz berdi. Qaytadan urinib ko'ring."
+        )
+        return
+
+    # Foydalanuvchiga xabar - hisobot guruhda va DB da, Sheets yozuvlari kutilmaydi
+    try:
+        with timer.stage("seller_edit"):
+            await message.edit_caption(
+                caption=(
+                    f"✅ Hisobot muvaffaqiyatli yuborildi!\n\n"
+                    f"{_seller_report_summary(data, delivery, seller_name, sheet_name)}\n\n"
+                    f"✅ Hisobotingiz tasdiqlandi!"
+                ),
                 reply_markup=get_report_confirmed_keyboard()
             )
+    except TelegramBadRequest as e:
+        logging.warning(f"Sotuvchi xabarini yangilashda xato: {e}")
+
+    # Rasm fonda lokal omborga yuklanadi
+    store_report_photo(report_data)
+    
+    if google_sheet_id:
+        await _save_report_to_sheets(group_id, report_id, report_data, seller_name, is_tashkent, sheet_name, timer)
+
+    logging.info(
+        f"Hisobot muvaffaqiyatli yuborildi: User={user_id}, Contract={data.get('contract_id')}, "
+        f"Toshkent={is_tashkent}, Sheet={sheet_name}, Seller={seller_name}, Delivery={delivery}"
+    )
+    logging.info(f"⏱ Hisobot pipeline (Contract={data.get('contract_id')}): {timer.summary()}")
+
+
+@otchot_router.callback_query(F.data == "confirm_report", ReportState.waiting_for_confirmation)
+async def confirm_and_send_report(callback_query: CallbackQuery, state: FSMContext, bot: Bot):
+    """
+    Hisobotni tasdiqlash va guruhga yuborish
+    Callback darhol javob oladi; guruhga post, DB va Sheets fonda (_run_report_pipeline) bajariladi.
+    Bir xil (sotuvchi, shartnoma, kun) uchun takroriy tasdiqlash hech narsani qayta yubormaydi.
+    """
+    # Bir sessiyada ikkinchi bosish birinchisi holatni tozalamasidan oldin kelishi mumkin
+    if state.key in _confirming_sessions:
+        await callback_query.answer("⏳ Hisobot yuborilmoqda...")
+        return
+    _confirming_sessions.add(state.key)
+    
+    try:
+        user_id = callback_query.from_user.id
+        data = await state.get_data()
+        if not data.get('contract_id'):
+            # Holat filtrdan keyin, parallel bosish tomonidan tozalangan
+            await callback_query.answer("ℹ️ Bu hisobot allaqachon qayta ishlangan.")
+            return
         
-        group_message_id = sent_message.message_id
-        
-        # Ma'lumotlar bazasiga saqlash
-        report_data = {
-            'client_name': data.get('client_name'),
-            'phone_number': data.get('phone_number'),
-            'additional_phone_number': additional_phone if additional_phone else 'Mavjud emas',
-            'product_type': data.get('product_type'),
-            'client_location': data.get('client_location'),
-            'contract_id': data.get('contract_id'),
-            'contract_amount': data.get('contract_amount'),
-            'product_image_id': data.get('product_image_id'),
-            'is_tashkent': is_tashkent,
-            'delivery': delivery,
-            'note': data.get('note', 'Yo\'q')
-        }
+        message = callback_query.message
+        original_caption = message.html_text
         
-        report_id = await add_sales_report(user_id, report_data, group_message_id, google_sheet_id)
+        summary = _seller_report_summary(
+            data,
+            data.get('delivery', 'Belgilanmagan'),
+            data.get('seller_name', 'Noma\'lum'),
+            get_daily_worksheet_name(data.get('is_tashkent', False))
+        )
         
-        if google_sheet_id and report_id:
-            try:
-                sheet_info = await get_group_google_sheet(group_id)
-                if sheet_info:
-                    spreadsheet_id = sheet_info[2]
-                    
-                    sheet_data = {
-                        **report_data,
-                        'sender_full_name': seller_name
-                    }
-                    
-                    # Kunlik sheetga saqlash (SH yoki VL)
-                    sheet_success = save_report_to_sheets(
-                        spreadsheet_id,
-                        "",
-                        sheet_data,
-                        is_tashkent
+        contract_id = str(data.get('contract_id') or '').strip()
+        submission_day = date.today().isoformat()
+        claimed, status, _ = await claim_report_submission(user_id, contract_id, submission_day)
+        if not claimed:
+            # Shu hisobot allaqachon yuborilgan yoki yuborilmoqda - birinchi natija ko'rsatiladi
+            await state.clear()
+            if status == 'done':
+                await callback_query.answer("✅ Bu hisobot allaqachon yuborilgan!")
+                try:
+                    await message.edit_caption(
+                        caption=f"✅ Hisobot muvaffaqiyatli yuborildi!\n\n{summary}\n\n✅ Hisobotingiz tasdiqlandi!",
+                        reply_markup=get_report_confirmed_keyboard()
                     )
-                    
-                    if sheet_success:
-                        logging.info(f"✅ Hisobot Google Sheets'ga saqlandi: {sheet_name}")
-                    else:
-                        logging.warning("⚠️ Hisobot Google Sheets'ga saqlanmadi")
-                    
-                    # ALL DATA sheetga ham saqlash
-                    all_data_spreadsheet_id = get_all_data_spreadsheet_id()
-                    if all_data_spreadsheet_id:
-                        all_data_success = save_report_to_all_data(
-                            all_data_spreadsheet_id,
-                            sheet_data,
-                            is_tashkent
-                        )
-                        if all_data_success:
-                            all_data_sheet_name = get_daily_all_data_worksheet_name()
-                            logging.info(f"✅ Hisobot kunlik ALL DATA sheetga ham saqlandi: {all_data_sheet_name}")
-                        else:
-                            logging.warning("⚠️ Hisobot ALL DATA sheetga saqlanmadi")
-                    
-            except Exception as e:
-                logging.error(f"Google Sheets'ga saqlashda xato: {e}")
+                except TelegramBadRequest:
+                    pass
+            else:
+                await callback_query.answer("⏳ Hisobot yuborilmoqda...")
+            logging.info(f"🔁 Takroriy tasdiqlash o'tkazib yuborildi: User={user_id}, Contract={contract_id} ({status})")
+            return
+        
+        await callback_query.answer("⏳ Hisobot yuborilmoqda...")
+        
+        assigned_group = await get_user_assigned_group(user_id)
+        if not assigned_group:
+            await release_report_submission(user_id, contract_id, submission_day)
+            await _restore_confirmation(message, state, data, original_caption, "❌ Guruh topilmadi!")
+            return
+        
+        # Holat tozalanadi - pipeline tugaguncha qayta bosish hech narsa qilmaydi
+        await state.clear()
+        
+        try:
+            await message.edit_caption(
+                caption=f"⏳ Hisobot yuborilmoqda...\n\n{summary}",
+                reply_markup=None
+            )
+        except TelegramBadRequest as e:
+            logging.warning(f"Kutish holatini ko'rsatishda xato: {e}")
         
-        # Foydalanuvchiga xabar
-        await callback_query.message.edit_caption(
-            caption=(
-                f"✅ Hisobot muvaffaqiyatli yuborildi!\n\n"
-                f"🆔 Shartnoma raqami: {data.get('contract_id')}\n"
-                f"🛍️ Mahsulot: {data.get('product_type')}\n"
-                f"💰 Summa: {data.get('contract_amount')}\n"
-                f"📍 Hudud: {data.get('client_location')}\n"
-                f"🚛 Dastavka: {delivery}\n"
-                f"📝 Izoh: {data.get('note', 'Yo\'q')}\n"
-                f"👫 Sotuvchi: {seller_name}\n"
-                f"🗂️ Sheet: {sheet_name}\n\n"
-                f"✅ Hisobotingiz tasdiqlandi!"
+        _start_report_pipeline(
+            _run_report_pipeline(
+                bot, message, state, user_id, data, assigned_group, original_caption, submission_day
             ),
-            reply_markup=get_report_confirmed_keyboard()
+            name=f"report_pipeline_{user_id}_{contract_id}"
         )
+    
+    finally:
+        _confirming_sessions.discard(state.key)
+
+
+@otchot_router.callback_query(F.data == "confirm_report")
+async def confirm_report_already_handled(callback_query: CallbackQuery):
+    """Holat tozalangandan keyin kelgan eski "Tasdiqlash" bosishlari"""
+    await callback_query.answer("ℹ️ Bu hisobot allaqachon qayta ishlangan.")
+
+
+# ==================== PAKET HISOBOTLAR ====================
+
+# Bitta xabardagi templatelar soni chegarasi (albomda 10 tagacha rasm - qolganlari keyingi albomda)
+BATCH_MAX_REPORTS = 20
+
+# Albom xabarlari alohida update bo'lib keladi - shuncha kutib bitta guruh sifatida qayta ishlanadi
+ALBUM_COLLECT_DELAY = 1.0
+
+# (FSM kaliti, media_group_id) -> albomning shu paytgacha kelgan xabarlari
+_album_buffers: Dict[Tuple[Any, str], List[Message]] = {}
+
+# FSM kaliti -> rasmlarni qo'shish qulfi. 10 tadan ko'p rasm ikki albom bo'lib keladi, ikkalasi
+# bir vaqtda uyg'onadi - batch_photos ni o'qish-yozish navbat bilan bo'lishi kerak (foydalanuvchiga bitta)
+_batch_image_locks: Dict[Any, asyncio.Lock] = {}
+
+
+def _drop_batch_image_state(key):
+    """
+    Rasmlar bosqichi tugaganda (tasdiqlashga o'tish, bekor qilish, yangi hisobot) foydalanuvchining
+    qulfi va albom buferlarini o'chirish - aks holda ular har bir sotuvchi uchun xotirada qoladi
+    """
+    lock = _batch_image_locks.get(key)
+    if lock is not None and not lock.locked():
+        del _batch_image_locks[key]
+    for album_key in [album_key for album_key in _album_buffers if album_key[0] == key]:
+        del _album_buffers[album_key]
+
+# Guruhga ketma-ket postlarda flood control (RetryAfter) bo'lsa shuncha marta kutib qayta uriniladi
+BATCH_POST_MAX_ATTEMPTS = 3
+
+
+def _prepare_template_data(parsed_data: Dict[str, str], selected_region: str) -> Dict[str, str]:
+    """Tanlangan hududni manzilga qo'shish va summani formatlash"""
+    if selected_region and selected_region not in parsed_data['client_location']:
+        parsed_data['client_location'] = f"{parsed_data['client_location']}, {selected_region}"
+    
+    parsed_data['contract_amount'] = format_amount(parsed_data['contract_amount'])
+    return parsed_data
+
+
+def _submission_contract_id(report: Dict[str, Any]) -> str:
+    return str(report.get('contract_id') or '').strip()
+
+
+async def process_batch_templates(message: Message, state: FSMContext, bot: Bot, templates: List[str]):
+    """Bir xabardagi bir nechta templateni tekshirish va rasmlar albomini kutishga o'tish"""
+    if len(templates) > BATCH_MAX_REPORTS:
+        await show_error_and_retry(
+            message, state, bot,
+            f"⚠️ Bitta xabarda ko'pi bilan {BATCH_MAX_REPORTS} ta hisobot yuborish mumkin.\n\n"
+            f"Siz {len(templates)} ta template yubordingiz. Ularni bo'lib, qaytadan yuboring:"
+        )
+        return
+    
+    data = await state.get_data()
+    selected_region = data.get('selected_region', '')
+    is_tashkent = data.get('is_tashkent', False)
+    
+    reports = []
+    error_blocks = []
+    contract_numbers = {}
+    for number, template in enumerate(templates, 1):
+        parsed_data, errors = parse_template(template)
+        if errors:
+            error_blocks.append(f"📄 Hisobot #{number}:\n{format_template_errors(errors)}")
+            continue
         
-        await state.clear()
+        contract_id = _submission_contract_id(parsed_data)
+        if contract_id in contract_numbers:
+            error_blocks.append(
+                f"📄 Hisobot #{number}:\n"
+                f"• {TEMPLATE_FIELD_LABELS['contract_id']}: #{contract_numbers[contract_id]} bilan bir xil"
+            )
+            continue
+        contract_numbers[contract_id] = number
         
-        logging.info(
-            f"Hisobot muvaffaqiyatli yuborildi: User={user_id}, Contract={data.get('contract_id')}, "
-            f"Toshkent={is_tashkent}, Sheet={sheet_name}, Seller={seller_name}, Delivery={delivery}"
+        reports.append({**_prepare_template_data(parsed_data, selected_region), 'is_tashkent': is_tashkent})
+    
+    if error_blocks:
+        await show_error_and_retry(
+            message, state, bot,
+            "⚠️ Ba'zi hisobotlarda xato bor:\n\n"
+            + "\n\n".join(error_blocks)
+            + "\n\nXatolarni tuzatib, barcha templatelarni qaytadan yuboring:"
+        )
+        return
+    
+    await state.update_data(batch_reports=reports, batch_photos=[])
+    
+    await process_step(
+        message, state, bot,
+        ReportState.waiting_for_batch_images,
+        f"✅ {len(reports)} ta hisobot qabul qilindi.\n\n"
+        f"📸 Endi {len(reports)} ta mahsulot rasmini albom qilib yuboring.\n\n"
+        f"💡 Rasmlar hisobotlar tartibida bo'lsin (1-rasm - 1-hisobot uchun). "
+        f"Albomda ko'pi bilan 10 ta rasm bo'ladi - qolganlarini keyingi albomda yuboring."
+    )
+    
+    logging.info(f"Paket template qabul qilindi: {len(reports)} ta hisobot (Toshkent: {is_tashkent})")
+
+
+async def _collect_album(message: Message, state: FSMContext) -> Optional[List[Message]]:
+    """
+    Albom xabarlarini yig'ish: birinchi xabar ALBUM_COLLECT_DELAY kutib butun albomni qaytaradi,
+    qolganlari buferga qo'shilib None qaytaradi
+    """
+    if not message.media_group_id:
+        return [message]
+    
+    album_key = (state.key, message.media_group_id)
+    buffer = _album_buffers.get(album_key)
+    if buffer is not None:
+        buffer.append(message)
+        return None
+    
+    _album_buffers[album_key] = buffer = [message]
+    try:
+        await asyncio.sleep(ALBUM_COLLECT_DELAY)
+    finally:
+        _album_buffers.pop(album_key, None)
+    return sorted(buffer, key=lambda album_message: album_message.message_id)
+
+
+async def _send_batch_prompt(message: Message, state: FSMContext, bot: Bot, text: str, keyboard_markup=None):
+    """Oldingi bot xabarini almashtirish (albom rasmlari o'chirilmaydi)"""
+    await delete_previous_messages(bot, message.chat.id, state)
+    sent_message = await message.answer(
+        text,
+        reply_markup=keyboard_markup or get_cancel_report_inline_keyboard()
+    )
+    await state.update_data(last_bot_prompt_id=sent_message.message_id)
+    return sent_message
+
+
+def _batch_confirmation_text(reports: List[Dict[str, Any]]) -> str:
+    sheet_name = get_daily_worksheet_name(reports[0].get('is_tashkent', False))
+    lines = [f"📝 PAKET HISOBOT TASDIQLASH ({len(reports)} ta)", ""]
+    for number, report in enumerate(reports, 1):
+        lines.append(
+            f"{number}. 👤 {report.get('client_name')} | 🆔 {report.get('contract_id')} | "
+            f"💰 {report.get('contract_amount')} | 🛍️ {report.get('product_type')}"
         )
-        await callback_query.answer("✅ Hisobot yuborildi!")
+    lines += ["", f"🗂️ Sheet: {sheet_name}", "", "Ma'lumotlar to'g'rimi?"]
+    return "\n".join(lines)
+
+
+@otchot_router.message(ReportState.waiting_for_batch_images, F.photo)
+async def process_batch_images(message: Message, state: FSMContext, bot: Bot):
+    """Paket hisobot rasmlari - albom bir marta qayta ishlanadi, rasmlar hisobotlarga tartib bo'yicha biriktiriladi"""
+    album = await _collect_album(message, state)
+    if album is None:
+        return
+    
+    async with _batch_image_locks.setdefault(state.key, asyncio.Lock()):
+        await _attach_batch_images(message, state, bot, album)
+    
+    if await state.get_state() != ReportState.waiting_for_batch_images.state:
+        _drop_batch_image_state(state.key)
+
+
+async def _attach_batch_images(message: Message, state: FSMContext, bot: Bot, album: List[Message]):
+    # Kutish paytida jarayon bekor qilingan yoki boshqa albom bilan to'lgan bo'lishi mumkin
+    if await state.get_state() != ReportState.waiting_for_batch_images.state:
+        return
+    
+    data = await state.get_data()
+    reports = data.get('batch_reports') or []
+    photos = (data.get('batch_photos') or []) + [_photo_fields(album_message.photo) for album_message in album]
+    
+    if len(photos) > len(reports):
+        await state.update_data(batch_photos=[])
+        await _send_batch_prompt(
+            message, state, bot,
+            f"⚠️ Rasmlar soni ({len(photos)}) hisobotlar sonidan ({len(reports)}) ko'p.\n\n"
+            f"Iltimos, {len(reports)} ta rasmni qaytadan yuboring:"
+        )
+        return
+    
+    if len(photos) < len(reports):
+        await state.update_data(batch_photos=photos)
+        await _send_batch_prompt(
+            message, state, bot,
+            f"📸 {len(photos)}/{len(reports)} ta rasm qabul qilindi.\n\n"
+            f"Qolgan {len(reports) - len(photos)} ta rasmni yuboring:"
+        )
+        return
+    
+    for report, photo in zip(reports, photos):
+        report.update(photo)
+    await state.update_data(batch_reports=reports, batch_photos=photos)
+    
+    sent_message = await _send_batch_prompt(
+        message, state, bot,
+        _batch_confirmation_text(reports),
+        get_batch_report_confirmation_keyboard()
+    )
+    await state.set_state(ReportState.waiting_for_batch_confirmation)
+    await state.update_data(confirmation_message_id=sent_message.message_id, last_bot_prompt_id=None)
     
+    logging.info(f"Paket hisobot rasmlari qabul qilindi: {len(photos)} ta, tasdiqlash ko'rsatildi")
+
+
+@otchot_router.message(ReportState.waiting_for_batch_images)
+async def handle_invalid_batch_images(message: Message, state: FSMContext, bot: Bot):
+    """Paket rejimida rasm o'rniga boshqa narsa yuborilganini boshqarish"""
+    data = await state.get_data()
+    await show_error_and_retry(
+        message, state, bot,
+        f"⚠️ Iltimos, {len(data.get('batch_reports') or [])} ta mahsulot rasmini albom qilib yuboring.\n\n"
+        f"💡 Faqat rasm (photo) formatida yuborishingiz kerak."
+    )
+
+
+async def _restore_batch_confirmation(message: Message, state: FSMContext, data: Dict[str, Any],
+                                      original_text: str, error_text: str):
+    """Paket yuborishda xato - tasdiqlash holati va tugmalarini qaytarish (yangi hisobot boshlanmagan bo'lsa)"""
+    if await state.get_state() is not None:
+        logging.warning("Sotuvchi yangi hisobot boshlagan - paket tasdiqlash holati tiklanmadi")
+        try:
+            await message.edit_text(f"{original_text}\n\n{error_text}")
+        except TelegramBadRequest as e:
+            logging.error(f"Paket tasdiqlash xabarini yangilashda xato: {e}")
+        return
+
+    await state.set_state(ReportState.waiting_for_batch_confirmation)
+    await state.set_data(data)
+    try:
+        await message.edit_text(
+            f"{original_text}\n\n{error_text}",
+            reply_markup=get_batch_report_confirmation_keyboard()
+        )
     except TelegramBadRequest as e:
-        logging.error(f"Guruhga yuborishda xato: {e}")
-        await callback_query.answer(
-            "❌ Guruhga yuborishda xato. Admin bilan bog'laning.",
-            show_alert=True
+        logging.error(f"Paket tasdiqlash xabarini tiklashda xato: {e}")
+
+
+async def _save_reports_to_sheets(group_id: int, reports: List[Dict[str, Any]], report_ids: List[int],
+                                  is_tashkent: bool, sheet_name: str, timer: _StageTimer):
+    """
+    Paket hisobotlarni guruh sheetiga va ALL DATA ga yozish - har bir worksheetga bitta append.
+    report_ids - DB dagi id lar (reports tartibida)
+    """
+    try:
+        with timer.stage("sheet_lookup"):
+            sheet_info = await get_group_google_sheet(group_id)
+        if not sheet_info:
+            return
+        spreadsheet_id = sheet_info[2]
+        
+        sheet_rows = [{**report, 'sender_full_name': report.get('seller_name')} for report in reports]
+        
+        with timer.stage("daily_sheet"):
+            sheet_success = await save_reports_to_daily_sheet_async(spreadsheet_id, sheet_rows, is_tashkent)
+        
+        if sheet_success:
+            logging.info(f"✅ {len(sheet_rows)} ta hisobot Google Sheets'ga saqlandi: {sheet_name}")
+        else:
+            logging.warning("⚠️ Paket hisobotlar Google Sheets'ga saqlanmadi")
+        
+        # Davriy rejimga tegishlilarini ALL DATA ga sheets_sync DB dan to'ldiradi
+        all_data_spreadsheet_id = get_all_data_spreadsheet_id()
+        all_data_rows = [
+            row for row, report_id in zip(sheet_rows, report_ids) if should_write_all_data_live(report_id)
+        ] if all_data_spreadsheet_id else []
+        if all_data_rows:
+            with timer.stage("all_data"):
+                all_data_success = await save_reports_to_all_data_async(
+                    all_data_spreadsheet_id, all_data_rows, is_tashkent
+                )
+            if all_data_success:
+                logging.info(f"✅ Paket hisobotlar ALL DATA sheetga ham saqlandi: {get_daily_all_data_worksheet_name()}")
+            else:
+                logging.warning("⚠️ Paket hisobotlar ALL DATA sheetga saqlanmadi")
+    
+    except Exception as e:
+        logging.error(f"Paket hisobotlarni Google Sheets'ga saqlashda xato: {e}")
+
+
+async def _post_batch_report_to_group(bot: Bot, report: Dict[str, Any], group_id: int,
+                                      topic_id: Optional[int]) -> Message:
+    """Paketdagi hisobotni guruhga yuborish, RetryAfter da ko'rsatilgan vaqt kutib qayta urinish"""
+    for attempt in range(1, BATCH_POST_MAX_ATTEMPTS + 1):
+        try:
+            return await _post_report_to_group(bot, report, group_id, topic_id)
+        except TelegramRetryAfter as e:
+            if attempt == BATCH_POST_MAX_ATTEMPTS:
+                raise
+            logging.warning(f"⏳ Guruhga yuborishda flood control: {e.retry_after}s kutilmoqda")
+            await asyncio.sleep(e.retry_after)
+
+
+async def _run_batch_report_pipeline(bot: Bot, message: Message, state: FSMContext, user_id: int,
+                                     data: Dict[str, Any], reports: List[Dict[str, Any]],
+                                     skipped: List[Dict[str, Any]], assigned_group: tuple,
+                                     original_text: str, submission_day: str):
+    """
+    Paket hisobotlarni fonda yuborish: guruhga postlar -> bitta DB tranzaksiyasi -> sotuvchi xabari ->
+    kunlik sheet va ALL DATA ga bittadan append
+    """
+    timer = _StageTimer()
+    group_id, group_name, topic_id, google_sheet_id = assigned_group
+    
+    is_tashkent = reports[0].get('is_tashkent', False)
+    sheet_name = get_daily_worksheet_name(is_tashkent)
+    
+    posted = []
+    failed = []
+    with timer.stage("group_post"):
+        for report in reports:
+            try:
+                sent_message = await _post_batch_report_to_group(bot, report, group_id, topic_id)
+                posted.append((_build_report_data(report), sent_message.message_id))
+            except Exception as e:
+                # Bitta hisobot xatosi qolganlarini to'xtatmaydi - guruhdagilar baribir DB ga yoziladi
+                logging.error(f"Guruhga yuborishda xato (Contract={report.get('contract_id')}): {e}")
+                failed.append(report)
+    
+    if failed:
+        await release_report_submissions(
+            user_id, [_submission_contract_id(report) for report in failed], submission_day
+        )
+    if not posted:
+        await _restore_batch_confirmation(
+            message, state, data, original_text, "❌ Guruhga yuborishda xato. Admin bilan bog'laning."
+        )
+        return
+    
+    try:
+        with timer.stage("db_insert"):
+            report_ids = await add_sales_reports_batch(user_id, posted, google_sheet_id, submission_day)
+    except Exception as e:
+        logging.error(f"Paket hisobotlarni DB ga saqlashda xato: {e}")
+        report_ids = None
+    
+    if report_ids is None:
+        await release_report_submissions(
+            user_id, [_submission_contract_id(report_data) for report_data, _ in posted], submission_day
+        )
+        await _restore_batch_confirmation(
+            message, state, data, original_text, "❌ Xatolik yuz berdi. Qaytadan urinib ko'ring."
         )
+        return
+    
+    for report_data, _ in posted:
+        store_report_photo(report_data)
+    
+    lines = [f"✅ {len(posted)} ta hisobot muvaffaqiyatli yuborildi!", ""]
+    for number, (report_data, _) in enumerate(posted, 1):
+        lines.append(
+            f"{number}. 🆔 {report_data.get('contract_id')} | 👤 {report_data.get('client_name')} | "
+            f"💰 {report_data.get('contract_amount')}"
+        )
+    if skipped:
+        lines += ["", f"🔁 Allaqachon yuborilgan: {', '.join(str(report.get('contract_id')) for report in skipped)}"]
+    if failed:
+        lines += [
+            "",
+            f"❌ Yuborilmadi: {', '.join(str(report.get('contract_id')) for report in failed)}\n"
+            f"Ularni qaytadan yuboring."
+        ]
+    lines += ["", f"🗂️ Sheet: {sheet_name}"]
+    
+    try:
+        with timer.stage("seller_edit"):
+            await message.edit_text("\n".join(lines), reply_markup=get_report_confirmed_keyboard())
     except Exception as e:
-        logging.error(f"Hisobotni yuborishda xato: {e}")
-        await callback_query.answer(
-            "❌ Xatolik yuz berdi. Qaytadan urinib ko'ring.",
-            show_alert=True
+        logging.warning(f"Sotuvchi xabarini yangilashda xato: {e}")
+    
+    if google_sheet_id:
+        await _save_reports_to_sheets(
+            group_id, [report_data for report_data, _ in posted], report_ids, is_tashkent, sheet_name, timer
         )
+    
+    logging.info(
+        f"Paket hisobot yuborildi: User={user_id}, Yuborildi={len(posted)}, "
+        f"Takroriy={len(skipped)}, Xato={len(failed)}, Sheet={sheet_name}"
+    )
+    logging.info(f"⏱ Paket hisobot pipeline ({len(posted)} ta): {timer.summary()}")
+
+
+@otchot_router.callback_query(F.data == "confirm_batch_report", ReportState.waiting_for_batch_confirmation)
+async def confirm_and_send_batch_report(callback_query: CallbackQuery, state: FSMContext, bot: Bot):
+    """
+    Paket hisobotlarni tasdiqlash
+    Bugun allaqachon yuborilgan shartnomalar o'tkazib yuboriladi, qolganlari bitta pipeline'da yuboriladi
+    """
+    if state.key in _confirming_sessions:
+        await callback_query.answer("⏳ Hisobotlar yuborilmoqda...")
+        return
+    _confirming_sessions.add(state.key)
+    
+    try:
+        user_id = callback_query.from_user.id
+        data = await state.get_data()
+        reports = data.get('batch_reports') or []
+        if not reports:
+            await callback_query.answer("ℹ️ Bu hisobotlar allaqachon qayta ishlangan.")
+            return
+        
+        message = callback_query.message
+        original_text = message.html_text
+        
+        submission_day = date.today().isoformat()
+        claims = await claim_report_submissions(
+            user_id, [_submission_contract_id(report) for report in reports], submission_day
+        )
+        to_send = [report for report in reports if claims[_submission_contract_id(report)][0]]
+        skipped = [report for report in reports if not claims[_submission_contract_id(report)][0]]
+        
+        if not to_send:
+            await state.clear()
+            await callback_query.answer("✅ Bu hisobotlar allaqachon yuborilgan!")
+            try:
+                await message.edit_text("✅ Barcha hisobotlar allaqachon yuborilgan.", reply_markup=None)
+            except TelegramBadRequest:
+                pass
+            logging.info(f"🔁 Takroriy paket tasdiqlash o'tkazib yuborildi: User={user_id}")
+            return
+        
+        await callback_query.answer(f"⏳ {len(to_send)} ta hisobot yuborilmoqda...")
+        
+        assigned_group = await get_user_assigned_group(user_id)
+        if not assigned_group:
+            await release_report_submissions(
+                user_id, [_submission_contract_id(report) for report in to_send], submission_day
+            )
+            await _restore_batch_confirmation(message, state, data, original_text, "❌ Guruh topilmadi!")
+            return
+        
+        await state.clear()
+        
+        try:
+            await message.edit_text(f"⏳ {len(to_send)} ta hisobot yuborilmoqda...", reply_markup=None)
+        except TelegramBadRequest as e:
+            logging.warning(f"Kutish holatini ko'rsatishda xato: {e}")
+        
+        _start_report_pipeline(
+            _run_batch_report_pipeline(
+                bot, message, state, user_id, data, to_send, skipped, assigned_group, original_text, submission_day
+            ),
+            name=f"batch_report_pipeline_{user_id}_{message.message_id}"
+        )
+    
+    finally:
+        _confirming_sessions.discard(state.key)
+
+
+@otchot_router.callback_query(F.data == "confirm_batch_report")
+async def confirm_batch_report_already_handled(callback_query: CallbackQuery):
+    """Holat tozalangandan keyin kelgan eski paket "Tasdiqlash" bosishlari"""
+    await callback_query.answer("ℹ️ Bu hisobotlar allaqachon qayta ishlangan.")
 
 
 # ==================== O'ZGARTIRISH HANDLERLARI ====================
@@ -827,6 +1513,7 @@ async def cancel_report(callback_query: CallbackQuery, state: FSMContext):
 async def cancel_report_submission(callback_query: CallbackQuery, state: FSMContext):
     """Hisobot jarayonini bekor qilish"""
     await state.clear()
+    _drop_batch_image_state(state.key)
     try:
         await callback_query.message.delete()
     except:
@@ -0,0 +1,164 @@
+"""
+photo_store.py - hisobot rasmlarini lokal diskka saqlash
+Rasmlar Telegram file_unique_id bo'yicha saqlanadi: bir xil rasm ikki marta yuklanmaydi.
+Yo'l ikki darajali papkalarga bo'linadi (ab/cd/abcd...jpg), yonida eng kichik o'lchamdagi
+nusxa (thumbnail) turadi. Rasm hisobot DB ga yozilishi bilan (holatidan qat'i nazar) navbatga
+qo'yiladi, yuklash fonda bajariladi, handlerlar kutmaydi.
+Navbat xotirada - bot to'xtasa, qolganlari keyingi ishga tushishda DB dan qayta yig'iladi.
+"""
+
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+
+from database import (
+    get_unstored_report_photos, get_stored_photo, save_stored_photo, link_stored_photo, record_photo_store_failure
+)
+
+# Rasmlar papkasi (None - lokal saqlash o'chirilgan)
+PHOTO_STORE_DIR = "photo_store"
+
+# Parallel yuklovchilar soni
+PHOTO_DOWNLOAD_WORKERS = 2
+
+# Navbat to'lsa yangi rasmlar tashlab yuboriladi (keyingi ishga tushishda qayta yig'iladi)
+PHOTO_QUEUE_SIZE = 1000
+
+# Ishga tushganda DB dan navbatga qo'yiladigan saqlanmagan rasmlar soni
+PHOTO_BACKFILL_LIMIT = 500
+
+# Shuncha marta yuklab bo'lmagan rasm (20 MB dan katta, eskirgan file_id) backfillga qo'yilmaydi
+PHOTO_MAX_ATTEMPTS = 3
+
+
+def photo_relative_path(file_unique_id: str, suffix: str = "") -> str:
+    """file_unique_id -> PHOTO_STORE_DIR ga nisbatan yo'l (ab/cd/<id><suffix>.jpg)"""
+    return os.path.join(file_unique_id[:2], file_unique_id[2:4], f"{file_unique_id}{suffix}.jpg")
+
+
+class PhotoStore:
+    """Yuklash navbati: (file_id, file_unique_id, thumb_file_id)"""
+
+    def __init__(self, root: str, queue_size: int = PHOTO_QUEUE_SIZE):
+        self.root = root
+        self.stats: Counter = Counter()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._queued: Set[str] = set()
+
+    def enqueue(self, file_id: str, file_unique_id: Optional[str] = None, thumb_id: Optional[str] = None):
+        """Rasmni yuklashga navbatga qo'yish (kutilmaydi)"""
+        key = file_unique_id or file_id
+        if not file_id or key in self._queued:
+            return
+        try:
+            self._queue.put_nowait((file_id, file_unique_id, thumb_id))
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            return
+        self._queued.add(key)
+
+    async def worker(self, bot: Bot):
+        while True:
+            file_id, file_unique_id, thumb_id = await self._queue.get()
+            try:
+                await self._store(bot, file_id, file_unique_id, thumb_id)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logging.error(f"Rasmni lokal saqlashda xato ({file_unique_id or file_id}): {e}")
+                await record_photo_store_failure(file_id, str(e))
+            finally:
+                self._queued.discard(file_unique_id or file_id)
+                self._queue.task_done()
+
+    async def _store(self, bot: Bot, file_id: str, file_unique_id: Optional[str], thumb_id: Optional[str]):
+        if not file_unique_id:
+            # Eski hisobotlar - unique_id faqat getFile dan olinadi
+            file_unique_id = (await bot.get_file(file_id)).file_unique_id
+
+        stored = await get_stored_photo(file_unique_id)
+        if stored and os.path.exists(os.path.join(self.root, stored[0])):
+            # Eski hisobot boshqa file_id bilan - unique_id yozilmasa backfill uni har safar qayta oladi
+            await link_stored_photo(file_unique_id, file_id)
+            self.stats['deduplicated'] += 1
+            return
+
+        file_path = photo_relative_path(file_unique_id)
+        await self._download(bot, file_id, file_path)
+
+        thumb_path = None
+        if thumb_id and thumb_id != file_id:
+            thumb_path = photo_relative_path(file_unique_id, "_thumb")
+            try:
+                await self._download(bot, thumb_id, thumb_path)
+            except Exception as e:
+                thumb_path = None
+                logging.warning(f"Thumbnail yuklanmadi ({file_unique_id}): {e}")
+
+        file_size = os.path.getsize(os.path.join(self.root, file_path))
+        await save_stored_photo(file_unique_id, file_id, file_path, thumb_path, file_size)
+        self.stats['stored'] += 1
+        self.stats['bytes'] += file_size
+
+    async def _download(self, bot: Bot, file_id: str, relative_path: str):
+        # Vaqtinchalik faylga yozib, keyin nomini almashtirish - yarim yozilgan rasm o'qilmaydi
+        destination = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        temp_path = f"{destination}.part"
+        await bot.download(file_id, destination=temp_path)
+        os.replace(temp_path, destination)
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats, queued=self._queue.qsize())
+
+
+photo_store = PhotoStore(PHOTO_STORE_DIR) if PHOTO_STORE_DIR else None
+
+
+def store_report_photo(report_data: Dict[str, Any]):
+    """Hisobot DB ga yozilgandan keyin rasmini navbatga qo'yish (otchot pipeline'laridan)"""
+    if photo_store is None:
+        return
+    photo_store.enqueue(
+        report_data.get('product_image_id'),
+        report_data.get('product_image_unique_id'),
+        report_data.get('product_thumb_id')
+    )
+
+
+async def get_local_photo(file_unique_id: str) -> Optional[Tuple[str, Optional[str]]]:
+    """Eksport va audit uchun: (rasm yo'li, thumbnail yo'li) yoki None (hali saqlanmagan)"""
+    if photo_store is None or not file_unique_id:
+        return None
+    stored = await get_stored_photo(file_unique_id)
+    if not stored:
+        return None
+    file_path, thumb_path, _ = stored
+    return (
+        os.path.join(photo_store.root, file_path),
+        os.path.join(photo_store.root, thumb_path) if thumb_path else None
+    )
+
+
+async def backfill_photo_store():
+    """Oldingi ishga tushishda navbatda qolgan yoki eski hisobot rasmlarini navbatga qo'yish"""
+    photos = await get_unstored_report_photos(PHOTO_BACKFILL_LIMIT, PHOTO_MAX_ATTEMPTS)
+    for file_id, file_unique_id, thumb_id in photos:
+        photo_store.enqueue(file_id, file_unique_id, thumb_id)
+    if photos:
+        logging.info(f"📷 {len(photos)} ta saqlanmagan rasm lokal omborga navbatga qo'yildi")
+
+
+def start_photo_store_jobs(bot: Bot) -> List[asyncio.Task]:
+    """bot.main dan chaqiriladi"""
+    if photo_store is None:
+        return []
+    tasks = [
+        asyncio.create_task(photo_store.worker(bot), name=f"photo_store_{index}")
+        for index in range(PHOTO_DOWNLOAD_WORKERS)
+    ]
+    tasks.append(asyncio.create_task(backfill_photo_store(), name="photo_store_backfill"))
+    return tasks
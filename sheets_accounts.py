@@ -0,0 +1,256 @@
+"""
+sheets_accounts.py - Google Sheets uchun service account pooli
+Bir nechta credentials*.json fayli bo'lsa, so'rovlar ular orasida taqsimlanadi:
+eng kam ishlatilgan va kvotasi ko'p qolgan account tanlanadi, 429 olgan account
+vaqtincha chetlatiladi. Bitta spreadsheetga yozish bitta accountga biriktiriladi,
+shuning uchun yozuvlar tartibi saqlanadi.
+
+Eslatma: har bir spreadsheet barcha service account emaillari bilan ulashilgan bo'lishi kerak.
+Ulashilmagan spreadsheet uchun account 403/404 olsa, u shu spreadsheetda boshqa ishlatilmaydi.
+"""
+
+import glob
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+from sheets_metrics import extract_spreadsheet_id
+
+# Pool tarkibi: loyihadagi credentials.json, credentials_2.json, ... fayllari
+CREDENTIALS_GLOB = "credentials*.json"
+
+# Bitta service account uchun daqiqadagi so'rovlar kvotasi (Sheets API per-user limit)
+QUOTA_PER_MINUTE = 60
+QUOTA_WINDOW_SECONDS = 60
+
+# 429 dan keyin chetlatish vaqti (Retry-After bo'lmasa) va ketma-ket xatolar chegarasi
+RATE_LIMIT_COOLDOWN_SECONDS = 60
+FAILURE_COOLDOWN_SECONDS = 300
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class ServiceAccount:
+    """Bitta service account: kvota oynasi, sog'liq holati va keshlangan clientlar"""
+
+    def __init__(self, credentials_file: str, email: str):
+        self.credentials_file = credentials_file
+        self.email = email
+        self.requests = deque()
+        self.last_used = 0.0
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.total_requests = 0
+        self.total_rate_limited = 0
+        self.total_failures = 0
+        # Spreadsheet ulashilmagan (403/404) bo'lsa shu yerga tushadi
+        self.denied_spreadsheets: Set[str] = set()
+        # google_sheets_integration va sheets_async tomonidan to'ldiriladi
+        self.gspread_client = None
+        self.async_client = None
+
+    def _prune(self, now: float):
+        while self.requests and now - self.requests[0] > QUOTA_WINDOW_SECONDS:
+            self.requests.popleft()
+
+    def remaining_quota(self, now: Optional[float] = None) -> int:
+        now = now or time.time()
+        self._prune(now)
+        return max(0, QUOTA_PER_MINUTE - len(self.requests))
+
+    def is_healthy(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.cooldown_until
+
+    def can_access(self, spreadsheet_id: Optional[str]) -> bool:
+        return not spreadsheet_id or spreadsheet_id not in self.denied_spreadsheets
+
+    def status(self) -> Dict:
+        now = time.time()
+        return {
+            'email': self.email,
+            'healthy': self.is_healthy(now),
+            'cooldown_seconds': max(0, int(self.cooldown_until - now)),
+            'remaining_quota': self.remaining_quota(now),
+            'total_requests': self.total_requests,
+            'rate_limited': self.total_rate_limited,
+            'failures': self.total_failures,
+            'denied_spreadsheets': len(self.denied_spreadsheets)
+        }
+
+
+class ServiceAccountPool:
+    """So'rovlarni service accountlar orasida taqsimlash"""
+
+    def __init__(self, accounts: List[ServiceAccount]):
+        if not accounts:
+            raise ValueError("Pool uchun kamida bitta service account kerak")
+        self.accounts = accounts
+        self._lock = threading.Lock()
+        # spreadsheet_id -> yozish uchun biriktirilgan account
+        self._pinned: Dict[str, ServiceAccount] = {}
+
+    def acquire(self, spreadsheet_id: Optional[str] = None, write: bool = False) -> ServiceAccount:
+        """
+        So'rov uchun account tanlash
+        Yozish: spreadsheetga biriktirilgan account (sog'lom bo'lsa)
+        Aks holda: sog'lom accountlar ichidan eng ko'p kvota qolgani, keyin eng kam ishlatilgani
+        """
+        with self._lock:
+            now = time.time()
+
+            if write and spreadsheet_id:
+                pinned = self._pinned.get(spreadsheet_id)
+                if pinned and pinned.is_healthy(now) and pinned.can_access(spreadsheet_id):
+                    pinned.last_used = now
+                    return pinned
+
+            candidates = [account for account in self.accounts if account.can_access(spreadsheet_id)]
+            if not candidates:
+                # Hech biriga ruxsat yo'q - ro'yxatni tozalab qayta urinib ko'rish
+                for account in self.accounts:
+                    account.denied_spreadsheets.discard(spreadsheet_id)
+                candidates = list(self.accounts)
+
+            healthy = [account for account in candidates if account.is_healthy(now)]
+            if healthy:
+                account = min(healthy, key=lambda a: (-a.remaining_quota(now), a.last_used))
+            else:
+                # Hammasi chetlatilgan - eng tez tiklanadiganini olish
+                account = min(candidates, key=lambda a: a.cooldown_until)
+
+            account.last_used = now
+            if write and spreadsheet_id:
+                previous = self._pinned.get(spreadsheet_id)
+                if previous is not account:
+                    self._pinned[spreadsheet_id] = account
+                    if previous:
+                        logging.info(
+                            f"🔀 {spreadsheet_id} yozuvlari {previous.email} dan {account.email} ga o'tkazildi"
+                        )
+            return account
+
+    def record_response(self, account: ServiceAccount, url: str, status: int, retry_after: Optional[float] = None):
+        """Har bir HTTP javobdan keyin accountning kvota va sog'liq holatini yangilash"""
+        with self._lock:
+            now = time.time()
+            account.requests.append(now)
+            account.total_requests += 1
+
+            if status == 429:
+                account.total_rate_limited += 1
+                account.cooldown_until = now + (retry_after or RATE_LIMIT_COOLDOWN_SECONDS)
+                logging.warning(f"⚠️ {account.email} kvotasi tugadi (429), vaqtincha chetlatildi")
+            elif status in (403, 404):
+                spreadsheet_id = extract_spreadsheet_id(url)
+                if spreadsheet_id:
+                    account.denied_spreadsheets.add(spreadsheet_id)
+                    if self._pinned.get(spreadsheet_id) is account:
+                        del self._pinned[spreadsheet_id]
+            elif status == 0 or status == 401 or status >= 500:
+                account.total_failures += 1
+                account.consecutive_failures += 1
+                if account.consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                    account.cooldown_until = now + FAILURE_COOLDOWN_SECONDS
+                    logging.warning(f"⚠️ {account.email} ketma-ket xatolar sababli vaqtincha chetlatildi")
+            else:
+                account.consecutive_failures = 0
+
+    def status(self) -> List[Dict]:
+        with self._lock:
+            return [account.status() for account in self.accounts]
+
+
+# ==================== SESSION KUZATUVI ====================
+
+def track_account_session(session, pool: ServiceAccountPool, account: ServiceAccount):
+    """requests.Session.request ni o'rab, javoblarni pool.record_response ga uzatish"""
+    if session is None or getattr(session, '_sheets_account_tracked', False):
+        return session
+
+    original_request = session.request
+
+    def request(method, url, *args, **kwargs):
+        status = 0
+        retry_after = None
+        try:
+            response = original_request(method, url, *args, **kwargs)
+            status = response.status_code
+            retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+            return response
+        except Exception as e:
+            response = getattr(e, 'response', None)
+            if response is not None and getattr(response, 'status_code', None):
+                status = response.status_code
+            raise
+        finally:
+            pool.record_response(account, url, status, retry_after)
+
+    session.request = request
+    session._sheets_account_tracked = True
+    return session
+
+
+def _parse_retry_after(value) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+# ==================== POOL OLISH ====================
+
+_pool: Optional[ServiceAccountPool] = None
+_pool_lock = threading.Lock()
+
+
+def load_service_accounts(pattern: str = CREDENTIALS_GLOB) -> List[ServiceAccount]:
+    """credentials*.json fayllaridan service accountlarni o'qish (bir xil email bir marta)"""
+    accounts = []
+    seen = set()
+    for credentials_file in sorted(glob.glob(pattern)):
+        try:
+            with open(credentials_file, encoding='utf-8') as f:
+                info = json.load(f)
+            email = info['client_email']
+        except Exception as e:
+            logging.error(f"❌ Service account fayli o'qilmadi: {credentials_file} - {e}")
+            continue
+        if email in seen:
+            continue
+        seen.add(email)
+        accounts.append(ServiceAccount(credentials_file, email))
+    return accounts
+
+
+def get_account_pool() -> Optional[ServiceAccountPool]:
+    """Jarayon bo'yicha yagona pool (credentials fayllari bo'lmasa None)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                accounts = load_service_accounts()
+                if not accounts:
+                    return None
+                _pool = ServiceAccountPool(accounts)
+                logging.info(f"✅ Service account pooli: {len(accounts)} ta account")
+    return _pool
+
+
+def format_pool_status() -> str:
+    """Adminlar uchun accountlar holati"""
+    pool = _pool
+    if pool is None:
+        return "👥 Service accountlar: pool hali ishga tushmagan"
+
+    text = f"👥 Service accountlar ({len(pool.accounts)} ta)\n"
+    for status in pool.status():
+        state = "✅" if status['healthy'] else f"⏸ {status['cooldown_seconds']} s"
+        text += (
+            f"\n{state} {status['email']}\n"
+            f"├ Kvota qoldi: {status['remaining_quota']}/{QUOTA_PER_MINUTE} (daqiqada)\n"
+            f"├ So'rovlar: {status['total_requests']} (429: {status['rate_limited']}, xato: {status['failures']})\n"
+            f"└ Ruxsatsiz spreadsheetlar: {status['denied_spreadsheets']}\n"
+        )
+    return text.rstrip()
@@ -0,0 +1,310 @@
+"""
+sheets_archive.py - yopilgan oylarning kunlik worksheetlarini oylik arxiv spreadsheetlarga ko'chirish
+
+Har kuni SH/VL/ALL DATA worksheetlari qo'shiladi va bir yilda spreadsheet mingdan ortiq tabga
+yetadi - har bir open_by_key/worksheets() metadata so'rovi sekinlashadi. Arxivlash har bir
+manba spreadsheet va oy uchun alohida arxiv spreadsheet ochadi (sheet_archives jadvali),
+tablarni copyTo bilan ko'chiradi, nomlarini bitta batchUpdate bilan tiklaydi va manbadan
+bitta batchUpdate (deleteSheet) bilan o'chiradi. Jonli spreadsheetda faqat joriy oy qoladi.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from aiogram import Router, Bot
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from config import ADMIN_ID
+from database import (
+    get_all_google_sheets, get_sheet_archive, save_sheet_archive, get_sheet_archives,
+    move_sheet_row_locations
+)
+from google_sheets_integration import get_google_sheets_client, worksheet_lock
+from sheets_accounts import get_account_pool
+from sheets_metrics import sheets_operation
+from additional import is_admin, get_all_data_spreadsheet_id
+
+sheets_archive_router = Router()
+
+# Kunlik worksheet nomlari: "SH 28.11.2025", "VL 28.11.2025", "ALL DATA 28.11.2025"
+DAILY_WORKSHEET_PATTERN = re.compile(r'^(?:SH|VL|ALL DATA) (\d{2})\.(\d{2})\.(\d{4})$')
+
+# Arxivlash kuniga bir marta tekshiriladi
+ARCHIVE_INTERVAL_SECONDS = 24 * 60 * 60
+
+# Oy yopilgandan keyin shuncha kun kutiladi - kechikkan hisobotlar va solishtirish tugashi uchun
+ARCHIVE_GRACE_DAYS = 3
+
+# Bitta ishga tushishda spreadsheet boshiga ko'chiriladigan tablar (copyTo - yozish kvotasi)
+ARCHIVE_MAX_WORKSHEETS_PER_RUN = 150
+ARCHIVE_COPY_DELAY = 1.1
+
+# Arxiv spreadsheetlar yaratiladigan Drive papkasi (None - service account Drive ildizi)
+ARCHIVE_FOLDER_ID = None
+
+
+# ==================== ARXIVLASH (SINXRON) ====================
+
+def worksheet_date(title: str) -> Optional[date]:
+    """Kunlik worksheet nomidan sanani olish (kunlik bo'lmasa None)"""
+    match = DAILY_WORKSHEET_PATTERN.match(title)
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def archive_cutoff(for_date: Optional[date] = None) -> date:
+    """Shu sanadan oldingi tablar arxivlanadi (ARCHIVE_GRACE_DAYS o'tgan oyning 1-kuni)"""
+    return ((for_date or date.today()) - timedelta(days=ARCHIVE_GRACE_DAYS)).replace(day=1)
+
+
+def archivable_worksheets(worksheets: list, cutoff: date) -> Dict[str, list]:
+    """Oy (YYYY-MM) -> shu oyning cutoff dan oldingi kunlik worksheetlari (yangisi birinchi)"""
+    by_month = defaultdict(list)
+    for worksheet in worksheets:
+        worksheet_day = worksheet_date(worksheet.title)
+        if worksheet_day and worksheet_day < cutoff:
+            by_month[worksheet_day.strftime('%Y-%m')].append((worksheet_day, worksheet))
+
+    return {
+        month: [worksheet for _, worksheet in sorted(items, key=lambda item: item[0], reverse=True)]
+        for month, items in by_month.items()
+    }
+
+
+def _share_archive(client, source_spreadsheet_id: str, archive_spreadsheet_id: str):
+    """Arxivni manba spreadsheet foydalanuvchilari va pooldagi barcha service accountlar bilan ulashish"""
+    recipients = {}
+    for permission in client.list_permissions(source_spreadsheet_id):
+        email = permission.get('emailAddress')
+        if permission.get('type') not in ('user', 'group') or not email:
+            continue
+        role = permission.get('role')
+        recipients[email] = (permission['type'], 'writer' if role in ('owner', 'organizer', 'fileOrganizer') else role)
+
+    pool = get_account_pool()
+    for account in (pool.accounts if pool else []):
+        recipients.setdefault(account.email, ('user', 'writer'))
+
+    for email, (perm_type, role) in recipients.items():
+        try:
+            client.insert_permission(archive_spreadsheet_id, email, perm_type=perm_type, role=role, notify=False)
+        except Exception as e:
+            # Arxiv egasining o'zi yoki allaqachon berilgan ruxsat
+            logging.warning(f"⚠️ Arxiv {email} bilan ulashilmadi: {e}")
+
+
+def _get_or_create_archive(client, spreadsheet, month: str):
+    """
+    Oylik arxiv spreadsheetni ochish yoki yaratish
+    Qaytaradi: (arxiv spreadsheet, yangi arxivdagi bo'sh standart sheet id si yoki None)
+    """
+    archive_id = get_sheet_archive(spreadsheet.id, month)
+    if archive_id:
+        return client.open_by_key(archive_id), None
+
+    year, month_number = month.split('-')
+    archive = client.create(f"{spreadsheet.title} - arxiv {month_number}.{year}", folder_id=ARCHIVE_FOLDER_ID)
+    save_sheet_archive(spreadsheet.id, month, archive.id)
+    _share_archive(client, spreadsheet.id, archive.id)
+    logging.info(f"✅ Arxiv spreadsheet yaratildi: '{archive.title}' ({archive.id})")
+    return archive, archive.sheet1.id
+
+
+def _archive_month(client, spreadsheet, month: str, worksheets: list) -> int:
+    """Bir oylik tablarni arxivga ko'chirish: copyTo, bitta nomlash batchUpdate, bitta o'chirish batchUpdate"""
+    archive, default_sheet_id = _get_or_create_archive(client, spreadsheet, month)
+    existing = {worksheet.title: worksheet.id for worksheet in archive.worksheets()}
+    titles = [worksheet.title for worksheet in worksheets]
+
+    with worksheet_lock(spreadsheet.id, *titles):
+        copies = []
+        copy_error = None
+        try:
+            for worksheet in worksheets:
+                response = worksheet.copy_to(archive.id)
+                copies.append((worksheet, response['sheetId']))
+                time.sleep(ARCHIVE_COPY_DELAY)
+        except Exception as e:
+            # Ko'chirilganlari baribir yakunlanadi - aks holda keyingi safar "Copy of ..." dublikatlari qoladi
+            copy_error = e
+            if not copies:
+                raise
+
+        # Backfill orqali qayta qurilgan tab arxivda allaqachon bo'lsa - eskisi almashtiriladi
+        requests = [
+            {'deleteSheet': {'sheetId': existing[worksheet.title]}}
+            for worksheet, _ in copies if worksheet.title in existing
+        ]
+        if default_sheet_id is not None:
+            requests.append({'deleteSheet': {'sheetId': default_sheet_id}})
+        requests.extend(
+            {'updateSheetProperties': {
+                'properties': {'sheetId': sheet_id, 'title': worksheet.title},
+                'fields': 'title'
+            }}
+            for worksheet, sheet_id in copies
+        )
+        archive.batch_update({'requests': requests})
+
+        spreadsheet.batch_update({'requests': [
+            {'deleteSheet': {'sheetId': worksheet.id}} for worksheet, _ in copies
+        ]})
+
+    move_sheet_row_locations(spreadsheet.id, [worksheet.title for worksheet, _ in copies], archive.id)
+    save_sheet_archive(spreadsheet.id, month, archive.id, len(copies))
+    logging.info(f"📦 '{spreadsheet.title}': {month} oyining {len(copies)} ta tabi arxivga ko'chirildi")
+    if copy_error:
+        raise copy_error
+    return len(copies)
+
+
+def archive_spreadsheet(spreadsheet_id: str, cutoff: date,
+                        max_worksheets: int = ARCHIVE_MAX_WORKSHEETS_PER_RUN) -> Dict:
+    """Bitta spreadsheetning cutoff dan oldingi kunlik tablarini oylar bo'yicha arxivlash"""
+    stats = {'spreadsheet_id': spreadsheet_id, 'archived': 0, 'months': [], 'remaining': 0, 'errors': []}
+
+    with sheets_operation("archive_spreadsheet", spreadsheet_id):
+        try:
+            client = get_google_sheets_client(spreadsheet_id, write=True)
+            if not client:
+                raise RuntimeError("Google Sheets client yaratilmadi")
+            spreadsheet = client.open_by_key(spreadsheet_id)
+            all_worksheets = spreadsheet.worksheets()
+        except Exception as e:
+            stats['errors'].append(str(e))
+            logging.error(f"❌ Arxivlash uchun spreadsheet ochilmadi ({spreadsheet_id}): {e}")
+            return stats
+
+        by_month = archivable_worksheets(all_worksheets, cutoff)
+
+        # Spreadsheetda kamida bitta tab qolishi shart
+        if by_month and sum(len(worksheets) for worksheets in by_month.values()) >= len(all_worksheets):
+            newest_month = max(by_month)
+            by_month[newest_month] = by_month[newest_month][1:]
+
+        budget = max_worksheets
+        for month in sorted(by_month):
+            worksheets = by_month[month][:max(budget, 0)]
+            stats['remaining'] += len(by_month[month]) - len(worksheets)
+            if not worksheets:
+                continue
+            budget -= len(worksheets)
+            try:
+                stats['archived'] += _archive_month(client, spreadsheet, month, worksheets)
+                stats['months'].append(month)
+            except Exception as e:
+                stats['errors'].append(f"{month}: {e}")
+                logging.error(f"❌ {month} oyini arxivlashda xato ({spreadsheet_id}): {e}")
+
+    return stats
+
+
+# ==================== ARXIVLASH (ASINXRON) ====================
+
+async def archive_spreadsheet_ids() -> List[str]:
+    """Arxivlanadigan spreadsheetlar: barcha faol guruh sheetlari va ALL DATA"""
+    spreadsheet_ids = [sheet[2] for sheet in await get_all_google_sheets()]
+    all_data_spreadsheet_id = get_all_data_spreadsheet_id()
+    if all_data_spreadsheet_id:
+        spreadsheet_ids.append(all_data_spreadsheet_id)
+    return list(dict.fromkeys(spreadsheet_ids))
+
+
+async def run_archival(cutoff: Optional[date] = None) -> List[Dict]:
+    cutoff = cutoff or archive_cutoff()
+    results = []
+    for spreadsheet_id in await archive_spreadsheet_ids():
+        results.append(await asyncio.to_thread(archive_spreadsheet, spreadsheet_id, cutoff))
+    return results
+
+
+def format_archive_report(results: List[Dict], cutoff: date) -> str:
+    archived = sum(result['archived'] for result in results)
+    remaining = sum(result['remaining'] for result in results)
+    text = (
+        f"📦 Sheet arxivlash natijasi\n"
+        f"📅 {cutoff.strftime('%d.%m.%Y')} gacha bo'lgan tablar\n\n"
+        f"🗂️ Ko'chirilgan tablar: {archived}\n"
+    )
+    if remaining:
+        text += f"⏳ Keyingi safarga qoldi: {remaining}\n"
+
+    for result in results:
+        if result['archived']:
+            text += f"\n✅ {result['spreadsheet_id']}: {result['archived']} ta ({', '.join(result['months'])})"
+        for error in result['errors']:
+            text += f"\n❌ {result['spreadsheet_id']}: {error}"
+    return text.rstrip()
+
+
+async def archive_loop(bot: Bot):
+    """Rejali arxivlash: kuniga bir marta yopilgan oylarni tekshirish"""
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+        try:
+            cutoff = archive_cutoff()
+            results = await run_archival(cutoff)
+            archived = sum(result['archived'] for result in results)
+            if archived:
+                logging.info(f"📦 Rejali arxivlash: {archived} ta tab ko'chirildi")
+            if (archived or any(result['errors'] for result in results)) and ADMIN_ID:
+                await bot.send_message(ADMIN_ID, format_archive_report(results, cutoff), parse_mode=None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"❌ Rejali arxivlashda xato: {e}")
+
+
+def start_sheets_archive_jobs(bot: Bot) -> List[asyncio.Task]:
+    """Bot ishga tushganda fon vazifalarini boshlash"""
+    return [asyncio.create_task(archive_loop(bot), name="sheets_archive")]
+
+
+# ==================== HANDLERS ====================
+
+@sheets_archive_router.message(Command("archive"))
+async def cmd_archive(message: Message):
+    """
+    /archive - yopilgan oylarning kunlik tablarini hozir arxivlash
+    /archive list - oxirgi arxiv spreadsheetlar
+    """
+    user_id = message.from_user.id
+
+    if not is_admin(user_id):
+        await message.answer("⛔ Bu buyruq faqat adminlar uchun!")
+        return
+
+    args = (message.text or "").split(maxsplit=1)
+    if len(args) > 1 and args[1].strip().lower() == "list":
+        archives = await get_sheet_archives()
+        if not archives:
+            await message.answer("📦 Hali arxivlar yo'q.")
+            return
+        text = "📦 Oxirgi arxivlar\n"
+        for source_id, month, archive_id, worksheets_count, _ in archives:
+            text += (
+                f"\n📅 {month} - {worksheets_count} ta tab\n"
+                f"├ Manba: {source_id}\n"
+                f"└ https://docs.google.com/spreadsheets/d/{archive_id}\n"
+            )
+        await message.answer(text.rstrip(), parse_mode=None, disable_web_page_preview=True)
+        return
+
+    cutoff = archive_cutoff()
+    status_message = await message.answer(
+        f"⏳ Arxivlash boshlandi ({cutoff.strftime('%d.%m.%Y')} gacha bo'lgan tablar)..."
+    )
+    logging.info(f"📦 Arxivlash admin {user_id} tomonidan boshlandi")
+    results = await run_archival(cutoff)
+    await status_message.edit_text(format_archive_report(results, cutoff), parse_mode=None)
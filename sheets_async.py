@@ -0,0 +1,668 @@
+"""
+sheets_async.py - Google Sheets API uchun asinxron (aiohttp) client
+gspread bloklovchi requests ustida ishlaydi va har bir authorize yangi session (yangi TLS
+ulanish) ochadi. Bu client esa bot event loopida ishlaydi: bitta keep-alive ulanishlar
+pooli, service account tokeni keshlanadi, mustaqil so'rovlar bir vaqtda yuboriladi.
+
+Qo'llab-quvvatlanadigan so'rovlar: metadata, values get/batchGet/append/update/batchUpdate,
+spreadsheets.batchUpdate.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from google.auth import crypt, jwt
+from gspread.utils import absolute_range_name
+from urllib.parse import quote
+
+from google_sheets_integration import (
+    SCOPES, GOOGLE_SHEETS_CREDENTIALS_FILE, COLUMN_HEADERS, ALL_DATA_COLUMN_HEADERS,
+    get_daily_worksheet_name, get_daily_all_data_worksheet_name,
+    build_daily_row, build_all_data_row, header_format_requests, row_format_requests,
+    get_appended_row_index, index_contract_row, index_contract_rows, get_worksheet_lock
+)
+from sheets_accounts import get_account_pool
+from sheets_metrics import record_http_request, track_sheets_operation, extract_spreadsheet_id
+
+SHEETS_API_URL = "https://sheets.googleapis.com/v4/spreadsheets"
+DEFAULT_TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+# Token muddati va yangilash zaxirasi (soniya)
+TOKEN_LIFETIME = 3600
+TOKEN_REFRESH_MARGIN = 300
+
+# Sinxron yo'l (reconcile/backfill) qulfni ushlab turganda tekshirish oralig'i (soniya)
+LOCK_POLL_INTERVAL = 0.01
+
+# Ulanishlar pooli: bir vaqtdagi ulanishlar soni va bo'sh ulanishni ushlab turish vaqti
+CONNECTION_LIMIT = 16
+KEEPALIVE_TIMEOUT = 120
+REQUEST_TIMEOUT = 30
+
+# 429 va 5xx javoblarda qayta urinishlar
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Retry-After sarlavhasi bo'yicha kutishning yuqori chegarasi (soniya)
+MAX_RETRY_AFTER = 60
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _retry_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Retry-After bo'lsa - shuncha, aks holda eksponensial kutish"""
+    if retry_after is not None:
+        return min(retry_after, MAX_RETRY_AFTER)
+    return min(2 ** attempt + random.random(), 16)
+
+
+class SheetsAPIError(Exception):
+    """Sheets API xatosi (HTTP status va Google xabari bilan)"""
+
+    def __init__(self, status: int, message: str, payload: Optional[Dict] = None):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+        self.payload = payload or {}
+
+
+# ==================== TOKEN ====================
+
+class ServiceAccountToken:
+    """Service account JWT grant orqali access token olish va keshlash"""
+
+    def __init__(self, credentials_file: str, scopes: List[str] = SCOPES):
+        with open(credentials_file, encoding='utf-8') as f:
+            info = json.load(f)
+        self.email = info['client_email']
+        self.token_uri = info.get('token_uri', DEFAULT_TOKEN_URI)
+        self._signer = crypt.RSASigner.from_service_account_info(info)
+        self._scopes = scopes
+        self._token: Optional[str] = None
+        self._expiry = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._token = None
+        self._expiry = 0.0
+
+    async def get(self, session: aiohttp.ClientSession) -> str:
+        if self._token and time.time() < self._expiry - TOKEN_REFRESH_MARGIN:
+            return self._token
+
+        async with self._lock:
+            if self._token and time.time() < self._expiry - TOKEN_REFRESH_MARGIN:
+                return self._token
+
+            now = int(time.time())
+            assertion = jwt.encode(self._signer, {
+                'iss': self.email,
+                'scope': ' '.join(self._scopes),
+                'aud': self.token_uri,
+                'iat': now,
+                'exp': now + TOKEN_LIFETIME
+            })
+            if isinstance(assertion, bytes):
+                assertion = assertion.decode('utf-8')
+
+            async with session.post(self.token_uri, data={
+                'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
+                'assertion': assertion
+            }) as response:
+                payload = await response.json(content_type=None)
+                if response.status != 200:
+                    raise SheetsAPIError(
+                        response.status, payload.get('error_description', 'Token olinmadi'), payload
+                    )
+
+            self._token = payload['access_token']
+            self._expiry = now + int(payload.get('expires_in', TOKEN_LIFETIME))
+            logging.info(f"🔑 Google access token yangilandi: {self.email}")
+            return self._token
+
+
+# ==================== CLIENT ====================
+
+class AsyncSheetsClient:
+    """
+    aiohttp asosidagi Sheets API client
+    Bitta ClientSession (keep-alive pool) butun bot ishlash davomida qayta ishlatiladi
+    """
+
+    def __init__(self, credentials_file: str = GOOGLE_SHEETS_CREDENTIALS_FILE, scopes: List[str] = SCOPES,
+                 connection_limit: int = CONNECTION_LIMIT, pool=None, account=None):
+        self.credentials_file = credentials_file
+        # Account pooli (sheets_accounts.py) - har bir javob accountning kvota/sog'liq holatiga yoziladi
+        self._pool = pool
+        self._account = account
+        self._token = ServiceAccountToken(credentials_file, scopes)
+        self._connection_limit = connection_limit
+        self._session: Optional[aiohttp.ClientSession] = None
+        # spreadsheet_id -> {worksheet nomi: sheetId}
+        self._sheet_ids: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def account_email(self) -> str:
+        return self._token.email
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._connection_limit,
+                limit_per_host=self._connection_limit,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _failover_client(self, url: str) -> Optional["AsyncSheetsClient"]:
+        """429 olgan account o'rniga pooldan boshqa accountning clienti (boshqasi bo'lmasa None)"""
+        if self._pool is None:
+            return None
+        account = self._pool.acquire(extract_spreadsheet_id(url))
+        if account is self._account:
+            return None
+        return _get_account_client(self._pool, account)
+
+    async def request(self, method: str, url: str, params=None, json_body: Optional[Dict] = None,
+                      first_attempt: int = 0) -> Dict:
+        """
+        Bitta API so'rovi: token, 401 da tokenni yangilash, 429/5xx da Retry-After yoki eksponensial kutish.
+        O'qish 429 olsa pooldagi boshqa accountga o'tadi (yozish biriktirilgan accountda qoladi - tartib uchun).
+        Har qanday xato SheetsAPIError bo'lib chiqadi (JSON bo'lmagan javoblar ham)
+        """
+        session = await self._get_session()
+
+        for attempt in range(first_attempt, MAX_RETRIES + 1):
+            token = await self._token.get(session)
+            started = time.perf_counter()
+            status = "error"
+            retry_after = None
+            try:
+                async with session.request(
+                    method, url, params=params, json=json_body,
+                    headers={'Authorization': f"Bearer {token}"}
+                ) as response:
+                    status = str(response.status)
+                    retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                    text = await response.text()
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= MAX_RETRIES:
+                    raise SheetsAPIError(0, f"Tarmoq xatosi: {e}")
+                await asyncio.sleep(_retry_delay(attempt))
+                continue
+
+            finally:
+                record_http_request(method, url, status, time.perf_counter() - started)
+                if self._pool is not None:
+                    self._pool.record_response(
+                        self._account, url, int(status) if status.isdigit() else 0, retry_after
+                    )
+
+            # 502/503 da proxy HTML sahifa qaytarishi mumkin - status tekshiruvlari baribir ishlashi kerak
+            try:
+                payload = json.loads(text) if text else {}
+            except ValueError:
+                payload = None
+
+            if response.status == 401 and attempt == first_attempt:
+                self._token.invalidate()
+                continue
+
+            if response.status == 429 and method == "GET" and attempt < MAX_RETRIES:
+                client = self._failover_client(url)
+                if client is not None:
+                    logging.warning(
+                        f"🔀 Sheets API 429: so'rov {self.account_email} dan {client.account_email} ga o'tkazildi"
+                    )
+                    return await client.request(method, url, params, json_body, first_attempt=attempt + 1)
+
+            if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                logging.warning(f"⚠️ Sheets API {response.status}, qayta urinish {attempt + 1}/{MAX_RETRIES}")
+                await asyncio.sleep(_retry_delay(attempt, retry_after))
+                continue
+
+            if response.status >= 400:
+                error = payload.get('error', {}) if isinstance(payload, dict) else {}
+                raise SheetsAPIError(response.status, error.get('message', text[:200]), payload)
+
+            if not isinstance(payload, dict):
+                raise SheetsAPIError(response.status, f"JSON bo'lmagan javob: {text[:200]}")
+            return payload
+
+        raise SheetsAPIError(0, "Qayta urinishlar tugadi")
+
+    @staticmethod
+    def _url(spreadsheet_id: str, suffix: str = "") -> str:
+        return f"{SHEETS_API_URL}/{spreadsheet_id}{suffix}"
+
+    @staticmethod
+    def _values_url(spreadsheet_id: str, range_name: str, action: str = "") -> str:
+        return f"{SHEETS_API_URL}/{spreadsheet_id}/values/{quote(range_name, safe='')}{action}"
+
+    # ---------- Metadata ----------
+
+    async def get_metadata(self, spreadsheet_id: str, fields: str = "properties.title,sheets.properties") -> Dict:
+        return await self.request("GET", self._url(spreadsheet_id), params={'fields': fields})
+
+    async def get_sheet_ids(self, spreadsheet_id: str, refresh: bool = False) -> Dict[str, int]:
+        """Worksheet nomi -> sheetId (keshlanadi, refresh=True bo'lsa qayta o'qiladi)"""
+        if refresh or spreadsheet_id not in self._sheet_ids:
+            metadata = await self.get_metadata(spreadsheet_id, "sheets.properties(sheetId,title)")
+            self._sheet_ids[spreadsheet_id] = {
+                sheet['properties']['title']: sheet['properties']['sheetId']
+                for sheet in metadata.get('sheets', [])
+            }
+        return self._sheet_ids[spreadsheet_id]
+
+    def remember_sheet_id(self, spreadsheet_id: str, title: str, sheet_id: int):
+        self._sheet_ids.setdefault(spreadsheet_id, {})[title] = sheet_id
+
+    def invalidate_sheet_ids(self, spreadsheet_id: str):
+        self._sheet_ids.pop(spreadsheet_id, None)
+
+    # ---------- Values ----------
+
+    async def values_get(self, spreadsheet_id: str, range_name: str, params: Optional[Dict] = None) -> Dict:
+        return await self.request("GET", self._values_url(spreadsheet_id, range_name), params=params)
+
+    async def values_batch_get(self, spreadsheet_id: str, ranges: List[str], params: Optional[Dict] = None) -> Dict:
+        query = [('ranges', range_name) for range_name in ranges] + list((params or {}).items())
+        return await self.request("GET", self._url(spreadsheet_id, "/values:batchGet"), params=query)
+
+    async def values_append(self, spreadsheet_id: str, range_name: str, values: List[List],
+                            value_input_option: str = 'RAW') -> Dict:
+        return await self.request(
+            "POST", self._values_url(spreadsheet_id, range_name, ":append"),
+            params={'valueInputOption': value_input_option},
+            json_body={'values': values}
+        )
+
+    async def values_update(self, spreadsheet_id: str, range_name: str, values: List[List],
+                            value_input_option: str = 'RAW') -> Dict:
+        return await self.request(
+            "PUT", self._values_url(spreadsheet_id, range_name),
+            params={'valueInputOption': value_input_option},
+            json_body={'values': values}
+        )
+
+    async def values_batch_update(self, spreadsheet_id: str, data: List[Dict], value_input_option: str = 'RAW') -> Dict:
+        return await self.request(
+            "POST", self._url(spreadsheet_id, "/values:batchUpdate"),
+            json_body={'valueInputOption': value_input_option, 'data': data}
+        )
+
+    # ---------- Batch update ----------
+
+    async def batch_update(self, spreadsheet_id: str, requests: List[Dict]) -> Dict:
+        return await self.request(
+            "POST", self._url(spreadsheet_id, ":batchUpdate"),
+            json_body={'requests': requests}
+        )
+
+    @staticmethod
+    async def gather(*calls):
+        """
+        Mustaqil so'rovlarni bir vaqtda yuborish (pooldagi ochiq ulanishlar orqali)
+        Birinchi xato qaytariladi, qolganlari bekor qilinmaydi
+        """
+        return await asyncio.gather(*calls)
+
+
+# ==================== CLIENT OLISH ====================
+
+# Client factory - benchmark va stress testlarda soxta client bilan almashtiriladi (sheets_fake.py)
+_async_client_factory = None
+
+
+def set_async_sheets_client_factory(factory):
+    """get_async_sheets_client o'rniga ishlatiladigan factory (None - asl holatga qaytarish)"""
+    global _async_client_factory
+    _async_client_factory = factory
+
+
+def get_async_sheets_client(spreadsheet_id: Optional[str] = None, write: bool = False) -> Optional[AsyncSheetsClient]:
+    """
+    Asinxron clientni olish
+    Account pooldan tanlanadi (yozish - spreadsheetga biriktirilgan account), har bir account
+    uchun client va uning keep-alive sessiyasi bir marta yaratiladi
+    """
+    if _async_client_factory is not None:
+        return _async_client_factory(spreadsheet_id, write)
+
+    pool = get_account_pool()
+    if pool is None:
+        logging.error(f"❌ Credentials fayl topilmadi: {GOOGLE_SHEETS_CREDENTIALS_FILE}")
+        return None
+
+    return _get_account_client(pool, pool.acquire(spreadsheet_id, write=write))
+
+
+def _get_account_client(pool, account) -> Optional[AsyncSheetsClient]:
+    """Account uchun client (keep-alive sessiyasi bilan) bir marta yaratiladi"""
+    if account.async_client is None:
+        try:
+            account.async_client = AsyncSheetsClient(account.credentials_file, pool=pool, account=account)
+            logging.info(f"✅ Asinxron Google Sheets client yaratildi ({account.email})")
+        except Exception as e:
+            logging.error(f"❌ Asinxron Google Sheets client yaratishda xato ({account.credentials_file}): {e}")
+            return None
+
+    return account.async_client
+
+
+async def close_async_sheets_client():
+    """Bot to'xtaganda barcha accountlarning ulanishlar poolini yopish"""
+    pool = get_account_pool()
+    if pool is None:
+        return
+    for account in pool.accounts:
+        if account.async_client is not None:
+            await account.async_client.close()
+            account.async_client = None
+
+
+# ==================== WORKSHEET ====================
+
+def _header_cells_request(sheet_id: int, headers: List[str]) -> Dict:
+    return {'updateCells': {
+        'start': {'sheetId': sheet_id, 'rowIndex': 0, 'columnIndex': 0},
+        'rows': [{'values': [{'userEnteredValue': {'stringValue': header}} for header in headers]}],
+        'fields': 'userEnteredValue'
+    }}
+
+
+async def ensure_worksheet(client: AsyncSheetsClient, spreadsheet_id: str, worksheet_name: str,
+                           headers: List[str], rows: int = 1000) -> int:
+    """
+    Worksheet sheetId sini olish, yo'q bo'lsa yaratish
+    Yaratish, sarlavhalarni yozish va formatlash bitta batchUpdate so'rovida bajariladi
+    """
+    sheet_ids = await client.get_sheet_ids(spreadsheet_id)
+    if worksheet_name in sheet_ids:
+        return sheet_ids[worksheet_name]
+
+    sheet_ids = await client.get_sheet_ids(spreadsheet_id, refresh=True)
+    if worksheet_name in sheet_ids:
+        return sheet_ids[worksheet_name]
+
+    sheet_id = random.randint(1, 2 ** 31 - 1)
+    try:
+        await client.batch_update(spreadsheet_id, [
+            {'addSheet': {'properties': {
+                'sheetId': sheet_id,
+                'title': worksheet_name,
+                'index': 0,
+                'gridProperties': {'rowCount': rows, 'columnCount': len(headers)}
+            }}},
+            _header_cells_request(sheet_id, headers),
+            *header_format_requests(sheet_id, headers)
+        ])
+    except SheetsAPIError as e:
+        # Boshqa so'rov shu worksheetni allaqachon yaratgan bo'lishi mumkin
+        if e.status != 400 or 'already exists' not in e.message:
+            raise
+        sheet_ids = await client.get_sheet_ids(spreadsheet_id, refresh=True)
+        if worksheet_name not in sheet_ids:
+            raise
+        return sheet_ids[worksheet_name]
+
+    client.remember_sheet_id(spreadsheet_id, worksheet_name, sheet_id)
+    logging.info(f"✅ Yangi worksheet yaratildi (async): '{worksheet_name}'")
+    return sheet_id
+
+
+async def get_next_row_number_async(client: AsyncSheetsClient, spreadsheet_id: str, worksheet_name: str) -> int:
+    """Keyingi tartib raqami - faqat A ustuni o'qiladi"""
+    response = await client.values_get(spreadsheet_id, absolute_range_name(worksheet_name, "A:A"))
+    values = response.get('values', [])
+
+    if len(values) <= 1:
+        return 1
+
+    last_row = values[-1]
+    if last_row and str(last_row[0]).isdigit():
+        return int(last_row[0]) + 1
+    return len(values)
+
+
+# event loop -> (spreadsheet_id, worksheet nomi) -> asyncio.Lock
+_append_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], asyncio.Lock]]" = \
+    weakref.WeakKeyDictionary()
+
+
+@asynccontextmanager
+async def worksheet_append_lock(spreadsheet_id: str, worksheet_name: str):
+    """
+    Bitta worksheetga yozuvlarni navbatga qo'yish: tartib raqamini o'qish va append shu qulf ostida.
+    Turli worksheetlarga saqlash parallel davom etadi. Ichkarida sinxron yo'lning threading qulfi
+    ham olinadi - event loopni bloklamaslik uchun kutish so'rov orqali
+    """
+    locks = _append_locks.setdefault(asyncio.get_running_loop(), {})
+    key = (spreadsheet_id, worksheet_name)
+    lock = locks.get(key)
+    if lock is None:
+        lock = locks[key] = asyncio.Lock()
+
+    async with lock:
+        thread_lock = get_worksheet_lock(spreadsheet_id, worksheet_name)
+        while not thread_lock.acquire(blocking=False):
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            thread_lock.release()
+
+
+def _handle_missing_worksheet(client: AsyncSheetsClient, spreadsheet_id: str, error: Exception):
+    """Worksheet qo'lda o'chirilgan bo'lsa keshni tozalash - keyingi so'rov qayta yaratadi"""
+    if isinstance(error, SheetsAPIError) and error.status == 400 and 'Unable to parse range' in error.message:
+        client.invalidate_sheet_ids(spreadsheet_id)
+
+
+# ==================== HISOBOTLARNI SAQLASH ====================
+
+@track_sheets_operation("save_report_to_daily_sheet")
+async def save_report_to_daily_sheet_async(spreadsheet_id: str, report_data: dict, is_tashkent: bool = False) -> bool:
+    """
+    Hisobotni kunlik sheetga saqlash (asinxron)
+    Toshkent shahar uchun: SH DD.MM.YYYY, Viloyat uchun: VL DD.MM.YYYY
+    """
+    client = get_async_sheets_client(spreadsheet_id, write=True)
+    if not client:
+        logging.error("❌ Asinxron Google Sheets client yaratilmadi")
+        return False
+
+    worksheet_name = get_daily_worksheet_name(is_tashkent)
+    try:
+        sheet_id = await ensure_worksheet(client, spreadsheet_id, worksheet_name, COLUMN_HEADERS)
+
+        async with worksheet_append_lock(spreadsheet_id, worksheet_name):
+            row_number = await get_next_row_number_async(client, spreadsheet_id, worksheet_name)
+            row_data = build_daily_row(row_number, report_data, datetime.now().strftime('%d.%m.%Y'))
+            append_response = await client.values_append(
+                spreadsheet_id, absolute_range_name(worksheet_name, "A1"), [row_data]
+            )
+
+        new_row_index = get_appended_row_index(append_response)
+        if new_row_index:
+            try:
+                await client.batch_update(spreadsheet_id, row_format_requests(sheet_id, new_row_index, row_number))
+            except SheetsAPIError as e:
+                logging.error(f"❌ Qatorni formatlashda xato: {e}")
+
+        index_contract_row(report_data.get('contract_id'), spreadsheet_id, worksheet_name, new_row_index)
+
+        sheet_type = "Toshkent shahar (SH)" if is_tashkent else "Viloyat (VL)"
+        logging.info(
+            f"✅ Hisobot #{row_number} {sheet_type} sheetga saqlandi (async): '{worksheet_name}' - "
+            f"{report_data.get('sender_full_name', 'Noma\'lum')} - "
+            f"{report_data.get('product_type', 'Noma\'lum mahsulot')} - "
+            f"{report_data.get('contract_amount', 'Noma\'lum summa')}"
+        )
+        return True
+
+    except Exception as e:
+        _handle_missing_worksheet(client, spreadsheet_id, e)
+        logging.error(f"❌ Kunlik sheetga saqlashda xato (async): {e}")
+        return False
+
+
+@track_sheets_operation("save_report_to_all_data")
+async def save_report_to_all_data_async(spreadsheet_id: str, report_data: dict, is_tashkent: bool = False) -> bool:
+    """Hisobotni kunlik ALL DATA sheetga saqlash (asinxron)"""
+    client = get_async_sheets_client(spreadsheet_id, write=True)
+    if not client:
+        logging.error("❌ Asinxron Google Sheets client yaratilmadi")
+        return False
+
+    worksheet_name = get_daily_all_data_worksheet_name()
+    source_sheet_name = get_daily_worksheet_name(is_tashkent)
+    try:
+        await ensure_worksheet(client, spreadsheet_id, worksheet_name, ALL_DATA_COLUMN_HEADERS, rows=5000)
+
+        async with worksheet_append_lock(spreadsheet_id, worksheet_name):
+            row_number = await get_next_row_number_async(client, spreadsheet_id, worksheet_name)
+            row_data = build_all_data_row(
+                row_number, report_data, datetime.now().strftime('%d.%m.%Y'), source_sheet_name
+            )
+            append_response = await client.values_append(
+                spreadsheet_id, absolute_range_name(worksheet_name, "A1"), [row_data]
+            )
+
+        index_contract_row(
+            report_data.get('contract_id'), spreadsheet_id, worksheet_name,
+            get_appended_row_index(append_response)
+        )
+
+        logging.info(
+            f"✅ Hisobot #{row_number} kunlik ALL DATA sheetga saqlandi (async): '{worksheet_name}' - "
+            f"{report_data.get('sender_full_name', 'Noma\'lum')} - "
+            f"Manba: {source_sheet_name}"
+        )
+        return True
+
+    except Exception as e:
+        _handle_missing_worksheet(client, spreadsheet_id, e)
+        logging.error(f"❌ ALL DATA sheetga saqlashda xato (async): {e}")
+        return False
+
+
+# ==================== PAKET SAQLASH ====================
+
+@track_sheets_operation("save_reports_to_daily_sheet")
+async def save_reports_to_daily_sheet_async(spreadsheet_id: str, reports: List[dict], is_tashkent: bool = False) -> bool:
+    """
+    Bir nechta hisobotni kunlik sheetga saqlash: bitta values.append va bitta formatlash batchUpdate
+    """
+    if not reports:
+        return True
+
+    client = get_async_sheets_client(spreadsheet_id, write=True)
+    if not client:
+        logging.error("❌ Asinxron Google Sheets client yaratilmadi")
+        return False
+
+    worksheet_name = get_daily_worksheet_name(is_tashkent)
+    try:
+        sheet_id = await ensure_worksheet(client, spreadsheet_id, worksheet_name, COLUMN_HEADERS)
+
+        signed_date = datetime.now().strftime('%d.%m.%Y')
+        async with worksheet_append_lock(spreadsheet_id, worksheet_name):
+            first_number = await get_next_row_number_async(client, spreadsheet_id, worksheet_name)
+            rows = [build_daily_row(first_number + offset, report, signed_date) for offset, report in enumerate(reports)]
+            append_response = await client.values_append(
+                spreadsheet_id, absolute_range_name(worksheet_name, "A1"), rows
+            )
+
+        first_row_index = get_appended_row_index(append_response)
+        if first_row_index:
+            format_requests = []
+            for offset in range(len(rows)):
+                format_requests.extend(row_format_requests(sheet_id, first_row_index + offset, first_number + offset))
+            try:
+                await client.batch_update(spreadsheet_id, format_requests)
+            except SheetsAPIError as e:
+                logging.error(f"❌ Qatorlarni formatlashda xato: {e}")
+
+        index_contract_rows(
+            [report.get('contract_id') for report in reports], spreadsheet_id, worksheet_name, first_row_index
+        )
+
+        logging.info(
+            f"✅ {len(rows)} ta hisobot (#{first_number}-#{first_number + len(rows) - 1}) "
+            f"kunlik sheetga saqlandi (async): '{worksheet_name}'"
+        )
+        return True
+
+    except Exception as e:
+        _handle_missing_worksheet(client, spreadsheet_id, e)
+        logging.error(f"❌ Kunlik sheetga paket saqlashda xato (async): {e}")
+        return False
+
+
+@track_sheets_operation("save_reports_to_all_data")
+async def save_reports_to_all_data_async(spreadsheet_id: str, reports: List[dict], is_tashkent: bool = False) -> bool:
+    """Bir nechta hisobotni kunlik ALL DATA sheetga bitta values.append bilan saqlash"""
+    if not reports:
+        return True
+
+    client = get_async_sheets_client(spreadsheet_id, write=True)
+    if not client:
+        logging.error("❌ Asinxron Google Sheets client yaratilmadi")
+        return False
+
+    worksheet_name = get_daily_all_data_worksheet_name()
+    source_sheet_name = get_daily_worksheet_name(is_tashkent)
+    try:
+        await ensure_worksheet(client, spreadsheet_id, worksheet_name, ALL_DATA_COLUMN_HEADERS, rows=5000)
+
+        signed_date = datetime.now().strftime('%d.%m.%Y')
+        async with worksheet_append_lock(spreadsheet_id, worksheet_name):
+            first_number = await get_next_row_number_async(client, spreadsheet_id, worksheet_name)
+            rows = [
+                build_all_data_row(first_number + offset, report, signed_date, source_sheet_name)
+                for offset, report in enumerate(reports)
+            ]
+            append_response = await client.values_append(
+                spreadsheet_id, absolute_range_name(worksheet_name, "A1"), rows
+            )
+
+        index_contract_rows(
+            [report.get('contract_id') for report in reports], spreadsheet_id, worksheet_name,
+            get_appended_row_index(append_response)
+        )
+
+        logging.info(
+            f"✅ {len(rows)} ta hisobot kunlik ALL DATA sheetga saqlandi (async): '{worksheet_name}' - "
+            f"Manba: {source_sheet_name}"
+        )
+        return True
+
+    except Exception as e:
+        _handle_missing_worksheet(client, spreadsheet_id, e)
+        logging.error(f"❌ ALL DATA sheetga paket saqlashda xato (async): {e}")
+        return False
@@ -0,0 +1,1067 @@
+"""
+sheets_fake.py - Google Sheets (gspread) uchun offline soxta backend
+google_sheets_integration ishlatadigan gspread client/Spreadsheet/Worksheet
+API qismini xotirada takrorlaydi: tarmoq va service account kerak emas.
+Har bir so'rov hisoblanadi, kechikish (latency) va 429 xatolarini berish mumkin.
+So'rovlar http_client.session.request orqali o'tadi, shuning uchun
+sheets_metrics instrumentatsiyasi haqiqiy clientdagidek ishlaydi.
+
+Ishlatish:
+    backend = install_fake_client(latency=0.05)
+    save_report_to_daily_sheet("fake-id", report_data, is_tashkent=True)
+    print(backend.calls)
+    uninstall_fake_client()
+
+Benchmark (saqlash yo'llari va statistika hisoblash):
+    python sheets_fake.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import gspread
+
+SHEETS_API_URL = "https://sheets.googleapis.com/v4/spreadsheets"
+DRIVE_API_URL = "https://www.googleapis.com/drive/v3/files"
+
+# Asinxron soxta client kechikishni o'zi (asyncio.sleep bilan) beradi - backend uxlamasligi kerak
+_ASYNC_REQUEST: ContextVar[bool] = ContextVar('fake_async_request', default=False)
+
+
+# ==================== YORDAMCHI FUNKSIYALAR ====================
+
+def column_index(letters: str) -> int:
+    """Ustun harflarini 1 dan boshlanadigan raqamga o'girish (A -> 1, O -> 15)"""
+    result = 0
+    for char in letters.upper():
+        result = result * 26 + (ord(char) - 64)
+    return result
+
+
+def parse_a1_range(label: str):
+    """
+    A1 formatidagi oraliqni (row1, col1, row2, col2) ga ajratish
+    Ochiq chegaralar None bo'ladi: 'A:A' -> (None, 1, None, 1)
+    """
+    if '!' in label:
+        label = label.rsplit('!', 1)[1]
+
+    parts = label.split(':')
+    bounds = []
+    for part in parts:
+        match = re.fullmatch(r'([A-Za-z]*)(\d*)', part.strip())
+        if not match:
+            raise ValueError(f"Noto'g'ri oraliq: {label}")
+        letters, digits = match.groups()
+        bounds.append((
+            int(digits) if digits else None,
+            column_index(letters) if letters else None
+        ))
+
+    if len(bounds) == 1:
+        bounds.append(bounds[0])
+
+    (row1, col1), (row2, col2) = bounds
+    return row1, col1, row2, col2
+
+
+def split_sheet_range(range_name: str):
+    """"'SH 28.11.2025'!A1:N5" -> ("SH 28.11.2025", "A1:N5")"""
+    if '!' not in range_name:
+        return None, range_name
+    title, cells = range_name.rsplit('!', 1)
+    return title.strip("'").replace("''", "'"), cells
+
+
+def _numericise(value: str):
+    """gspread get_all_records kabi raqamli qiymatlarni o'girish"""
+    if value == "":
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class _FakeResponse:
+    """requests.Response o'rnini bosuvchi minimal obyekt (APIError uchun)"""
+
+    def __init__(self, status_code: int, payload: Dict):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = json.dumps(payload)
+        self.ok = status_code < 400
+
+    def json(self):
+        return self._payload
+
+
+class _FakeCell:
+    def __init__(self, row: int, col: int, value: str):
+        self.row = row
+        self.col = col
+        self.value = value
+
+
+def _drive_timestamp() -> str:
+    """Drive modifiedTime formatidagi vaqt (RFC 3339, UTC)"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+# ==================== BACKEND ====================
+
+class FakeSheetsBackend:
+    """
+    Barcha soxta spreadsheetlarni saqlovchi va so'rovlarni hisoblovchi backend
+
+    latency - har bir so'rovga qo'shiladigan kechikish (soniya)
+    rate_limit_every - har N-chi so'rov 429 bilan qaytadi (0 - o'chirilgan)
+    rate_limit_probability - so'rovning 429 bilan qaytish ehtimoli
+    """
+
+    def __init__(self, latency: float = 0.0, rate_limit_every: int = 0,
+                 rate_limit_probability: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_probability = rate_limit_probability
+        self.spreadsheets: Dict[str, "FakeSpreadsheet"] = {}
+        self.calls: Counter = Counter()
+        self.request_log: List[tuple] = []
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._request_count = 0
+        self._lock = threading.RLock()
+        self._next_sheet_id = 1
+        self.session = FakeSession(self)
+
+    def request(self, method: str, url: str, api_method: str):
+        """So'rovni session orqali yuborish (instrumentatsiya shu yerda ushlaydi)"""
+        return self.session.request(method, url, api_method=api_method)
+
+    def _perform(self, method: str, url: str, api_method: str):
+        """Bitta HTTP so'rovni taqlid qilish: hisoblash, kechikish va 429"""
+        with self._lock:
+            self._request_count += 1
+            request_number = self._request_count
+            self.calls[api_method] += 1
+            inject_429 = (
+                (self.rate_limit_every and request_number % self.rate_limit_every == 0)
+                or (self.rate_limit_probability and self._random.random() < self.rate_limit_probability)
+            )
+
+        started = time.perf_counter()
+        if self.latency and not _ASYNC_REQUEST.get():
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.request_log.append((api_method, method, url, time.perf_counter() - started))
+            if inject_429:
+                self.rate_limited += 1
+
+        if inject_429:
+            raise gspread.exceptions.APIError(_FakeResponse(429, {
+                'error': {
+                    'code': 429,
+                    'message': "Quota exceeded for quota metric 'Write requests' (fake)",
+                    'status': 'RESOURCE_EXHAUSTED'
+                }
+            }))
+
+        return _FakeResponse(200, {})
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_stats(self):
+        """Hisoblagichlarni nolga qaytarish (ma'lumotlar saqlanib qoladi)"""
+        with self._lock:
+            self.calls.clear()
+            self.request_log.clear()
+            self.rate_limited = 0
+
+    def create_spreadsheet(self, spreadsheet_id: str, title: Optional[str] = None) -> "FakeSpreadsheet":
+        with self._lock:
+            spreadsheet = FakeSpreadsheet(self, spreadsheet_id, title or spreadsheet_id)
+            self.spreadsheets[spreadsheet_id] = spreadsheet
+            return spreadsheet
+
+    def allocate_sheet_id(self) -> int:
+        with self._lock:
+            sheet_id = self._next_sheet_id
+            self._next_sheet_id += 1
+            return sheet_id
+
+
+class FakeSession:
+    """requests.Session o'rnini bosuvchi obyekt - request metodi o'rab olinishi mumkin"""
+
+    def __init__(self, backend: FakeSheetsBackend):
+        self._backend = backend
+
+    def request(self, method: str, url: str, api_method: Optional[str] = None, **kwargs):
+        return self._backend._perform(method, url, api_method or method)
+
+
+class _FakeHttpClient:
+    def __init__(self, session: FakeSession):
+        self.session = session
+
+    def get_file_drive_metadata(self, id: str) -> Dict:
+        backend = self.session._backend
+        backend.request("GET", f"{DRIVE_API_URL}/{id}", "drive.files.get")
+        spreadsheet = backend.spreadsheets.get(id)
+        if spreadsheet is None:
+            raise gspread.exceptions.SpreadsheetNotFound(id)
+        return {'id': id, 'name': spreadsheet.title, 'modifiedTime': spreadsheet.modified_time}
+
+    def values_append(self, id: str, range: str, params: Dict, body: Dict) -> Dict:
+        # gspread HTTPClient.values_append: spreadsheet metadata o'qilmaydi
+        spreadsheet = self.session._backend.spreadsheets.get(id)
+        if spreadsheet is None:
+            raise gspread.exceptions.SpreadsheetNotFound(id)
+        return spreadsheet.values_append(range, params, body)
+
+
+# ==================== CLIENT / SPREADSHEET / WORKSHEET ====================
+
+class FakeClient:
+    """gspread.Client o'rnini bosuvchi soxta client"""
+
+    def __init__(self, backend: FakeSheetsBackend, auto_create: bool = True):
+        self.backend = backend
+        self.auto_create = auto_create
+        self.http_client = _FakeHttpClient(backend.session)
+
+    def open_by_key(self, key: str) -> "FakeSpreadsheet":
+        self.backend.request("GET", f"{SHEETS_API_URL}/{key}", "spreadsheets.get")
+        spreadsheet = self.backend.spreadsheets.get(key)
+        if spreadsheet is None:
+            if not self.auto_create:
+                raise gspread.exceptions.SpreadsheetNotFound(key)
+            spreadsheet = self.backend.create_spreadsheet(key)
+        return spreadsheet
+
+    def create(self, title: str, folder_id: Optional[str] = None) -> "FakeSpreadsheet":
+        self.backend.request("POST", DRIVE_API_URL, "drive.files.create")
+        spreadsheet = self.backend.create_spreadsheet(f"fake-{self.backend.allocate_sheet_id()}", title)
+        spreadsheet._worksheets.append(FakeWorksheet(spreadsheet, 0, "Sheet1", 1000, 26))
+        return spreadsheet
+
+    def list_permissions(self, file_id: str) -> List[Dict]:
+        self.backend.request("GET", f"{DRIVE_API_URL}/{file_id}/permissions", "drive.permissions.list")
+        return list(self.backend.spreadsheets[file_id].permissions)
+
+    def insert_permission(self, file_id: str, value: Optional[str] = None, perm_type: Optional[str] = None,
+                          role: Optional[str] = None, notify: bool = True, **kwargs):
+        self.backend.request("POST", f"{DRIVE_API_URL}/{file_id}/permissions", "drive.permissions.create")
+        self.backend.spreadsheets[file_id].permissions.append(
+            {'type': perm_type, 'role': role, 'emailAddress': value}
+        )
+
+
+class FakeSpreadsheet:
+    """gspread.Spreadsheet o'rnini bosuvchi soxta spreadsheet"""
+
+    def __init__(self, backend: FakeSheetsBackend, spreadsheet_id: str, title: str):
+        self._backend = backend
+        self.id = spreadsheet_id
+        self.title = title
+        self._worksheets: List["FakeWorksheet"] = []
+        self.permissions: List[Dict] = []
+        self.modified_time = _drive_timestamp()
+
+    @property
+    def url(self) -> str:
+        return f"https://docs.google.com/spreadsheets/d/{self.id}"
+
+    def _request(self, method: str, api_method: str, suffix: str = ""):
+        response = self._backend.request(method, f"{SHEETS_API_URL}/{self.id}{suffix}", api_method)
+        if method != "GET":
+            self.modified_time = _drive_timestamp()
+        return response
+
+    def _find(self, title: str) -> Optional["FakeWorksheet"]:
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        return None
+
+    def worksheet(self, title: str) -> "FakeWorksheet":
+        self._request("GET", "spreadsheets.get")
+        worksheet = self._find(title)
+        if worksheet is None:
+            raise gspread.WorksheetNotFound(title)
+        return worksheet
+
+    def worksheets(self) -> List["FakeWorksheet"]:
+        self._request("GET", "spreadsheets.get")
+        return list(self._worksheets)
+
+    @property
+    def sheet1(self) -> "FakeWorksheet":
+        return self._worksheets[0]
+
+    def add_worksheet(self, title: str, rows: int, cols: int, index: Optional[int] = None) -> "FakeWorksheet":
+        self._request("POST", "spreadsheets.batchUpdate", ":batchUpdate")
+        if self._find(title) is not None:
+            raise gspread.exceptions.APIError(_FakeResponse(400, {
+                'error': {
+                    'code': 400,
+                    'message': f'A sheet with the name "{title}" already exists.',
+                    'status': 'INVALID_ARGUMENT'
+                }
+            }))
+        worksheet = FakeWorksheet(self, self._backend.allocate_sheet_id(), title, rows, cols)
+        if index is None:
+            self._worksheets.append(worksheet)
+        else:
+            self._worksheets.insert(index, worksheet)
+        return worksheet
+
+    def del_worksheet(self, worksheet: "FakeWorksheet"):
+        self._request("POST", "spreadsheets.batchUpdate", ":batchUpdate")
+        self._worksheets = [ws for ws in self._worksheets if ws.id != worksheet.id]
+
+    def _resolve_range(self, range_name: str):
+        """"'SH 28.11.2025'!A1:N5" yoki "'SH 28.11.2025'" -> (worksheet, cells)"""
+        if '!' in range_name:
+            title, cells = split_sheet_range(range_name)
+        else:
+            title, cells = range_name.strip("'").replace("''", "'"), None
+        worksheet = self._find(title)
+        if worksheet is None:
+            raise gspread.exceptions.APIError(_FakeResponse(400, {
+                'error': {
+                    'code': 400,
+                    'message': f"Unable to parse range: {range_name}",
+                    'status': 'INVALID_ARGUMENT'
+                }
+            }))
+        return worksheet, cells
+
+    def fetch_sheet_metadata(self, params: Optional[Dict] = None) -> Dict:
+        self._request("GET", "spreadsheets.get")
+        return {
+            'spreadsheetId': self.id,
+            'properties': {'title': self.title},
+            'sheets': [{'properties': {
+                'sheetId': worksheet.id,
+                'title': worksheet.title,
+                'index': index,
+                'gridProperties': {'rowCount': worksheet.row_count, 'columnCount': worksheet.col_count}
+            }} for index, worksheet in enumerate(self._worksheets)]
+        }
+
+    def values_get(self, range_name: str, params: Optional[Dict] = None) -> Dict:
+        self._request("GET", "values.get", f"/values/{quote(range_name)}")
+        worksheet, cells = self._resolve_range(range_name)
+        response = {'range': range_name, 'majorDimension': 'ROWS'}
+        values = worksheet._read_range(cells or "A:ZZZ")
+        if values:
+            response['values'] = values
+        return response
+
+    def values_update(self, range_name: str, params: Optional[Dict] = None, body: Optional[Dict] = None) -> Dict:
+        self._request("PUT", "values.update", f"/values/{quote(range_name)}")
+        worksheet, cells = self._resolve_range(range_name)
+        row1, col1, _, _ = parse_a1_range(cells or "A1")
+        values = (body or {}).get('values', [])
+        for r, row in enumerate(values):
+            for c, value in enumerate(row):
+                worksheet._set_cell((row1 or 1) + r, (col1 or 1) + c, value)
+        return {'spreadsheetId': self.id, 'updatedRange': range_name, 'updatedRows': len(values)}
+
+    def values_batch_get(self, ranges: List[str], params: Optional[Dict] = None) -> Dict:
+        self._request("GET", "values.batchGet", "/values:batchGet")
+        value_ranges = []
+        for range_name in ranges:
+            worksheet, cells = self._resolve_range(range_name)
+            entry = {'range': range_name, 'majorDimension': 'ROWS'}
+            values = worksheet._read_range(cells or "A:ZZZ")
+            if values:
+                entry['values'] = values
+            value_ranges.append(entry)
+        return {'spreadsheetId': self.id, 'valueRanges': value_ranges}
+
+    def batch_update(self, body: Dict) -> Dict:
+        self._request("POST", "spreadsheets.batchUpdate", ":batchUpdate")
+        replies = []
+        for request in body.get('requests', []):
+            if 'addSheet' in request:
+                properties = request['addSheet'].get('properties', {})
+                grid = properties.get('gridProperties', {})
+                title = properties['title']
+                if self._find(title) is not None:
+                    raise gspread.exceptions.APIError(_FakeResponse(400, {
+                        'error': {
+                            'code': 400,
+                            'message': f'A sheet with the name "{title}" already exists.',
+                            'status': 'INVALID_ARGUMENT'
+                        }
+                    }))
+                worksheet = FakeWorksheet(
+                    self, properties.get('sheetId') or self._backend.allocate_sheet_id(), title,
+                    grid.get('rowCount', 1000), grid.get('columnCount', 26)
+                )
+                index = properties.get('index')
+                if index is None:
+                    self._worksheets.append(worksheet)
+                else:
+                    self._worksheets.insert(index, worksheet)
+                replies.append({'addSheet': {'properties': {'sheetId': worksheet.id, 'title': title}}})
+            elif 'updateSheetProperties' in request:
+                properties = request['updateSheetProperties']['properties']
+                for worksheet in self._worksheets:
+                    if worksheet.id == properties.get('sheetId'):
+                        if 'title' in properties:
+                            worksheet.title = properties['title']
+                        grid = properties.get('gridProperties', {})
+                        worksheet.row_count = grid.get('rowCount', worksheet.row_count)
+                        worksheet.col_count = grid.get('columnCount', worksheet.col_count)
+                replies.append({})
+            elif 'updateCells' in request:
+                update = request['updateCells']
+                start = update.get('start', {})
+                worksheet = next(ws for ws in self._worksheets if ws.id == start.get('sheetId'))
+                for r, row in enumerate(update.get('rows', [])):
+                    for c, cell in enumerate(row.get('values', [])):
+                        value = cell.get('userEnteredValue', {})
+                        worksheet._set_cell(
+                            start.get('rowIndex', 0) + r + 1, start.get('columnIndex', 0) + c + 1,
+                            next(iter(value.values()), "")
+                        )
+                replies.append({})
+            elif 'deleteDimension' in request:
+                grid_range = request['deleteDimension']['range']
+                worksheet = next(ws for ws in self._worksheets if ws.id == grid_range.get('sheetId'))
+                start, end = grid_range['startIndex'], grid_range['endIndex']
+                del worksheet._rows[start:end]
+                worksheet.row_count = max(0, worksheet.row_count - (end - start))
+                replies.append({})
+            elif 'deleteSheet' in request:
+                sheet_id = request['deleteSheet']['sheetId']
+                self._worksheets = [ws for ws in self._worksheets if ws.id != sheet_id]
+                replies.append({})
+            else:
+                replies.append({})
+        return {'spreadsheetId': self.id, 'replies': replies}
+
+    def values_batch_clear(self, params: Optional[Dict] = None, body: Optional[Dict] = None) -> Dict:
+        self._request("POST", "values.batchClear", "/values:batchClear")
+        for range_name in (body or {}).get('ranges', []):
+            worksheet, cells = self._resolve_range(range_name)
+            if cells:
+                row1, col1, row2, col2 = parse_a1_range(cells)
+                for r in range(row1 or 1, (row2 or len(worksheet._rows)) + 1):
+                    for c in range(col1 or 1, (col2 or worksheet.col_count) + 1):
+                        if r <= len(worksheet._rows) and c <= len(worksheet._rows[r - 1]):
+                            worksheet._rows[r - 1][c - 1] = ""
+            else:
+                worksheet._rows = []
+        return {'spreadsheetId': self.id, 'clearedRanges': (body or {}).get('ranges', [])}
+
+    def values_batch_update(self, body: Optional[Dict] = None) -> Dict:
+        self._request("POST", "values.batchUpdate", "/values:batchUpdate")
+        for entry in (body or {}).get('data', []):
+            worksheet, cells = self._resolve_range(entry['range'])
+            row1, col1, _, _ = parse_a1_range(cells or "A1")
+            for r, row in enumerate(entry.get('values', [])):
+                for c, value in enumerate(row):
+                    worksheet._set_cell((row1 or 1) + r, (col1 or 1) + c, value)
+        return {'spreadsheetId': self.id, 'totalUpdatedRows': sum(
+            len(entry.get('values', [])) for entry in (body or {}).get('data', [])
+        )}
+
+    def values_append(self, range_name: str, params: Dict, body: Dict) -> Dict:
+        self._request("POST", "values.append", f"/values/{quote(range_name)}:append")
+        worksheet, _ = self._resolve_range(range_name)
+        return worksheet._append(body.get('values', []))
+
+
+class FakeWorksheet:
+    """gspread.Worksheet o'rnini bosuvchi soxta worksheet"""
+
+    def __init__(self, spreadsheet: FakeSpreadsheet, sheet_id: int, title: str, rows: int, cols: int):
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self._rows: List[List[str]] = []
+
+    def _request(self, method: str, api_method: str, action: str = ""):
+        return self.spreadsheet._request(method, api_method, f"/values/{quote(self.title)}{action}")
+
+    def copy_to(self, destination_spreadsheet_id: str) -> Dict:
+        """sheets.copyTo - nusxa oxiriga "Copy of ..." nomi bilan qo'shiladi"""
+        self.spreadsheet._request("POST", "sheets.copyTo", f"/sheets/{self.id}:copyTo")
+        destination = self.spreadsheet._backend.spreadsheets[destination_spreadsheet_id]
+        title = f"Copy of {self.title}"
+        while destination._find(title) is not None:
+            title += " 2"
+        copy = FakeWorksheet(
+            destination, self.spreadsheet._backend.allocate_sheet_id(), title, self.row_count, self.col_count
+        )
+        copy._rows = [list(row) for row in self._rows]
+        destination._worksheets.append(copy)
+        return {'sheetId': copy.id, 'title': title, 'index': len(destination._worksheets) - 1}
+
+    def _used_rows(self) -> List[List[str]]:
+        """Oxiridagi bo'sh qatorlarsiz ma'lumotlar"""
+        last = len(self._rows)
+        while last > 0 and not any(cell != "" for cell in self._rows[last - 1]):
+            last -= 1
+        return self._rows[:last]
+
+    def _set_cell(self, row: int, col: int, value):
+        while len(self._rows) < row:
+            self._rows.append([])
+        cells = self._rows[row - 1]
+        while len(cells) < col:
+            cells.append("")
+        cells[col - 1] = "" if value is None else str(value)
+        self.row_count = max(self.row_count, row)
+        self.col_count = max(self.col_count, col)
+
+    def _read_range(self, range_name: str) -> List[List[str]]:
+        row1, col1, row2, col2 = parse_a1_range(range_name)
+        used = self._used_rows()
+        row1 = row1 or 1
+        row2 = row2 or len(used)
+        col1 = col1 or 1
+
+        values = []
+        for row in used[row1 - 1:row2]:
+            cells = row[col1 - 1:col2] if col2 else row[col1 - 1:]
+            while cells and cells[-1] == "":
+                cells = cells[:-1]
+            values.append(list(cells))
+
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    # ---------- O'qish ----------
+
+    def row_values(self, row: int) -> List[str]:
+        self._request("GET", "values.get")
+        values = self._read_range(f"A{row}:{row}")
+        return values[0] if values else []
+
+    def get_all_values(self) -> List[List[str]]:
+        self._request("GET", "values.get")
+        used = self._used_rows()
+        width = max((len(row) for row in used), default=0)
+        return [row + [""] * (width - len(row)) for row in used]
+
+    def get_all_records(self) -> List[Dict]:
+        self._request("GET", "values.get")
+        used = self._used_rows()
+        if not used:
+            return []
+        headers = used[0]
+        records = []
+        for row in used[1:]:
+            padded = row + [""] * (len(headers) - len(row))
+            records.append({header: _numericise(padded[i]) for i, header in enumerate(headers)})
+        return records
+
+    def get(self, range_name: str) -> List[List[str]]:
+        self._request("GET", "values.get")
+        return self._read_range(range_name)
+
+    def acell(self, label: str) -> _FakeCell:
+        self._request("GET", "values.get")
+        row, col, _, _ = parse_a1_range(label)
+        values = self._read_range(label)
+        value = values[0][0] if values and values[0] else None
+        return _FakeCell(row, col, value)
+
+    # ---------- Yozish ----------
+
+    def append_row(self, values: List, value_input_option: str = 'RAW', **kwargs) -> Dict:
+        return self.append_rows([values], value_input_option=value_input_option)
+
+    def append_rows(self, values: List[List], value_input_option: str = 'RAW', **kwargs) -> Dict:
+        self._request("POST", "values.append", ":append")
+        return self._append(values)
+
+    def _append(self, values: List[List]) -> Dict:
+        start_row = len(self._used_rows()) + 1
+        for offset, row in enumerate(values):
+            for col, value in enumerate(row, start=1):
+                self._set_cell(start_row + offset, col, value)
+        end_row = start_row + len(values) - 1
+        width = max((len(row) for row in values), default=1)
+        last_col = gspread.utils.rowcol_to_a1(1, width).rstrip("0123456789")
+        return {
+            'spreadsheetId': self.spreadsheet.id,
+            'updates': {
+                'spreadsheetId': self.spreadsheet.id,
+                'updatedRange': f"'{self.title}'!A{start_row}:{last_col}{end_row}",
+                'updatedRows': len(values),
+                'updatedColumns': width,
+                'updatedCells': sum(len(row) for row in values)
+            }
+        }
+
+    def update(self, first, second=None, **kwargs) -> Dict:
+        # Ikkala chaqiruv tartibi qo'llab-quvvatlanadi: update(range, values) va update(values, range)
+        if isinstance(first, str) and not isinstance(second, str):
+            range_name, values = first, second
+        else:
+            values, range_name = first, second
+        if not isinstance(values, list):
+            values = [[values]]
+        elif values and not isinstance(values[0], list):
+            values = [values]
+
+        self._request("PUT", "values.update")
+        row1, col1, _, _ = parse_a1_range(range_name or "A1")
+        for r, row in enumerate(values):
+            for c, value in enumerate(row):
+                self._set_cell((row1 or 1) + r, (col1 or 1) + c, value)
+        return {'updatedRange': f"'{self.title}'!{range_name}"}
+
+    def update_acell(self, label: str, value) -> Dict:
+        return self.update(label, [[value]])
+
+    def clear(self):
+        self._request("POST", "values.clear", ":clear")
+        self._rows = []
+
+    def delete_rows(self, start_index: int, end_index: Optional[int] = None):
+        self.spreadsheet._request("POST", "spreadsheets.batchUpdate", ":batchUpdate")
+        end_index = end_index or start_index
+        del self._rows[start_index - 1:end_index]
+        self.row_count = max(0, self.row_count - (end_index - start_index + 1))
+
+    # ---------- Formatlash (faqat hisoblanadi) ----------
+
+    def format(self, ranges, format_data: Dict):
+        self.spreadsheet._request("POST", "spreadsheets.batchUpdate", ":batchUpdate")
+
+    def columns_auto_resize(self, start_column_index: int, end_column_index: int):
+        self.spreadsheet._request("POST", "spreadsheets.batchUpdate", ":batchUpdate")
+
+
+class FakeAsyncSheetsClient:
+    """
+    sheets_async.AsyncSheetsClient o'rnini bosuvchi soxta client
+    Har bir so'rov oldidan asyncio.sleep(latency) - boshqa korutinlar shu vaqtda ishlaydi
+    """
+
+    account_email = "fake-service-account@sheets.local"
+
+    def __init__(self, backend: FakeSheetsBackend, auto_create: bool = True):
+        from sheets_metrics import instrument_session
+
+        self.backend = backend
+        self.auto_create = auto_create
+        self._sheet_ids: Dict[str, Dict[str, int]] = {}
+        instrument_session(backend.session)
+
+    def _spreadsheet(self, spreadsheet_id: str) -> FakeSpreadsheet:
+        spreadsheet = self.backend.spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            if not self.auto_create:
+                from sheets_async import SheetsAPIError
+                raise SheetsAPIError(404, "Requested entity was not found.")
+            spreadsheet = self.backend.create_spreadsheet(spreadsheet_id)
+        return spreadsheet
+
+    async def _call(self, spreadsheet_id: str, method_name: str, *args, **kwargs):
+        from sheets_async import SheetsAPIError, MAX_RETRIES, RETRY_STATUSES
+
+        for attempt in range(MAX_RETRIES + 1):
+            await asyncio.sleep(self.backend.latency)
+            token = _ASYNC_REQUEST.set(True)
+            try:
+                return getattr(self._spreadsheet(spreadsheet_id), method_name)(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                if e.code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                    continue
+                raise SheetsAPIError(e.code, str(e.error.get('message', e)), {'error': e.error})
+            finally:
+                _ASYNC_REQUEST.reset(token)
+
+    async def close(self):
+        pass
+
+    async def get_metadata(self, spreadsheet_id: str, fields: str = "") -> Dict:
+        return await self._call(spreadsheet_id, 'fetch_sheet_metadata')
+
+    async def get_sheet_ids(self, spreadsheet_id: str, refresh: bool = False) -> Dict[str, int]:
+        if refresh or spreadsheet_id not in self._sheet_ids:
+            metadata = await self.get_metadata(spreadsheet_id)
+            self._sheet_ids[spreadsheet_id] = {
+                sheet['properties']['title']: sheet['properties']['sheetId'] for sheet in metadata['sheets']
+            }
+        return self._sheet_ids[spreadsheet_id]
+
+    def remember_sheet_id(self, spreadsheet_id: str, title: str, sheet_id: int):
+        self._sheet_ids.setdefault(spreadsheet_id, {})[title] = sheet_id
+
+    def invalidate_sheet_ids(self, spreadsheet_id: str):
+        self._sheet_ids.pop(spreadsheet_id, None)
+
+    async def values_get(self, spreadsheet_id: str, range_name: str, params: Optional[Dict] = None) -> Dict:
+        return await self._call(spreadsheet_id, 'values_get', range_name, params)
+
+    async def values_batch_get(self, spreadsheet_id: str, ranges: List[str], params: Optional[Dict] = None) -> Dict:
+        return await self._call(spreadsheet_id, 'values_batch_get', ranges, params)
+
+    async def values_append(self, spreadsheet_id: str, range_name: str, values: List[List],
+                            value_input_option: str = 'RAW') -> Dict:
+        return await self._call(
+            spreadsheet_id, 'values_append', range_name, {'valueInputOption': value_input_option}, {'values': values}
+        )
+
+    async def values_update(self, spreadsheet_id: str, range_name: str, values: List[List],
+                            value_input_option: str = 'RAW') -> Dict:
+        return await self._call(
+            spreadsheet_id, 'values_update', range_name, {'valueInputOption': value_input_option}, {'values': values}
+        )
+
+    async def values_batch_update(self, spreadsheet_id: str, data: List[Dict], value_input_option: str = 'RAW') -> Dict:
+        return await self._call(
+            spreadsheet_id, 'values_batch_update', {'valueInputOption': value_input_option, 'data': data}
+        )
+
+    async def batch_update(self, spreadsheet_id: str, requests: List[Dict]) -> Dict:
+        return await self._call(spreadsheet_id, 'batch_update', {'requests': requests})
+
+    @staticmethod
+    async def gather(*calls):
+        return await asyncio.gather(*calls)
+
+
+# ==================== O'RNATISH ====================
+
+def install_fake_client(backend: Optional[FakeSheetsBackend] = None, **backend_options) -> FakeSheetsBackend:
+    """
+    google_sheets_integration.get_google_sheets_client va sheets_async.get_async_sheets_client
+    o'rniga soxta clientlarni qaytaruvchi factorylarni o'rnatish
+    """
+    from google_sheets_integration import set_google_sheets_client_factory
+    from sheets_async import set_async_sheets_client_factory
+
+    backend = backend or FakeSheetsBackend(**backend_options)
+    async_client = FakeAsyncSheetsClient(backend)
+    set_google_sheets_client_factory(lambda *args: FakeClient(backend))
+    set_async_sheets_client_factory(lambda *args: async_client)
+    return backend
+
+
+def uninstall_fake_client():
+    """Asl gspread clientga qaytish"""
+    from google_sheets_integration import set_google_sheets_client_factory
+    from sheets_async import set_async_sheets_client_factory
+
+    set_google_sheets_client_factory(None)
+    set_async_sheets_client_factory(None)
+
+
+# ==================== BENCHMARK ====================
+
+def make_fake_report(number: int, is_tashkent: bool = False) -> Dict:
+    """Benchmark uchun sintetik hisobot"""
+    return {
+        'client_name': f'Mijoz {number}',
+        'phone_number': f'+99890{number:07d}',
+        'additional_phone_number': 'Mavjud emas',
+        'product_type': f'Mahsulot {number % 25}',
+        'client_location': 'Toshkent shahar, Chilonzor' if is_tashkent else 'Samarqand viloyati',
+        'contract_id': f'BENCH-{number:06d}',
+        'contract_amount': f'{(number % 50 + 1) * 100}.000',
+        'sender_full_name': f'Sotuvchi {number % 12}',
+        'delivery': 'Bepul',
+        'note': "Yo'q"
+    }
+
+
+def _summarise(backend: FakeSheetsBackend, durations: List[float], failures: int) -> Dict:
+    reports = len(durations)
+    return {
+        'reports': reports,
+        'failures': failures,
+        'api_calls': backend.total_calls(),
+        'calls_per_report': round(backend.total_calls() / reports, 2) if reports else 0,
+        'calls_by_method': dict(backend.calls),
+        'rate_limited': backend.rate_limited,
+        'avg_latency_ms': round(sum(durations) / reports * 1000, 2) if reports else 0,
+        'max_latency_ms': round(max(durations) * 1000, 2) if durations else 0
+    }
+
+
+def benchmark_save_paths(reports: int = 20, latency: float = 0.0, rate_limit_every: int = 0) -> Dict:
+    """
+    save_report_to_daily_sheet va save_report_to_all_data yo'llarining (sinxron va asinxron)
+    har bir hisobot uchun API chaqiruvlar soni va kechikishini o'lchash
+    """
+    import database
+    import google_sheets_integration as gsi
+    import sheets_async
+
+    original_db_name = database.DB_NAME
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(db_fd)
+    database.DB_NAME = db_path
+
+    try:
+        database.init_db()
+        results = {}
+
+        for path_name, save in (
+            ('daily_sheet', lambda data: gsi.save_report_to_daily_sheet("bench-group", data, True)),
+            ('all_data', lambda data: gsi.save_report_to_all_data("bench-all-data", data, True)),
+            ('daily_sheet_async', lambda data: asyncio.run(
+                sheets_async.save_report_to_daily_sheet_async("bench-group", data, True)
+            )),
+            ('all_data_async', lambda data: asyncio.run(
+                sheets_async.save_report_to_all_data_async("bench-all-data", data, True)
+            )),
+        ):
+            backend = install_fake_client(latency=latency, rate_limit_every=rate_limit_every)
+            # Birinchi hisobot worksheet yaratadi - o'lchovdan tashqarida
+            save(make_fake_report(0, True))
+            backend.reset_stats()
+
+            durations = []
+            failures = 0
+            for number in range(1, reports + 1):
+                started = time.perf_counter()
+                if not save(make_fake_report(number, True)):
+                    failures += 1
+                durations.append(time.perf_counter() - started)
+
+            results[path_name] = _summarise(backend, durations, failures)
+
+        return results
+
+    finally:
+        uninstall_fake_client()
+        database.DB_NAME = original_db_name
+        os.remove(db_path)
+
+
+
+# ==================== STRESS TEST ====================
+
+def _check_worksheet_sequence(worksheet: "FakeWorksheet", spreadsheet_id: str) -> Dict:
+    """Worksheetdagi "№" ketma-ketligi va qator indeksi to'g'riligini tekshirish"""
+    from database import get_sheet_row_location
+    from google_sheets_integration import CONTRACT_ID_COLUMN
+
+    rows = worksheet._used_rows()[1:]
+    numbers = [str(row[0]) for row in rows if row]
+    index_mismatches = 0
+    for row_index, row in enumerate(rows, start=2):
+        contract_id = str(row[CONTRACT_ID_COLUMN]) if len(row) > CONTRACT_ID_COLUMN else ''
+        if contract_id and get_sheet_row_location(spreadsheet_id, worksheet.title, contract_id) != row_index:
+            index_mismatches += 1
+
+    return {
+        'rows': len(rows),
+        'duplicate_numbers': len(numbers) - len(set(numbers)),
+        'in_sequence': numbers == [str(number) for number in range(1, len(numbers) + 1)],
+        'index_mismatches': index_mismatches
+    }
+
+
+def stress_concurrent_saves(reports: int = 300, latency: float = 0.005, sync_reports: int = 20) -> Dict:
+    """
+    Bir vaqtning o'zida yuzlab hisobotni saqlash (asinxron yo'l, ustiga sinxron yo'l threadlarda):
+    SH, VL va ALL DATA worksheetlarida "№" takrorlanmasligi va qator indeksi to'g'riligini tekshirish
+    """
+    import database
+    import google_sheets_integration as gsi
+    import sheets_async
+
+    original_db_name = database.DB_NAME
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(db_fd)
+    database.DB_NAME = db_path
+
+    async def fire():
+        calls = []
+        for number in range(1, reports + 1):
+            is_tashkent = number % 2 == 0
+            data = make_fake_report(number, is_tashkent)
+            calls.append(sheets_async.save_report_to_daily_sheet_async("stress-group", data, is_tashkent))
+            calls.append(sheets_async.save_report_to_all_data_async("stress-all-data", data, is_tashkent))
+        for number in range(reports + 1, reports + sync_reports + 1):
+            is_tashkent = number % 2 == 0
+            data = make_fake_report(number, is_tashkent)
+            calls.append(asyncio.to_thread(gsi.save_report_to_daily_sheet, "stress-group", data, is_tashkent))
+            calls.append(asyncio.to_thread(gsi.save_report_to_all_data, "stress-all-data", data, is_tashkent))
+        return await asyncio.gather(*calls)
+
+    try:
+        database.init_db()
+        backend = install_fake_client(latency=latency)
+
+        started = time.perf_counter()
+        outcomes = asyncio.run(fire())
+        elapsed = time.perf_counter() - started
+
+        worksheets = {}
+        for spreadsheet_id in ("stress-group", "stress-all-data"):
+            for worksheet in backend.spreadsheets[spreadsheet_id].worksheets():
+                worksheets[worksheet.title] = _check_worksheet_sequence(worksheet, spreadsheet_id)
+
+        return {
+            'saves': len(outcomes),
+            'failures': outcomes.count(False),
+            'elapsed_s': round(elapsed, 2),
+            'api_calls': backend.total_calls(),
+            'worksheets': worksheets
+        }
+
+    finally:
+        uninstall_fake_client()
+        database.DB_NAME = original_db_name
+        os.remove(db_path)
+
+
+# ==================== STATISTIKA BENCHMARKI ====================
+
+def make_fake_statistics_rows(rows: int = 100_000) -> List[List[str]]:
+    """Statistika uchun sintetik qatorlar: sotuvchi, mahsulot, manzil va sanalar takrorlanadi"""
+    from google_sheets_integration import COLUMN_HEADERS
+
+    randomizer = random.Random(42)
+    sellers = [f"Sotuvchi {number}" for number in range(40)] + ["TEST sotuvchi"]
+    products = [f"Mahsulot {number}" for number in range(25)]
+    locations = (
+        ["Toshkent shahar, Chilonzor", "Toshkent shahar, Yunusobod", "Toshkent sh."]
+        + [f"{name} viloyati, tuman" for name in ("Samarqand", "Buxoro", "Farg'ona", "Andijon", "Namangan")]
+        + ["Nukus shahar", "Qarshi, markaz", "Boshqa joy"]
+    )
+    dates = [f"{day:02d}.{month:02d}.2026" for month in range(1, 11) for day in range(1, 29)]
+
+    result = [list(COLUMN_HEADERS)]
+    for number in range(1, rows + 1):
+        row = [""] * len(COLUMN_HEADERS)
+        row[0] = str(number)
+        row[4] = randomizer.choice(products)
+        row[8] = randomizer.choice(locations)
+        row[9] = f"{randomizer.choice(dates)} {randomizer.randint(8, 20):02d}:00"
+        row[11] = f"C{number}"
+        row[13] = randomizer.choice(sellers)
+        result.append(row)
+    return result
+
+
+def _per_row_report_statistics(records: List[Dict]) -> Dict:
+    """Avvalgi yondashuv (taqqoslash uchun): har bir yozuvda strptime, lower va split"""
+    from google_sheets_integration import is_tashkent_region
+
+    sellers_stats, product_stats, location_stats = {}, {}, {}
+    monthly_stats, daily_stats = {}, {}
+    tashkent_count = viloyat_count = 0
+
+    for record in records:
+        seller = record.get('Sotuvchi ismi', '').strip()
+        if seller and 'TEST' not in seller.upper():
+            sellers_stats[seller] = sellers_stats.get(seller, 0) + 1
+
+        product = record.get('Mahsulot nomi', '').strip()
+        if product and 'TEST' not in product.upper():
+            product_stats[product] = product_stats.get(product, 0) + 1
+
+        location = record.get('Mijoz manzili', '').strip()
+        if location and 'TEST' not in location.upper():
+            if is_tashkent_region(location):
+                tashkent_count += 1
+            else:
+                viloyat_count += 1
+            if 'shahar' in location.lower():
+                city = location.split('shahar')[0].strip() + ' shahar'
+            elif 'viloyat' in location.lower():
+                city = location.split('viloyat')[0].strip() + ' viloyat'
+            else:
+                city = location.split(',')[0].strip() if ',' in location else 'Boshqa'
+            location_stats[city] = location_stats.get(city, 0) + 1
+
+        try:
+            date_str = record.get('Shartnoma imzolangan sana', '').strip()
+            if date_str:
+                date_obj = datetime.strptime(date_str.split(' ')[0], '%d.%m.%Y')
+                month_key = date_obj.strftime('%Y-%m')
+                monthly_stats[month_key] = monthly_stats.get(month_key, 0) + 1
+                day_key = date_obj.strftime('%Y-%m-%d')
+                daily_stats[day_key] = daily_stats.get(day_key, 0) + 1
+        except ValueError:
+            continue
+
+    return {
+        'total_reports': len(records),
+        'sellers_stats': sellers_stats,
+        'product_stats': product_stats,
+        'location_stats': location_stats,
+        'monthly_stats': monthly_stats,
+        'daily_stats': daily_stats,
+        'tashkent_count': tashkent_count,
+        'viloyat_count': viloyat_count
+    }
+
+
+def benchmark_report_statistics(rows: int = 100_000, repeats: int = 3) -> Dict:
+    """
+    get_reports_statistics hisoblash qismini o'lchash: avvalgi har-bir-qator yondashuvi
+    va compute_report_statistics (ustunlar bo'yicha Counter + noyob qiymatlarni bir marta tahlil)
+    """
+    import google_sheets_integration as gsi
+
+    values = make_fake_statistics_rows(rows)
+    headers = values[0]
+    columns = {header: index for index, header in enumerate(headers)}
+    records = [dict(zip(headers, row)) for row in values[1:]]
+
+    def measure(func) -> float:
+        best = None
+        for _ in range(repeats):
+            gsi._parse_report_date.cache_clear()
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    per_row_seconds = measure(lambda: _per_row_report_statistics(records))
+    columnar_seconds = measure(lambda: gsi.compute_report_statistics(values[1:], columns))
+
+    expected = _per_row_report_statistics(records)
+    actual = gsi.compute_report_statistics(values[1:], columns)
+    matches = all(expected[key] == actual[key] for key in expected)
+
+    return {
+        'rows': rows,
+        'per_row_ms': round(per_row_seconds * 1000, 1),
+        'columnar_ms': round(columnar_seconds * 1000, 1),
+        'speedup': round(per_row_seconds / columnar_seconds, 1) if columnar_seconds else None,
+        'results_match': matches
+    }
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    print(json.dumps(benchmark_save_paths(), ensure_ascii=False, indent=2))
+    print(json.dumps(benchmark_report_statistics(), ensure_ascii=False, indent=2))
@@ -0,0 +1,364 @@
+"""
+sheets_metrics.py - Google Sheets API chaqiruvlari hisobi va kechikish gistogrammalari
+Har bir HTTP so'rov yuqori darajadagi operatsiya (masalan save_report_to_daily_sheet)
+va spreadsheet ID bilan belgilanadi. Natijalar adminlarga ko'rsatiladi va
+Prometheus matn formatida eksport qilinadi.
+"""
+
+import functools
+import inspect
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+# So'rov va operatsiya kechikishlari uchun gistogramma chegaralari (soniya)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Bitta operatsiyadagi API chaqiruvlar soni uchun chegaralar
+CALLS_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34)
+
+DEFAULT_OPERATION = "other"
+
+_SPREADSHEET_ID_PATTERN = re.compile(r'/spreadsheets/([a-zA-Z0-9-_]+)')
+_DRIVE_FILE_ID_PATTERN = re.compile(r'/files/([a-zA-Z0-9-_]+)')
+
+
+class _OperationFrame:
+    """Joriy operatsiya konteksti: nomi, spreadsheet, API chaqiruvlar soni va xato belgisi"""
+
+    __slots__ = ('name', 'spreadsheet_id', 'api_calls', 'failed')
+
+    def __init__(self, name: str, spreadsheet_id: Optional[str]):
+        self.name = name
+        self.spreadsheet_id = spreadsheet_id
+        self.api_calls = 0
+        # Xatoni o'zi ushlab False qaytaradigan operatsiyalar uchun (track_sheets_operation)
+        self.failed = False
+
+
+_current_operation: ContextVar[Optional[_OperationFrame]] = ContextVar('sheets_operation', default=None)
+
+
+# ==================== GISTOGRAMMA ====================
+
+class Histogram:
+    """Kumulyativ bo'lmagan bucketlarda saqlanadigan oddiy gistogramma"""
+
+    def __init__(self, buckets: Tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            yield bound, running
+
+    def quantile(self, q: float) -> float:
+        """Bucket chegarasi bo'yicha taxminiy kvantil"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        for bound, running in self.cumulative():
+            if running >= target:
+                return bound if bound != float('inf') else self.buckets[-1]
+        return self.buckets[-1]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+# ==================== METRIKALAR ====================
+
+class SheetsMetrics:
+    """Operatsiya va API metodi bo'yicha hisoblagichlar"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            # (operation, api_method, status) -> soni
+            self.requests: Dict[Tuple[str, str, str], int] = {}
+            # (operation, spreadsheet_id) -> soni
+            self.spreadsheet_requests: Dict[Tuple[str, str], int] = {}
+            self.request_latency: Dict[str, Histogram] = {}
+            self.operation_latency: Dict[str, Histogram] = {}
+            self.operation_calls: Dict[str, Histogram] = {}
+            self.operation_errors: Dict[str, int] = {}
+
+    def record_request(self, operation: str, spreadsheet_id: Optional[str], api_method: str,
+                       status: str, duration: float):
+        with self._lock:
+            key = (operation, api_method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            sheet_key = (operation, spreadsheet_id or "unknown")
+            self.spreadsheet_requests[sheet_key] = self.spreadsheet_requests.get(sheet_key, 0) + 1
+            self.request_latency.setdefault(operation, Histogram(LATENCY_BUCKETS)).observe(duration)
+
+    def record_operation(self, operation: str, duration: float, api_calls: int, failed: bool):
+        with self._lock:
+            self.operation_latency.setdefault(operation, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.operation_calls.setdefault(operation, Histogram(CALLS_BUCKETS)).observe(api_calls)
+            if failed:
+                self.operation_errors[operation] = self.operation_errors.get(operation, 0) + 1
+
+
+sheets_metrics = SheetsMetrics()
+
+
+# ==================== OPERATSIYA KONTEKSTI ====================
+
+@contextmanager
+def sheets_operation(name: str, spreadsheet_id: Optional[str] = None):
+    """
+    Ichidagi barcha Sheets so'rovlarini shu operatsiya bilan belgilash.
+    Ichma-ich operatsiyalarda eng tashqi operatsiya saqlanadi.
+    Korutinlar ichida ham ishlaydi - kontekst har bir asyncio vazifasiga alohida.
+    """
+    if _current_operation.get() is not None:
+        yield
+        return
+
+    frame = _OperationFrame(name, spreadsheet_id)
+    token = _current_operation.set(frame)
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield frame
+    except Exception:
+        failed = True
+        raise
+    finally:
+        _current_operation.reset(token)
+        sheets_metrics.record_operation(name, time.perf_counter() - started, frame.api_calls, failed or frame.failed)
+
+
+def track_sheets_operation(name: str):
+    """
+    Funksiyani Sheets operatsiyasi sifatida belgilovchi dekorator.
+    Spreadsheet ID birinchi argumentdan yoki spreadsheet_id kalit so'zidan olinadi.
+    Funksiya False qaytarsa ham (save_* xatoni o'zi ushlaydi) operatsiya xato deb hisoblanadi.
+    """
+    def spreadsheet_id_from(args, kwargs):
+        spreadsheet_id = kwargs.get('spreadsheet_id')
+        if spreadsheet_id is None:
+            spreadsheet_id = next((arg for arg in args if isinstance(arg, str)), None)
+        return spreadsheet_id
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with sheets_operation(name, spreadsheet_id_from(args, kwargs)) as frame:
+                    result = await func(*args, **kwargs)
+                    if result is False and frame is not None:
+                        frame.failed = True
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with sheets_operation(name, spreadsheet_id_from(args, kwargs)) as frame:
+                result = func(*args, **kwargs)
+                if result is False and frame is not None:
+                    frame.failed = True
+                return result
+        return wrapper
+    return decorator
+
+
+# ==================== SESSION INSTRUMENTATSIYASI ====================
+
+def classify_request(method: str, url: str) -> str:
+    """HTTP so'rovni Sheets/Drive REST metodi nomiga aylantirish"""
+    method = (method or "").upper()
+    path = url.split('?', 1)[0]
+
+    if 'googleapis.com/drive' in path:
+        return f"drive.files.{method.lower()}"
+    if path.endswith(':batchUpdate') and '/values' not in path:
+        return "spreadsheets.batchUpdate"
+    if ':copyTo' in path:
+        return "sheets.copyTo"
+    if '/values:' in path:
+        return "values." + path.rsplit(':', 1)[1]
+    if '/values/' in path:
+        if path.endswith(':append'):
+            return "values.append"
+        if path.endswith(':clear'):
+            return "values.clear"
+        return "values.update" if method == "PUT" else "values.get"
+    if method == "POST" and path.rstrip('/').endswith('/spreadsheets'):
+        return "spreadsheets.create"
+    return "spreadsheets.get"
+
+
+def extract_spreadsheet_id(url: str) -> Optional[str]:
+    match = _SPREADSHEET_ID_PATTERN.search(url) or _DRIVE_FILE_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def record_http_request(method: str, url: str, status: str, duration: float):
+    """Bitta HTTP so'rovni joriy operatsiya bilan hisoblash (sinxron va asinxron clientlar uchun)"""
+    frame = _current_operation.get()
+    operation = frame.name if frame else DEFAULT_OPERATION
+    spreadsheet_id = extract_spreadsheet_id(url) or (frame.spreadsheet_id if frame else None)
+    if frame:
+        frame.api_calls += 1
+    sheets_metrics.record_request(operation, spreadsheet_id, classify_request(method, url), status, duration)
+
+
+def instrument_session(session):
+    """
+    Session.request ni o'rab, har bir so'rovni joriy operatsiya bilan hisoblash.
+    Bir session ikki marta o'ralmaydi.
+    """
+    if session is None or getattr(session, '_sheets_metrics_instrumented', False):
+        return session
+
+    original_request = session.request
+
+    def request(method, url, *args, **kwargs):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = original_request(method, url, *args, **kwargs)
+            status = str(getattr(response, 'status_code', 'error'))
+            return response
+        except Exception as e:
+            response = getattr(e, 'response', None)
+            if response is not None and getattr(response, 'status_code', None):
+                status = str(response.status_code)
+            raise
+        finally:
+            record_http_request(method, url, status, time.perf_counter() - started)
+
+    session.request = request
+    session._sheets_metrics_instrumented = True
+    return session
+
+
+def instrument_client(client):
+    """gspread clientining HTTP sessionini instrumentatsiya qilish (gspread 5 va 6)"""
+    if client is None:
+        return client
+    http_client = getattr(client, 'http_client', None)
+    session = getattr(http_client, 'session', None) if http_client else getattr(client, 'session', None)
+    instrument_session(session)
+    return client
+
+
+# ==================== EKSPORT ====================
+
+def _labels(**labels) -> str:
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _render_histogram(lines: list, name: str, histograms: Dict[str, Histogram]):
+    for operation, histogram in sorted(histograms.items()):
+        for bound, running in histogram.cumulative():
+            le = "+Inf" if bound == float('inf') else f"{bound:g}"
+            lines.append(f"{name}_bucket{_labels(operation=operation, le=le)} {running}")
+        lines.append(f"{name}_sum{_labels(operation=operation)} {histogram.total:.6f}")
+        lines.append(f"{name}_count{_labels(operation=operation)} {histogram.count}")
+
+
+def render_prometheus() -> str:
+    """Metrikalarni Prometheus matn formatida qaytarish"""
+    metrics = sheets_metrics
+    lines = []
+
+    with metrics._lock:
+        lines.append("# HELP sheets_api_requests_total Google Sheets API HTTP requests.")
+        lines.append("# TYPE sheets_api_requests_total counter")
+        for (operation, api_method, status), count in sorted(metrics.requests.items()):
+            lines.append(
+                f"sheets_api_requests_total{_labels(operation=operation, method=api_method, status=status)} {count}"
+            )
+
+        lines.append("# HELP sheets_api_spreadsheet_requests_total Google Sheets API HTTP requests per spreadsheet.")
+        lines.append("# TYPE sheets_api_spreadsheet_requests_total counter")
+        for (operation, spreadsheet_id), count in sorted(metrics.spreadsheet_requests.items()):
+            lines.append(
+                f"sheets_api_spreadsheet_requests_total{_labels(operation=operation, spreadsheet=spreadsheet_id)} {count}"
+            )
+
+        lines.append("# HELP sheets_api_request_duration_seconds Google Sheets API HTTP request latency.")
+        lines.append("# TYPE sheets_api_request_duration_seconds histogram")
+        _render_histogram(lines, "sheets_api_request_duration_seconds", metrics.request_latency)
+
+        lines.append("# HELP sheets_operation_duration_seconds High-level Sheets operation latency.")
+        lines.append("# TYPE sheets_operation_duration_seconds histogram")
+        _render_histogram(lines, "sheets_operation_duration_seconds", metrics.operation_latency)
+
+        lines.append("# HELP sheets_operation_api_calls API requests made by one high-level Sheets operation.")
+        lines.append("# TYPE sheets_operation_api_calls histogram")
+        _render_histogram(lines, "sheets_operation_api_calls", metrics.operation_calls)
+
+        lines.append("# HELP sheets_operation_errors_total High-level Sheets operations that raised or returned False.")
+        lines.append("# TYPE sheets_operation_errors_total counter")
+        for operation, count in sorted(metrics.operation_errors.items()):
+            lines.append(f"sheets_operation_errors_total{_labels(operation=operation)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def format_metrics_summary() -> str:
+    """Adminlar uchun qisqa matnli hisobot"""
+    metrics = sheets_metrics
+
+    with metrics._lock:
+        if not metrics.operation_latency and not metrics.request_latency:
+            return "📊 Google Sheets API metrikalari\n\nHozircha so'rovlar yo'q."
+
+        since = time.strftime('%d.%m.%Y %H:%M', time.localtime(metrics.started_at))
+        text = f"📊 Google Sheets API metrikalari\n🕐 {since} dan beri\n\n"
+
+        requests_by_operation: Dict[str, int] = {}
+        throttled_by_operation: Dict[str, int] = {}
+        for (operation, _, status), count in metrics.requests.items():
+            requests_by_operation[operation] = requests_by_operation.get(operation, 0) + count
+            if status == "429":
+                throttled_by_operation[operation] = throttled_by_operation.get(operation, 0) + count
+
+        operations = sorted(set(requests_by_operation) | set(metrics.operation_latency))
+        for operation in operations:
+            latency = metrics.operation_latency.get(operation)
+            calls = metrics.operation_calls.get(operation)
+            text += f"🔹 {operation}\n"
+            if latency:
+                text += (
+                    f"├ Chaqiruvlar: {latency.count} ta "
+                    f"(xato: {metrics.operation_errors.get(operation, 0)})\n"
+                    f"├ API so'rovlar/operatsiya: {calls.mean:.1f}\n"
+                    f"├ Kechikish: o'rtacha {latency.mean * 1000:.0f} ms, p95 ≤ {latency.quantile(0.95):g} s\n"
+                )
+            text += (
+                f"└ HTTP so'rovlar: {requests_by_operation.get(operation, 0)} ta "
+                f"(429: {throttled_by_operation.get(operation, 0)})\n\n"
+            )
+
+    return text.rstrip()
@@ -0,0 +1,845 @@
+"""
+sheets_sync.py - sales_reports jadvali va kunlik Google Sheetlar o'rtasidagi sinxronlash
+
+Solishtirish: har bir spreadsheet uchun tekshirilayotgan kunlarning barcha worksheetlari
+(SH/VL/ALL DATA) bitta values.batchGet bilan o'qiladi, DB bilan shartnoma raqami bo'yicha
+solishtiriladi, yetishmayotgan qatorlar bitta values.append bilan qayta qo'shiladi.
+Dublikatlar va DB da yo'q (orphan) qatorlar adminga xabar qilinadi.
+
+Backfill: sales_reports sana oralig'i bo'yicha oqim bilan o'qiladi, qatorlar kunlik
+worksheetlarga guruhlanadi va har bir kun uchun bitta values.batchUpdate bilan yoziladi.
+
+Teskari sinxronlash: logistika qo'lda to'ldiradigan "Jo'natma turi" (F) va "Yuborilgan sana" (K)
+ustunlari so'nggi kunlik SH/VL worksheetlardan bitta batchGet bilan o'qilib, shartnoma raqami
+bo'yicha sales_reports ga yoziladi. Drive modifiedTime o'zgarmagan spreadsheetlar o'qilmaydi.
+
+ALL DATA davriy rejimi: hisobot yuborilganda ALL DATA ga yozilmaydi, uning o'rniga
+sales_reports dagi saqlangan belgi (high-water mark, id) dan keyingi hisobotlar har
+ALL_DATA_MATERIALIZE_INTERVAL_SECONDS da bitta values.append bilan qo'shiladi.
+Rejim almashganda eng katta hisobot ID si (switch) saqlanadi: undan oldingilar eski rejimga,
+keyingilar yangi rejimga tegishli - shu sabab rejim almashinuvida hisobot yo'qolmaydi ham,
+ikki marta ham yozilmaydi.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from aiogram import Router, Bot
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from config import ADMIN_ID
+from database import (
+    get_all_google_sheets, get_reports_for_reconciliation, get_recent_report_contracts, iter_reports_for_sheets,
+    save_sheet_row_locations, delete_sheet_row_locations,
+    get_sheet_pull_states, save_sheet_pull_state, apply_shipping_updates,
+    get_setting, set_setting, get_reports_for_sheets_after, get_max_sales_report_id
+)
+from google_sheets_integration import (
+    get_google_sheets_client, get_daily_worksheet_name, get_daily_all_data_worksheet_name,
+    get_or_create_daily_worksheet, get_or_create_all_data_worksheet,
+    build_daily_row, build_all_data_row, batch_read_worksheets, batch_read_columns, bulk_append_rows,
+    write_worksheets_bulk, worksheet_lock, get_next_row_number,
+    COLUMN_HEADERS, ALL_DATA_COLUMN_HEADERS, CONTRACT_ID_COLUMN, SHIPMENT_TYPE_COLUMN, SHIPPED_DATE_COLUMN,
+    DELIVERY_COLUMN, NOTE_COLUMN
+)
+from sheets_metrics import sheets_operation
+from additional import (
+    is_admin, get_all_data_spreadsheet_id, is_all_data_batch_mode, set_all_data_batch_mode,
+    get_all_data_switch_report_id
+)
+
+sheets_sync_router = Router()
+
+# Rejali solishtirish oralig'i va qamrovi
+RECONCILE_INTERVAL_SECONDS = 6 * 60 * 60
+RECONCILE_DAYS = 2  # bugun va kecha
+
+# Shu daqiqadan yangi hisobotlar tekshirilmaydi - ular hali yozilayotgan bo'lishi mumkin
+RECONCILE_GRACE_MINUTES = 10
+
+# Bitta /backfill buyrug'i qamrab oladigan eng ko'p kunlar soni
+BACKFILL_MAX_DAYS = 366
+
+# Sheet -> DB sinxronlash oralig'i va qamrovi (qo'lda to'ldirish odatda bir hafta ichida)
+PULL_INTERVAL_SECONDS = 15 * 60
+PULL_DAYS = 7
+
+# ALL DATA davriy rejimi: oraliq, bitta o'qishdagi hisobotlar soni va belgi kaliti (bot_settings)
+ALL_DATA_MATERIALIZE_INTERVAL_SECONDS = 60
+ALL_DATA_MATERIALIZE_BATCH = 1000
+ALL_DATA_HIGH_WATER_MARK_KEY = "all_data_high_water_mark"
+
+# Davriy to'ldirish bir vaqtda faqat bitta oqimda (fon tsikli va /alldatamode)
+_materialize_lock = threading.Lock()
+
+# Adminga yuboriladigan xabarda har bir ro'yxatdan ko'rsatiladigan elementlar soni
+REPORT_PREVIEW_LIMIT = 10
+
+
+# ==================== SOLISHTIRISH (SINXRON) ====================
+
+def _report_row_data(row: tuple) -> Dict:
+    """
+    get_reports_for_reconciliation qatorini save_* funksiyalari kutadigan lug'atga o'girish.
+    sheet_only_columns - DB da NULL bo'lgan ustunlar: ular uchun sheetdagi qiymat asosiy manba
+    """
+    (_, submission_date, is_tashkent, _, client_name, phone_number, additional_phone_number,
+     product_type, delivery, note, client_location, contract_id, contract_amount, seller_name) = row
+    return {
+        'client_name': client_name or '',
+        'phone_number': phone_number or '',
+        'additional_phone_number': additional_phone_number or '',
+        'product_type': product_type or '',
+        'delivery': delivery or '',
+        'note': note or '',
+        'client_location': client_location or '',
+        'contract_id': str(contract_id or '').strip(),
+        'contract_amount': contract_amount or '',
+        'sender_full_name': seller_name or '',
+        'is_tashkent': bool(is_tashkent),
+        'report_date': date.fromisoformat(str(submission_date)),
+        'sheet_only_columns': tuple(
+            column for column, value in ((DELIVERY_COLUMN, delivery), (NOTE_COLUMN, note)) if value is None
+        )
+    }
+
+
+def _scan_worksheet(values: List[List[str]]):
+    """Sheet qatorlaridan shartnoma -> qator raqamlari va oxirgi tartib raqamini olish"""
+    positions = defaultdict(list)
+    last_number = 0
+    for row_index, row in enumerate(values[1:], start=2):
+        if row and str(row[0]).strip().isdigit():
+            last_number = max(last_number, int(row[0]))
+        contract_id = str(row[CONTRACT_ID_COLUMN]).strip() if len(row) > CONTRACT_ID_COLUMN else ''
+        if contract_id:
+            positions[contract_id].append(row_index)
+    return positions, last_number
+
+
+def _build_rows(worksheet_name: str, reports: List[Dict], first_number: int) -> List[List]:
+    rows = []
+    for number, report in enumerate(reports, start=first_number):
+        signed_date = report['report_date'].strftime('%d.%m.%Y')
+        if worksheet_name.startswith("ALL DATA"):
+            source_sheet_name = get_daily_worksheet_name(report['is_tashkent'], report['report_date'])
+            rows.append(build_all_data_row(number, report, signed_date, source_sheet_name))
+        else:
+            rows.append(build_daily_row(number, report, signed_date))
+    return rows
+
+
+def reconcile_spreadsheet(spreadsheet_id: str, expected: Dict[str, List[Dict]], fix: bool = True) -> List[Dict]:
+    """
+    Bitta spreadsheetdagi worksheetlarni DB bilan solishtirish
+    expected: worksheet nomi -> shu worksheetda bo'lishi kerak bo'lgan hisobotlar
+    """
+    results = []
+    # Qulf ostida jonli saqlashlar shu worksheetlarga tartib raqami bera olmaydi (o'qish va qo'shish orasida)
+    with sheets_operation("reconcile_spreadsheet", spreadsheet_id), worksheet_lock(spreadsheet_id, *expected):
+        try:
+            client = get_google_sheets_client(spreadsheet_id, write=True)
+            if not client:
+                return [{'spreadsheet_id': spreadsheet_id, 'error': "Google Sheets client yaratilmadi"}]
+
+            spreadsheet = client.open_by_key(spreadsheet_id)
+            sheet_values = batch_read_worksheets(spreadsheet, list(expected))
+
+        except Exception as e:
+            logging.error(f"❌ Solishtirish uchun o'qishda xato ({spreadsheet_id}): {e}")
+            return [{'spreadsheet_id': spreadsheet_id, 'error': str(e)}]
+
+        # DB tomonida grace oralig'i tufayli o'tkazib yuborilganlar sheetda allaqachon bo'lishi mumkin.
+        # Sheet o'qilgandan keyin olinadi - o'qish paytida yozilganlar ham qamraladi
+        recent_contracts = get_recent_report_contracts(RECONCILE_GRACE_MINUTES)
+
+        for worksheet_name, reports in expected.items():
+            values = sheet_values.get(worksheet_name)
+            positions, last_number = _scan_worksheet(values or [])
+
+            expected_ids = set()
+            missing = []
+            for report in reports:
+                contract_id = report['contract_id']
+                if not contract_id or contract_id in expected_ids:
+                    continue
+                expected_ids.add(contract_id)
+                if contract_id not in positions:
+                    missing.append(report)
+
+            result = {
+                'spreadsheet_id': spreadsheet_id,
+                'worksheet': worksheet_name,
+                'checked': len(expected_ids),
+                'missing': [report['contract_id'] for report in missing],
+                'duplicates': {cid: rows for cid, rows in positions.items() if len(rows) > 1},
+                'orphans': [cid for cid in positions if cid not in expected_ids and cid not in recent_contracts],
+                'appended': 0
+            }
+
+            # Indeksni o'qilgan qatorlar bo'yicha yangilash (qo'shimcha so'rovsiz)
+            save_sheet_row_locations(
+                spreadsheet_id, worksheet_name,
+                {cid: rows[0] for cid, rows in positions.items() if cid in expected_ids}
+            )
+
+            if fix and missing:
+                try:
+                    if values is None:
+                        # Worksheet umuman yaratilmagan - sarlavhalar bilan yaratish
+                        report_date = missing[0]['report_date']
+                        if worksheet_name.startswith("ALL DATA"):
+                            created = get_or_create_all_data_worksheet(spreadsheet_id, report_date)
+                        else:
+                            created = get_or_create_daily_worksheet(
+                                spreadsheet_id, missing[0]['is_tashkent'], report_date
+                            )
+                        if not created:
+                            raise RuntimeError(f"'{worksheet_name}' yaratilmadi")
+
+                    rows = _build_rows(worksheet_name, missing, last_number + 1)
+                    first_row = bulk_append_rows(spreadsheet, worksheet_name, rows)
+                    if first_row:
+                        save_sheet_row_locations(spreadsheet_id, worksheet_name, {
+                            report['contract_id']: first_row + offset
+                            for offset, report in enumerate(missing)
+                        })
+                    result['appended'] = len(rows)
+                    logging.info(f"✅ '{worksheet_name}' ga {len(rows)} ta yetishmayotgan qator qayta qo'shildi")
+
+                except Exception as e:
+                    result['error'] = str(e)
+                    logging.error(f"❌ '{worksheet_name}' ga qatorlarni qayta qo'shishda xato: {e}")
+
+            results.append(result)
+
+    return results
+
+
+# ==================== SOLISHTIRISH (ASINXRON) ====================
+
+async def build_reconciliation_plan(days: List[date]) -> Dict[str, Dict[str, List[Dict]]]:
+    """
+    spreadsheet_id -> worksheet nomi -> kutilayotgan hisobotlar
+    Faol barcha spreadsheetlarning SH/VL worksheetlari (hisobot bo'lmasa ham) tekshiriladi
+    """
+    plan: Dict[str, Dict[str, List[Dict]]] = defaultdict(dict)
+    all_data_spreadsheet_id = get_all_data_spreadsheet_id()
+
+    for sheet in await get_all_google_sheets():
+        spreadsheet_id = sheet[2]
+        for day in days:
+            plan[spreadsheet_id].setdefault(get_daily_worksheet_name(True, day), [])
+            plan[spreadsheet_id].setdefault(get_daily_worksheet_name(False, day), [])
+
+    if all_data_spreadsheet_id:
+        for day in days:
+            plan[all_data_spreadsheet_id].setdefault(get_daily_all_data_worksheet_name(day), [])
+
+    # Navbatdagi (davriy yo'l yozadigan) hisobotlarni solishtirish qo'shib yubormasligi kerak
+    pending_range = get_all_data_pending_range() if all_data_spreadsheet_id else None
+
+    rows = await get_reports_for_reconciliation(
+        min(days).isoformat(), max(days).isoformat(), RECONCILE_GRACE_MINUTES
+    )
+    for row in rows:
+        report = _report_row_data(row)
+        spreadsheet_id = row[3]
+        daily_name = get_daily_worksheet_name(report['is_tashkent'], report['report_date'])
+        plan[spreadsheet_id].setdefault(daily_name, []).append(report)
+        if all_data_spreadsheet_id and not (pending_range and pending_range[0] < row[0] <= pending_range[1]):
+            all_data_name = get_daily_all_data_worksheet_name(report['report_date'])
+            plan[all_data_spreadsheet_id].setdefault(all_data_name, []).append(report)
+
+    return plan
+
+
+async def run_reconciliation(days: List[date], fix: bool = True) -> List[Dict]:
+    """Berilgan kunlar bo'yicha barcha spreadsheetlarni solishtirish"""
+    plan = await build_reconciliation_plan(days)
+    results = []
+    for spreadsheet_id, expected in plan.items():
+        results.extend(await asyncio.to_thread(reconcile_spreadsheet, spreadsheet_id, expected, fix))
+    return results
+
+
+def _preview(items) -> str:
+    items = list(items)
+    text = ", ".join(str(item) for item in items[:REPORT_PREVIEW_LIMIT])
+    if len(items) > REPORT_PREVIEW_LIMIT:
+        text += f" ... (+{len(items) - REPORT_PREVIEW_LIMIT})"
+    return text
+
+
+def format_reconciliation_report(results: List[Dict], days: List[date]) -> str:
+    """Solishtirish natijalarini adminga yuboriladigan matnga aylantirish"""
+    days_text = ", ".join(day.strftime('%d.%m.%Y') for day in sorted(days))
+    text = f"🔄 Sheet solishtirish natijasi\n📅 {days_text}\n\n"
+
+    checked = sum(result.get('checked', 0) for result in results)
+    appended = sum(result.get('appended', 0) for result in results)
+    text += f"📋 Tekshirilgan hisobotlar: {checked}\n➕ Qayta qo'shilgan qatorlar: {appended}\n\n"
+
+    problems = 0
+    for result in results:
+        worksheet = result.get('worksheet', result['spreadsheet_id'])
+        lines = []
+        if result.get('error'):
+            lines.append(f"❌ Xato: {result['error']}")
+        not_fixed = result.get('missing', []) if not result.get('appended') else []
+        if not_fixed:
+            lines.append(f"⚠️ Yetishmaydi: {_preview(not_fixed)}")
+        if result.get('duplicates'):
+            lines.append(f"🔁 Dublikatlar: {_preview(f'{cid} (qatorlar {rows})' for cid, rows in result['duplicates'].items())}")
+        if result.get('orphans'):
+            lines.append(f"❓ DB da yo'q: {_preview(result['orphans'])}")
+        if lines:
+            problems += 1
+            text += f"🗂️ {worksheet}\n" + "\n".join(lines) + "\n\n"
+
+    if not problems:
+        text += "✅ Farqlar topilmadi."
+
+    return text.rstrip()
+
+
+def _has_problems(results: List[Dict]) -> bool:
+    return any(
+        result.get('error') or result.get('duplicates') or result.get('orphans') or result.get('appended')
+        for result in results
+    )
+
+
+def reconciliation_days(for_date: Optional[date] = None, count: int = RECONCILE_DAYS) -> List[date]:
+    end = for_date or date.today()
+    return [end - timedelta(days=offset) for offset in range(count)]
+
+
+async def reconciliation_loop(bot: Bot):
+    """Rejali solishtirish: har RECONCILE_INTERVAL_SECONDS da bugun va kechani tekshirish"""
+    while True:
+        await asyncio.sleep(RECONCILE_INTERVAL_SECONDS)
+        try:
+            days = reconciliation_days()
+            results = await run_reconciliation(days)
+            logging.info(f"🔄 Rejali solishtirish tugadi: {len(results)} ta worksheet tekshirildi")
+            if _has_problems(results) and ADMIN_ID:
+                await bot.send_message(ADMIN_ID, format_reconciliation_report(results, days), parse_mode=None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"❌ Rejali solishtirishda xato: {e}")
+
+
+def start_sheets_sync_jobs(bot: Bot) -> List[asyncio.Task]:
+    """bot.main dan chaqiriladi - fon vazifalarini ishga tushirish"""
+    return [
+        asyncio.create_task(reconciliation_loop(bot), name="sheets_reconciliation"),
+        asyncio.create_task(pull_sync_loop(), name="sheets_pull_sync"),
+        asyncio.create_task(all_data_materialize_loop(), name="all_data_materialize")
+    ]
+
+
+# ==================== TESKARI SINXRONLASH (SHEET -> DB) ====================
+
+def _drive_modified_time(client, spreadsheet_id: str) -> Optional[str]:
+    """Spreadsheetning Drive modifiedTime qiymati (bitta yengil so'rov)"""
+    try:
+        http_client = getattr(client, 'http_client', client)
+        return http_client.get_file_drive_metadata(spreadsheet_id).get('modifiedTime')
+    except Exception as e:
+        logging.warning(f"⚠️ modifiedTime olinmadi ({spreadsheet_id}): {e}")
+        return None
+
+
+def pull_spreadsheet_edits(spreadsheet_id: str, google_sheet_ids: List[int], worksheet_days: Dict[str, date],
+                           last_modified_time: Optional[str] = None) -> Dict:
+    """
+    Bitta spreadsheetdan F/K/L ustunlarini o'qib, o'zgarishlarni DB ga yozish
+    worksheet_days: worksheet nomi -> kuni. Hisobot (kun, shartnoma) bo'yicha topiladi va faqat shu
+    spreadsheetga bog'langan google_sheet_ids dan qidiriladi
+    """
+    worksheet_names = list(worksheet_days)
+    result = {'spreadsheet_id': spreadsheet_id, 'skipped': False, 'contracts': 0, 'updated': 0}
+    with sheets_operation("pull_spreadsheet_edits", spreadsheet_id):
+        try:
+            client = get_google_sheets_client(spreadsheet_id)
+            if not client:
+                raise RuntimeError("Google Sheets client yaratilmadi")
+
+            # modifiedTime o'qishdan oldin olinadi - o'qish paytidagi tahrirlar keyingi safar ko'rinadi
+            modified_time = _drive_modified_time(client, spreadsheet_id)
+            if modified_time and modified_time == last_modified_time:
+                result['skipped'] = True
+                return result
+
+            spreadsheet = client.open_by_key(spreadsheet_id)
+            sheet_columns = batch_read_columns(
+                spreadsheet, worksheet_names, [SHIPMENT_TYPE_COLUMN, SHIPPED_DATE_COLUMN, CONTRACT_ID_COLUMN]
+            )
+
+        except Exception as e:
+            result['error'] = str(e)
+            logging.error(f"❌ Sheetdan o'qishda xato ({spreadsheet_id}): {e}")
+            return result
+
+    updates = {}
+    for worksheet_name, day in worksheet_days.items():
+        for shipment_type, shipped_date, contract_id in sheet_columns.get(worksheet_name) or []:
+            contract_id = str(contract_id).strip()
+            if contract_id:
+                updates[(day.isoformat(), contract_id)] = (str(shipment_type).strip(), str(shipped_date).strip())
+
+    result['contracts'] = len(updates)
+    result['updated'] = apply_shipping_updates(google_sheet_ids, updates)
+    if modified_time:
+        save_sheet_pull_state(spreadsheet_id, modified_time)
+    return result
+
+
+async def run_pull_sync(days: Optional[List[date]] = None, force: bool = False) -> List[Dict]:
+    """Barcha faol spreadsheetlarning so'nggi kunlik worksheetlaridan qo'lda kiritilganlarni olish"""
+    days = sorted(days or reconciliation_days(count=PULL_DAYS))
+    worksheet_days = {
+        get_daily_worksheet_name(is_tashkent, day): day for day in days for is_tashkent in (True, False)
+    }
+    states = {} if force else await asyncio.to_thread(get_sheet_pull_states)
+
+    # Bitta spreadsheet bir nechta google_sheets yozuviga bog'langan bo'lishi mumkin
+    sheet_ids: Dict[str, List[int]] = defaultdict(list)
+    for sheet in await get_all_google_sheets():
+        sheet_ids[sheet[2]].append(sheet[0])
+
+    results = []
+    for spreadsheet_id, google_sheet_ids in sheet_ids.items():
+        results.append(await asyncio.to_thread(
+            pull_spreadsheet_edits, spreadsheet_id, google_sheet_ids, worksheet_days, states.get(spreadsheet_id)
+        ))
+    return results
+
+
+def format_pull_report(results: List[Dict]) -> str:
+    skipped = sum(1 for result in results if result['skipped'])
+    text = (
+        f"🔃 Sheet -> DB sinxronlash\n\n"
+        f"📄 Spreadsheetlar: {len(results)} (o'zgarmagan: {skipped})\n"
+        f"📋 O'qilgan shartnomalar: {sum(result['contracts'] for result in results)}\n"
+        f"✏️ Yangilangan hisobotlar: {sum(result['updated'] for result in results)}"
+    )
+    for result in results:
+        if result.get('error'):
+            text += f"\n❌ {result['spreadsheet_id']}: {result['error']}"
+    return text
+
+
+async def pull_sync_loop():
+    """Rejali teskari sinxronlash: har PULL_INTERVAL_SECONDS da"""
+    while True:
+        await asyncio.sleep(PULL_INTERVAL_SECONDS)
+        try:
+            results = await run_pull_sync()
+            updated = sum(result['updated'] for result in results)
+            if updated:
+                logging.info(f"🔃 Sheetdan {updated} ta hisobotning jo'natma ma'lumoti yangilandi")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"❌ Rejali teskari sinxronlashda xato: {e}")
+
+
+# ==================== ALL DATA DAVRIY TO'LDIRISH (DB -> ALL DATA) ====================
+
+def get_all_data_pending_range() -> Optional[tuple]:
+    """
+    Davriy yo'l hali yozmagan hisobotlar oralig'i (belgi, yuqori chegara] yoki None.
+    Davriy rejimda - belgidan keyingi barchasi, jonli rejimda - rejim almashgunga qadar qolganlari
+    """
+    high_water_mark = get_setting(ALL_DATA_HIGH_WATER_MARK_KEY)
+    if is_all_data_batch_mode():
+        return int(high_water_mark or 0), float('inf')
+    switch_report_id = get_all_data_switch_report_id()
+    if high_water_mark is None or int(high_water_mark) >= switch_report_id:
+        return None
+    return int(high_water_mark), switch_report_id
+
+
+def materialize_all_data(spreadsheet_id: str, batch_size: int = ALL_DATA_MATERIALIZE_BATCH,
+                         up_to_id: Optional[int] = None) -> Dict:
+    """
+    Belgidan keyingi (up_to_id berilsa - undan katta bo'lmagan) hisobotlarni kunlik ALL DATA
+    worksheetlariga qo'shish. Har bir worksheetga bitta values.append; belgi faqat muvaffaqiyatli
+    yozuvdan keyin suriladi
+    """
+    with _materialize_lock:
+        return _materialize_all_data(spreadsheet_id, batch_size, up_to_id)
+
+
+def _materialize_all_data(spreadsheet_id: str, batch_size: int, up_to_id: Optional[int]) -> Dict:
+    stats = {'reports': 0, 'rows': 0, 'worksheets': 0, 'errors': []}
+
+    high_water_mark = get_setting(ALL_DATA_HIGH_WATER_MARK_KEY)
+    if high_water_mark is None:
+        # Belgi yo'q - avvalgi hisobotlar allaqachon yozilgan deb hisoblanadi
+        set_setting(ALL_DATA_HIGH_WATER_MARK_KEY, get_max_sales_report_id())
+        return stats
+    high_water_mark = int(high_water_mark)
+
+    with sheets_operation("materialize_all_data", spreadsheet_id):
+        while True:
+            rows = get_reports_for_sheets_after(high_water_mark, batch_size, up_to_id)
+            if not rows:
+                break
+
+            # id tartibida kunlar ketma-ket keladi, shuning uchun guruhlar ham id bo'yicha tartiblangan
+            groups: Dict[str, List[tuple]] = {}
+            for row in rows:
+                report = _report_row_data(row)
+                worksheet_name = get_daily_all_data_worksheet_name(report['report_date'])
+                groups.setdefault(worksheet_name, []).append((row[0], report))
+
+            try:
+                client = get_google_sheets_client(spreadsheet_id, write=True)
+                if not client:
+                    raise RuntimeError("Google Sheets client yaratilmadi")
+                spreadsheet = client.open_by_key(spreadsheet_id)
+            except Exception as e:
+                stats['errors'].append(str(e))
+                logging.error(f"❌ ALL DATA ochishda xato ({spreadsheet_id}): {e}")
+                break
+
+            for worksheet_name, items in groups.items():
+                reports = [report for _, report in items]
+                try:
+                    with worksheet_lock(spreadsheet_id, worksheet_name):
+                        worksheet = get_or_create_all_data_worksheet(spreadsheet_id, reports[0]['report_date'])
+                        if not worksheet:
+                            raise RuntimeError(f"'{worksheet_name}' ochilmadi")
+
+                        sheet_rows = _build_rows(worksheet_name, reports, get_next_row_number(worksheet))
+                        first_row = bulk_append_rows(spreadsheet, worksheet_name, sheet_rows)
+                        if first_row:
+                            save_sheet_row_locations(spreadsheet_id, worksheet_name, {
+                                report['contract_id']: first_row + offset
+                                for offset, report in enumerate(reports) if report['contract_id']
+                            })
+
+                except Exception as e:
+                    stats['errors'].append(f"{worksheet_name}: {e}")
+                    logging.error(f"❌ '{worksheet_name}' ga ALL DATA qatorlarini qo'shishda xato: {e}")
+                    break
+
+                high_water_mark = items[-1][0]
+                set_setting(ALL_DATA_HIGH_WATER_MARK_KEY, high_water_mark)
+                stats['reports'] += len(reports)
+                stats['rows'] += len(sheet_rows)
+                stats['worksheets'] += 1
+
+            if stats['errors'] or len(rows) < batch_size:
+                break
+
+    return stats
+
+
+async def all_data_materialize_loop():
+    """
+    Har ALL_DATA_MATERIALIZE_INTERVAL_SECONDS da navbatdagi hisobotlarni ALL DATA ga yozish:
+    davriy rejimda - barchasi, jonli rejimda - rejim almashgunga qadar yozilmay qolganlari
+    """
+    while True:
+        await asyncio.sleep(ALL_DATA_MATERIALIZE_INTERVAL_SECONDS)
+        try:
+            spreadsheet_id = get_all_data_spreadsheet_id()
+            pending_range = get_all_data_pending_range() if spreadsheet_id else None
+            if not pending_range:
+                continue
+            up_to_id = None if pending_range[1] == float('inf') else pending_range[1]
+            stats = await asyncio.to_thread(
+                materialize_all_data, spreadsheet_id, ALL_DATA_MATERIALIZE_BATCH, up_to_id
+            )
+            if stats['rows']:
+                logging.info(f"📥 ALL DATA ga {stats['rows']} ta qator qo'shildi ({stats['worksheets']} ta worksheet)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"❌ ALL DATA ni davriy to'ldirishda xato: {e}")
+
+
+# ==================== BACKFILL ====================
+
+def _backfill_spreadsheet(spreadsheet_id: str, worksheets: Dict[str, List[Dict]], stats: Dict):
+    """Bitta spreadsheetning bir kunlik worksheetlarini DB dan qayta yozish"""
+    with sheets_operation("backfill_spreadsheet", spreadsheet_id), worksheet_lock(spreadsheet_id, *worksheets):
+        try:
+            client = get_google_sheets_client(spreadsheet_id, write=True)
+            if not client:
+                raise RuntimeError("Google Sheets client yaratilmadi")
+
+            spreadsheet = client.open_by_key(spreadsheet_id)
+
+            # Qo'lda to'ldirilgan F (Jo'natma turi) va K (Yuborilgan sana) qiymatlari, shuningdek DB da
+            # NULL bo'lgan G/H (eski hisobotlarning Dastavka/Izoh) qiymatlari sheetdan saqlab qolinadi
+            existing_values = batch_read_worksheets(spreadsheet, list(worksheets))
+
+            payload = {}
+            for worksheet_name, reports in worksheets.items():
+                existing_rows = {}
+                for row in (existing_values.get(worksheet_name) or [])[1:]:
+                    contract_id = str(row[CONTRACT_ID_COLUMN]).strip() if len(row) > CONTRACT_ID_COLUMN else ''
+                    if contract_id:
+                        existing_rows.setdefault(contract_id, row)
+
+                rows = _build_rows(worksheet_name, reports, 1)
+                for row, report in zip(rows, reports):
+                    existing = existing_rows.get(row[CONTRACT_ID_COLUMN])
+                    if existing is None:
+                        continue
+                    for column in (SHIPMENT_TYPE_COLUMN, SHIPPED_DATE_COLUMN, *report['sheet_only_columns']):
+                        row[column] = existing[column] if len(existing) > column else ''
+
+                headers = ALL_DATA_COLUMN_HEADERS if worksheet_name.startswith("ALL DATA") else COLUMN_HEADERS
+                payload[worksheet_name] = (headers, rows)
+
+            written = write_worksheets_bulk(spreadsheet, payload)
+
+        except Exception as e:
+            stats['errors'].append(f"{spreadsheet_id}: {e}")
+            logging.error(f"❌ Backfill xatosi ({spreadsheet_id}): {e}")
+            return
+
+    for worksheet_name, reports in worksheets.items():
+        locations = {}
+        for row_index, report in enumerate(reports, start=2):
+            if report['contract_id']:
+                locations.setdefault(report['contract_id'], row_index)
+        delete_sheet_row_locations(spreadsheet_id, worksheet_name)
+        save_sheet_row_locations(spreadsheet_id, worksheet_name, locations)
+
+    stats['worksheets'] += len(written)
+    stats['rows'] += sum(written.values())
+
+
+def backfill_sheets(start_date: date, end_date: date, include_groups: bool = True,
+                    all_data_spreadsheet_id: Optional[str] = None) -> Dict:
+    """
+    Sana oralig'idagi kunlik worksheetlarni (SH/VL va/yoki ALL DATA) DB dan qayta qurish.
+    Hisobotlar sana tartibida oqim bilan o'qiladi - xotirada faqat bitta kun saqlanadi.
+    """
+    stats = {'reports': 0, 'days': 0, 'worksheets': 0, 'rows': 0, 'errors': []}
+    pending: Dict[str, Dict[str, List[Dict]]] = defaultdict(lambda: defaultdict(list))
+    current_day = None
+
+    def flush():
+        if pending:
+            stats['days'] += 1
+        for spreadsheet_id, worksheets in pending.items():
+            _backfill_spreadsheet(spreadsheet_id, worksheets, stats)
+        pending.clear()
+
+    for row in iter_reports_for_sheets(start_date.isoformat(), end_date.isoformat()):
+        report = _report_row_data(row)
+        if report['report_date'] != current_day:
+            flush()
+            current_day = report['report_date']
+
+        stats['reports'] += 1
+        if include_groups:
+            pending[row[3]][get_daily_worksheet_name(report['is_tashkent'], current_day)].append(report)
+        if all_data_spreadsheet_id:
+            pending[all_data_spreadsheet_id][get_daily_all_data_worksheet_name(current_day)].append(report)
+
+    flush()
+
+    logging.info(
+        f"✅ Backfill tugadi: {stats['reports']} ta hisobot, {stats['worksheets']} ta worksheet, "
+        f"{len(stats['errors'])} ta xato"
+    )
+    return stats
+
+
+# ==================== HANDLERS ====================
+
+@sheets_sync_router.message(Command("reconcile"))
+async def cmd_reconcile(message: Message):
+    """
+    /reconcile - bugun va kechani solishtirish
+    /reconcile 28.11.2025 - berilgan kunni solishtirish
+    """
+    user_id = message.from_user.id
+
+    if not is_admin(user_id):
+        await message.answer("⛔ Bu buyruq faqat adminlar uchun!")
+        return
+
+    args = (message.text or "").split(maxsplit=1)
+    if len(args) > 1:
+        try:
+            days = [datetime.strptime(args[1].strip(), '%d.%m.%Y').date()]
+        except ValueError:
+            await message.answer("❌ Sana formati noto'g'ri. Masalan: /reconcile 28.11.2025")
+            return
+    else:
+        days = reconciliation_days()
+
+    status_message = await message.answer("⏳ Solishtirish boshlandi...")
+    results = await run_reconciliation(days)
+    await status_message.edit_text(format_reconciliation_report(results, days), parse_mode=None)
+    logging.info(f"🔄 Solishtirish admin {user_id} tomonidan ishga tushirildi: {len(results)} ta worksheet")
+
+
+@sheets_sync_router.message(Command("pullsheets"))
+async def cmd_pull_sheets(message: Message):
+    """/pullsheets - so'nggi kunlik sheetlardan jo'natma ma'lumotlarini hozir olish (o'zgarmaganlari ham)"""
+    user_id = message.from_user.id
+
+    if not is_admin(user_id):
+        await message.answer("⛔ Bu buyruq faqat adminlar uchun!")
+        return
+
+    status_message = await message.answer("⏳ Sheetlardan o'qilmoqda...")
+    results = await run_pull_sync(force=True)
+    await status_message.edit_text(format_pull_report(results), parse_mode=None)
+    logging.info(f"🔃 Teskari sinxronlash admin {user_id} tomonidan ishga tushirildi")
+
+
+@sheets_sync_router.message(Command("alldatamode"))
+async def cmd_all_data_mode(message: Message):
+    """
+    /alldatamode - ALL DATA yozish rejimini ko'rish
+    /alldatamode batch - ALL DATA DB dan davriy to'ldiriladi (hisobot yuborilganda yozilmaydi)
+    /alldatamode live - har bir hisobot darhol ALL DATA ga yoziladi
+    """
+    user_id = message.from_user.id
+
+    if not is_admin(user_id):
+        await message.answer("⛔ Bu buyruq faqat adminlar uchun!")
+        return
+
+    spreadsheet_id = get_all_data_spreadsheet_id()
+    if not spreadsheet_id:
+        await message.answer("⚠️ ALL DATA Sheet sozlanmagan!\n\n/add buyrug'i orqali sozlang.")
+        return
+
+    args = (message.text or "").split()[1:]
+    mode = args[0].lower() if args else None
+
+    if mode == "batch":
+        if not is_all_data_batch_mode():
+            # Oldingi davriy davrdan qolganlar belgi surilishidan oldin yozib olinadi
+            pending_range = get_all_data_pending_range()
+            if pending_range:
+                stats = await asyncio.to_thread(
+                    materialize_all_data, spreadsheet_id, ALL_DATA_MATERIALIZE_BATCH, pending_range[1]
+                )
+                if stats['errors']:
+                    await message.answer(
+                        "❌ Navbatdagi hisobotlar ALL DATA ga yozilmadi, rejim o'zgartirilmadi:\n"
+                        + "\n".join(stats['errors'][:REPORT_PREVIEW_LIMIT]),
+                        parse_mode=None
+                    )
+                    return
+            # Switch gacha bo'lganlarni jonli yo'l yozadi (ishlayotgan pipeline'lar ham), keyingilarini - davriy.
+            # O'rtada await yo'q - bu paytda boshqa hisobot DB ga tushmaydi
+            switch_report_id = get_max_sales_report_id()
+            set_setting(ALL_DATA_HIGH_WATER_MARK_KEY, switch_report_id)
+            set_all_data_batch_mode(True, switch_report_id)
+            logging.info(f"📥 ALL DATA davriy rejimga o'tkazildi by admin {user_id}")
+    elif mode == "live":
+        if is_all_data_batch_mode():
+            # Avval rejim almashadi: switch dan keyingilarni pipeline'lar o'zi yozadi,
+            # switch gacha navbatda qolganlari shu yerda (xato bo'lsa - fon tsiklida) yoziladi
+            switch_report_id = get_max_sales_report_id()
+            set_all_data_batch_mode(False, switch_report_id)
+            logging.info(f"📥 ALL DATA jonli rejimga o'tkazildi by admin {user_id}")
+            stats = await asyncio.to_thread(
+                materialize_all_data, spreadsheet_id, ALL_DATA_MATERIALIZE_BATCH, switch_report_id
+            )
+            if stats['errors']:
+                await message.answer(
+                    "⚠️ Navbatdagi hisobotlar hozircha ALL DATA ga yozilmadi, fonda qayta uriniladi:\n"
+                    + "\n".join(stats['errors'][:REPORT_PREVIEW_LIMIT]),
+                    parse_mode=None
+                )
+    elif mode is not None:
+        await message.answer("❌ Format: /alldatamode [batch|live]")
+        return
+
+    if is_all_data_batch_mode():
+        high_water_mark = int(get_setting(ALL_DATA_HIGH_WATER_MARK_KEY) or 0)
+        pending = max(0, get_max_sales_report_id() - high_water_mark)
+        text = (
+            f"📥 ALL DATA rejimi: davriy (har {ALL_DATA_MATERIALIZE_INTERVAL_SECONDS} s)\n"
+            f"🔖 Oxirgi yozilgan hisobot ID: {high_water_mark}\n"
+            f"⏳ Navbatda (taxminan): {pending}"
+        )
+    else:
+        text = "⚡ ALL DATA rejimi: jonli (har bir hisobot darhol yoziladi)"
+        pending_range = get_all_data_pending_range()
+        if pending_range:
+            text += f"\n⏳ Oldingi davriy rejimdan navbatda: {pending_range[1] - pending_range[0]}"
+    await message.answer(text)
+
+
+@sheets_sync_router.message(Command("backfill"))
+async def cmd_backfill(message: Message):
+    """
+    /backfill 01.11.2025 30.11.2025 - sana oralig'idagi SH/VL va ALL DATA sheetlarni DB dan qayta qurish
+    /backfill 01.11.2025 30.11.2025 sheets - faqat guruh sheetlari
+    /backfill 01.11.2025 30.11.2025 alldata - faqat ALL DATA
+    """
+    user_id = message.from_user.id
+
+    if not is_admin(user_id):
+        await message.answer("⛔ Bu buyruq faqat adminlar uchun!")
+        return
+
+    args = (message.text or "").split()[1:]
+    target = "all"
+    if args and args[-1].lower() in ("all", "sheets", "alldata"):
+        target = args.pop().lower()
+
+    try:
+        start_date = datetime.strptime(args[0], '%d.%m.%Y').date()
+        end_date = datetime.strptime(args[1], '%d.%m.%Y').date() if len(args) > 1 else start_date
+    except (IndexError, ValueError):
+        await message.answer(
+            "❌ Format: /backfill DD.MM.YYYY [DD.MM.YYYY] [all|sheets|alldata]\n"
+            "Masalan: /backfill 01.11.2025 30.11.2025 alldata"
+        )
+        return
+
+    if end_date < start_date:
+        start_date, end_date = end_date, start_date
+    if (end_date - start_date).days + 1 > BACKFILL_MAX_DAYS:
+        await message.answer(f"❌ Bir martada ko'pi bilan {BACKFILL_MAX_DAYS} kun qayta qurish mumkin.")
+        return
+
+    all_data_spreadsheet_id = get_all_data_spreadsheet_id() if target in ("all", "alldata") else None
+    if target == "alldata" and not all_data_spreadsheet_id:
+        await message.answer("⚠️ ALL DATA Sheet sozlanmagan!\n\n/add buyrug'i orqali sozlang.")
+        return
+
+    status_message = await message.answer(
+        f"⏳ Backfill boshlandi: {start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}..."
+    )
+    logging.info(f"🔁 Backfill admin {user_id} tomonidan boshlandi: {start_date} - {end_date} ({target})")
+
+    stats = await asyncio.to_thread(
+        backfill_sheets, start_date, end_date, target in ("all", "sheets"), all_data_spreadsheet_id
+    )
+
+    text = (
+        f"✅ Backfill tugadi\n\n"
+        f"📅 {start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}\n"
+        f"📋 Hisobotlar: {stats['reports']}\n"
+        f"📆 Kunlar: {stats['days']}\n"
+        f"🗂️ Worksheetlar: {stats['worksheets']}\n"
+        f"📝 Yozilgan qatorlar: {stats['rows']}"
+    )
+    if stats['errors']:
+        text += f"\n\n❌ Xatolar ({len(stats['errors'])}):\n" + "\n".join(stats['errors'][:REPORT_PREVIEW_LIMIT])
+    await status_message.edit_text(text, parse_mode=None)
@@ -0,0 +1,191 @@
+"""
+template_bench.py - hisobot template parserini tekshirish va o'lchash
+Avvalgi (har bir qatorda 10 ta startswith) parser bilan otchot.parse_template
+natijalari tasodifiy templatelarda solishtiriladi (fuzz) va tezligi o'lchanadi.
+
+Ishlatish:
+    python template_bench.py
+"""
+
+import json
+import logging
+import random
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import otchot
+from otchot import TEMPLATE_FIELDS, format_phone_number, parse_template_data
+
+# Avvalgi parserdagi aniq prefikslar
+_LEGACY_FIELD_MAPPING = {f"{emoji} {label}:": field for field, emoji, label in TEMPLATE_FIELDS}
+_LEGACY_REQUIRED_FIELDS = [
+    'client_name', 'phone_number', 'product_type', 'client_location', 'contract_id', 'contract_amount', 'seller_name'
+]
+
+_SAMPLE_VALUES = {
+    'client_name': ["Aliyev Vali", "Karimova Dilnoza", "Mijoz: ikki nuqta bilan"],
+    'phone_number': ["+998 90 123 45 67", "901234567", "  +998-97-000-11-22  "],
+    'additional_phone_number': ["+998 91 765 43 21", "Mavjud emas"],
+    'product_type': ["Divan", "Oshxona mebeli", "Shkaf 3 eshikli"],
+    'client_location': ["Toshkent shahar, Chilonzor", "Samarqand viloyati", "Nukus"],
+    'contract_amount': ["12 500 000", "3.200.000 so'm", "750000"],
+    'contract_id': ["A-1024", "2025/17", "SH-77"],
+    'delivery': ["Bepul", "200 000", "Mijoz o'zi olib ketadi"],
+    'note': ["Tezroq yetkazish", "Qavat: 5, lift yo'q"],
+    'seller_name': ["Jasur", "Malika Tursunova"]
+}
+
+
+def _legacy_parse_template_data(text: str) -> Optional[Dict[str, str]]:
+    """Avvalgi parse_template_data (taqqoslash uchun)"""
+    data = {}
+    for line in text.strip().split('\n'):
+        line = line.strip()
+        for key, field_name in _LEGACY_FIELD_MAPPING.items():
+            if line.startswith(key):
+                value = line.split(':', 1)[1].strip() if ':' in line else ''
+                if value:
+                    data[field_name] = value
+                break
+
+    for field in _LEGACY_REQUIRED_FIELDS:
+        if field not in data or not data[field]:
+            return None
+
+    if 'phone_number' in data:
+        data['phone_number'] = format_phone_number(data['phone_number'])
+    if 'additional_phone_number' in data:
+        data['additional_phone_number'] = format_phone_number(data['additional_phone_number'])
+    if 'delivery' not in data:
+        data['delivery'] = 'Belgilanmagan'
+    if 'note' not in data:
+        data['note'] = 'Yo\'q'
+    return data
+
+
+def make_template(randomizer: random.Random, mutate: bool = True) -> str:
+    """Tasodifiy to'ldirilgan template; mutate - maydon tushirish, bo'sh qiymat, ortiqcha qator va h.k."""
+    lines: List[str] = []
+    for field, emoji, label in TEMPLATE_FIELDS:
+        value = randomizer.choice(_SAMPLE_VALUES[field])
+        if mutate:
+            roll = randomizer.random()
+            if roll < 0.05:
+                continue
+            if roll < 0.10:
+                value = ""
+            elif roll < 0.15:
+                value = "   "
+        spacing = randomizer.choice([" ", "  ", "\t"]) if mutate else " "
+        lines.append(f"{randomizer.choice(['', ' ', '  '])}{emoji} {label}:{spacing}{value}")
+
+    if mutate:
+        if randomizer.random() < 0.3:
+            randomizer.shuffle(lines)
+        if randomizer.random() < 0.2:
+            lines.insert(randomizer.randrange(len(lines) + 1), randomizer.choice(
+                ["", "Salom!", "---", "👤 Mijozlar: bu maydon emas", "Izoh bu yerda emas"]
+            ))
+        if randomizer.random() < 0.1 and lines:
+            lines.append(randomizer.choice(lines))
+    return "\n".join(lines)
+
+
+def _emoji_variant(text: str, randomizer: random.Random) -> str:
+    """Emoji tushirib qoldirilgan yoki boshqasiga almashtirilgan variant (avvalgi parser qabul qilmaydi)"""
+    for _, emoji, _ in TEMPLATE_FIELDS:
+        text = text.replace(emoji, randomizer.choice(["", "☎️", "▪️", emoji]))
+    return text.replace("Qo'shimcha", randomizer.choice(["Qo'shimcha", "Qo’shimcha", "Qoʻshimcha"]))
+
+
+def fuzz_template_parser(iterations: int = 5000, seed: int = 1) -> Dict:
+    """
+    Aniq emojili templatelarda yangi parser avvalgisi bilan bir xil natija berishini,
+    emoji/apostrof variantlarida esa to'g'ri qabul qilishini tekshirish
+    """
+    randomizer = random.Random(seed)
+    mismatches = []
+    accepted = 0
+    for _ in range(iterations):
+        text = make_template(randomizer)
+        expected = _legacy_parse_template_data(text)
+        actual = parse_template_data(text)
+        if expected != actual:
+            mismatches.append({'text': text, 'expected': expected, 'actual': actual})
+        elif actual is not None:
+            accepted += 1
+
+    variants_accepted = 0
+    variant_mismatches = 0
+    for _ in range(iterations // 5):
+        text = make_template(randomizer, mutate=False)
+        expected = _legacy_parse_template_data(text)
+        actual = parse_template_data(_emoji_variant(text, randomizer))
+        if actual is not None:
+            variants_accepted += 1
+        if actual != expected:
+            variant_mismatches += 1
+
+    return {
+        'iterations': iterations,
+        'accepted': accepted,
+        'mismatches': len(mismatches),
+        'first_mismatch': mismatches[0] if mismatches else None,
+        'emoji_variants': iterations // 5,
+        'emoji_variants_accepted': variants_accepted,
+        'emoji_variant_mismatches': variant_mismatches
+    }
+
+
+@contextmanager
+def _without_phone_formatting():
+    """
+    Ikkala parser ham bir xil format_phone_number ni chaqiradi va u vaqtning katta qismini oladi -
+    o'lchash paytida u o'chiriladi, natijada faqat qatorlarni parse qilish solishtiriladi
+    """
+    modules = (otchot, sys.modules[__name__])
+    originals = [module.format_phone_number for module in modules]
+    for module in modules:
+        module.format_phone_number = str
+    try:
+        yield
+    finally:
+        for module, original in zip(modules, originals):
+            module.format_phone_number = original
+
+
+def benchmark_template_parser(templates: int = 20000, seed: int = 2, repeats: int = 5) -> Dict:
+    """
+    Avvalgi va yangi parser tezligini bir xil templatelarda o'lchash (telefon formatlashsiz).
+    Har bir parser repeats marta o'lchanib eng yaxshi natija olinadi
+    """
+    randomizer = random.Random(seed)
+    texts = [make_template(randomizer) for _ in range(templates)]
+
+    def measure(parser) -> float:
+        best = float('inf')
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for text in texts:
+                parser(text)
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    with _without_phone_formatting():
+        legacy_seconds = measure(_legacy_parse_template_data)
+        compiled_seconds = measure(parse_template_data)
+
+    return {
+        'templates': templates,
+        'legacy_us_per_template': round(legacy_seconds / templates * 1_000_000, 2),
+        'compiled_us_per_template': round(compiled_seconds / templates * 1_000_000, 2),
+        'speedup': round(legacy_seconds / compiled_seconds, 2) if compiled_seconds else None
+    }
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    print(json.dumps(fuzz_template_parser(), ensure_ascii=False, indent=2))
+    print(json.dumps(benchmark_template_parser(), ensure_ascii=False, indent=2))